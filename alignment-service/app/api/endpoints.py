@@ -1,21 +1,104 @@
-from fastapi import APIRouter, HTTPException
+from typing import Literal, Union
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from app.services.bulk import align_many, error_status
+from app.services.fetch import AudioTooLargeError, get_fetcher
 from app.services.logic import run_service_logic
-from app.schemas.request_response import AlignmentRequest, AlignmentResponse
+from app.services.pronunciation import pronunciation_stats
+from app.services.serialize import dumps, render
+from app.schemas.request_response import (
+    AlignmentRequest,
+    AlignmentResponse,
+    AlignmentColumnarResponse,
+    AlignmentBatchRequest,
+    AlignmentBatchResponse,
+    AlignmentBatchResult
+)
+from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+ResponseFormat = Literal["json", "columnar"]
+
+
 @router.post(
     "/process",
-    response_model=AlignmentResponse,
+    response_model=Union[AlignmentColumnarResponse, AlignmentResponse],
     summary="Align Text to Audio",
     description="Perform forced alignment to get timestamps for transcript characters/phonemes."
 )
-async def process_alignment(req: AlignmentRequest):
+async def process_alignment(
+    req: AlignmentRequest,
+    response_format: ResponseFormat = Query("json", alias="format", description="json, or columnar for parallel phoneme arrays")
+):
+    # The response is encoded directly from the aligned track (no per-phoneme
+    # models); response_model only documents its shape
     try:
-        return await run_service_logic(req)
+        return render(await run_service_logic(req), response_format)
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Alignment failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post(
+    "/batch",
+    response_model=AlignmentBatchResponse,
+    responses={200: {"content": {"application/x-ndjson": {"schema": AlignmentBatchResult.model_json_schema()}}}},
+    summary="Align Many Utterances",
+    description=(
+        "Align a batch of utterances in one call. Pronunciations are resolved once for the whole batch and "
+        "items are aligned concurrently. A failing item does not fail the batch; it is reported with its own "
+        "status. With stream=true each result is sent as an NDJSON line as soon as it is ready."
+    )
+)
+async def process_alignment_batch(
+    req: AlignmentBatchRequest,
+    response_format: ResponseFormat = Query("json", alias="format", description="json, or columnar for parallel phoneme arrays"),
+    stream: bool = Query(False, description="Stream results as NDJSON in completion order")
+):
+    if len(req.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(req.items)} items, maximum is {settings.BULK_MAX_ITEMS}"
+        )
+
+    def result(index, track, error):
+        item = {"index": index, "id": req.items[index].id}
+        if error is not None:
+            logger.error(f"Batch item {index} failed: {str(error)}")
+            item.update(status="error", status_code=error_status(error), result=None, error=str(error))
+        else:
+            payload = track.to_columns() if response_format == "columnar" else track.to_rows()
+            item.update(status="ok", status_code=200, result=payload, error=None)
+        return item
+
+    results = align_many(req.items, settings.BULK_CONCURRENCY)
+
+    if stream:
+        async def lines():
+            async for index, track, error in results:
+                yield dumps(result(index, track, error)) + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    collected = [result(*outcome) async for outcome in results]
+    collected.sort(key=lambda item: item["index"])
+    return Response(content=dumps({"results": collected}), media_type="application/json")
+
+
+@router.get(
+    "/info",
+    summary="Service Info",
+    description="Alignment configuration and pronunciation lexicon/cache stats."
+)
+async def service_info():
+    return {
+        "acoustic_alignment": settings.ACOUSTIC_ALIGNMENT_ENABLED,
+        "phoneme_model": settings.PHONEME_MODEL_NAME,
+        "pronunciation": pronunciation_stats(),
+        "downloads": get_fetcher().stats()
+    }
+
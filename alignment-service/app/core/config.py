@@ -14,8 +14,42 @@ class Settings(BaseSettings):
     # Device Configuration
     DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
     
+    # Acoustic alignment: wav2vec2 phoneme posteriors + CTC Viterbi. Without
+    # audio (or with it disabled) phonemes are spread evenly over each word.
+    # Off by default: it loads a ~1.2GB model, and every request whose decoded
+    # audio is not in DECODED_AUDIO_CACHE_DIR downloads and decodes the file,
+    # whereas with it off a request carrying `duration` never touches audio.
+    # docker-compose.yml turns it on next to the shared decoded-audio volume
+    ACOUSTIC_ALIGNMENT_ENABLED: bool = False
+    PHONEME_MODEL_NAME: str = "facebook/wav2vec2-lv-60-espeak-cv-ft"
+    ACOUSTIC_BAND_SECONDS: float = 0.15  # Slack around ASR word times a phoneme may move into
+    ACOUSTIC_WINDOW_SECONDS: float = 30.0  # Audio per model call for long recordings
+    MODEL_CACHE_DIR: str = "/models_cache"
+    
+    # Pronunciations: CMUdict (+ optional CMUdict-format site lexicon) first,
+    # g2p_en results memoized in an LRU of PRONUNCIATION_CACHE_SIZE words
+    PRONUNCIATION_PRELOAD: bool = True  # Load g2p_en and the lexicon at startup
+    PRONUNCIATION_LEXICON_PATH: Optional[str] = None
+    PRONUNCIATION_CACHE_SIZE: int = 50000
+    
+    # Batch alignment (/alignment/batch)
+    BULK_MAX_ITEMS: int = 1000
+    BULK_CONCURRENCY: int = 8  # Items fetched/aligned at once
+    
     # Storage
     TEMP_DIR: str = "/tmp/alignment_temp"
+    DECODED_AUDIO_CACHE_DIR: str = ""  # Decoded audio written by asr-service (shared volume); empty disables
+    STORAGE_ENDPOINT: str = "http://minio:9000"
+    STORAGE_ACCESS_KEY: str = "minioadmin"
+    STORAGE_SECRET_KEY: str = "minioadmin"
+    STORAGE_BUCKET: str = "audio-files"
+    
+    # Audio downloads: one pooled async client for URLs and object keys. When
+    # acoustic alignment is off only the header is read (Range request)
+    DOWNLOAD_MAX_BYTES: int = 100 * 1024 * 1024  # Larger downloads are aborted with 413
+    DOWNLOAD_TIMEOUT_SECONDS: float = 30.0
+    DOWNLOAD_MAX_CONNECTIONS: int = 32
+    DOWNLOAD_KEEPALIVE_CONNECTIONS: int = 16  # Idle connections kept open for reuse
 
     class Config:
         case_sensitive = True
@@ -1,18 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from app.api.endpoints import router
 from app.core.config import settings
+from app.services.acoustic import get_phoneme_model
+from app.services.fetch import shutdown_fetcher
+from app.services.pronunciation import get_resolver
 import logging
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.PRONUNCIATION_PRELOAD:
+        # Build the lexicon before the first request instead of during it
+        try:
+            await asyncio.to_thread(get_resolver)
+        except Exception as e:
+            logger.warning(f"Pronunciation preload failed, loading on first request: {e}")
+    if settings.ACOUSTIC_ALIGNMENT_ENABLED and not settings.MOCK_MODE:
+        # The phoneme model is ~1.2GB; load it before the first alignment needs it
+        try:
+            await asyncio.to_thread(get_phoneme_model)
+        except Exception as e:
+            logger.warning(f"Phoneme model preload failed, loading on first request: {e}")
+    yield
+    await shutdown_fetcher()
+
+
 app = FastAPI(
     title=settings.SERVICE_NAME, 
     version=settings.SERVICE_VERSION,
-    description="Service for forced alignment of text to audio with phoneme-level timestamps."
+    description="Service for forced alignment of text to audio with phoneme-level timestamps.",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Union
 
 
 class WordInput(BaseModel):
@@ -28,11 +28,71 @@ class WordAlignment(BaseModel):
 
 class AlignmentRequest(BaseModel):
     audio_url: Optional[str] = Field(None, description="URL to the audio file")
+    object_key: Optional[str] = Field(None, description="MinIO/S3 object key of the audio file (instead of audio_url)")
+    bucket: Optional[str] = Field(None, description="Bucket for object_key. Defaults to STORAGE_BUCKET")
     transcript: str = Field(..., description="Text transcript of the audio")
     words: Optional[List[WordInput]] = Field(None, description="Word-level timestamps from ASR")
+    duration: Optional[float] = Field(None, gt=0, description="Audio duration in seconds, as measured by ASR (skips probing the audio)")
+    sample_rate: Optional[int] = Field(None, description="Sample rate of the decoded audio behind audio_cache_key")
+    content_hash: Optional[str] = Field(None, description="Hash of the decoded audio from ASR")
+    audio_cache_key: Optional[str] = Field(None, description="Key of the decoded audio in the shared cache (from ASR)")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if self.audio_url is not None and self.object_key is not None:
+            raise ValueError("Provide at most one of audio_url or object_key")
+        return self
 
 
 class AlignmentResponse(BaseModel):
     phonemes: List[Phoneme] = Field(..., description="Flat list of phoneme alignments")
     duration: float = Field(..., description="Total audio duration in seconds")
 
+
+class AlignmentColumnarResponse(BaseModel):
+    """Compact alignment response (?format=columnar): phonemes as parallel arrays"""
+    symbols: List[str] = Field(..., description="Phoneme symbols (ARPAbet)")
+    starts: List[float] = Field(..., description="Start time of each phoneme in seconds")
+    ends: List[float] = Field(..., description="End time of each phoneme in seconds")
+    confidences: List[float] = Field(..., description="Confidence of each phoneme (0-1)")
+    word_index: List[int] = Field(..., description="Index into words of each phoneme's parent word")
+    words: List[str] = Field(..., description="Aligned words, one entry per occurrence")
+    duration: float = Field(..., description="Total audio duration in seconds")
+
+
+class AlignmentBatchItem(AlignmentRequest):
+    """One utterance in an /alignment/batch request"""
+    id: Optional[str] = Field(None, description="Caller-supplied identifier echoed back with the result")
+
+
+class AlignmentBatchRequest(BaseModel):
+    """Request model for aligning many utterances in one call"""
+    items: List[AlignmentBatchItem] = Field(..., min_length=1, description="Utterances to align (transcript, words and audio reference each)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "s1", "transcript": "hello world", "object_key": "session-4/s1.wav", "duration": 1.2},
+                    {"id": "s2", "transcript": "good morning", "words": [
+                        {"word": "good", "start": 0.1, "end": 0.4},
+                        {"word": "morning", "start": 0.45, "end": 1.0}
+                    ]}
+                ]
+            }
+        }
+
+
+class AlignmentBatchResult(BaseModel):
+    """Outcome of one batch item (an NDJSON line with ?stream=true)"""
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[str] = Field(None, description="Caller-supplied item identifier")
+    status: Literal["ok", "error"] = Field(..., description="Item outcome")
+    status_code: int = Field(..., description="HTTP status the item would have had on /alignment/process")
+    result: Optional[Union[AlignmentColumnarResponse, AlignmentResponse]] = Field(None, description="Alignment (status ok)")
+    error: Optional[str] = Field(None, description="Error detail (status error)")
+
+
+class AlignmentBatchResponse(BaseModel):
+    """Batch results in request order"""
+    results: List[AlignmentBatchResult]
@@ -0,0 +1,289 @@
+"""
+Alignment Service Acoustic - CTC forced alignment of phonemes
+
+Frame-level phoneme posteriors come from a wav2vec2 phoneme recogniser
+(espeak IPA vocabulary) run once per utterance. The ARPAbet sequence from
+g2p is mapped onto that vocabulary and aligned with a CTC Viterbi pass
+vectorised over states; when ASR word timestamps are available each
+phoneme may only occupy frames near its word, which keeps the path on the
+right word even through long pauses.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# ARPAbet -> IPA spellings, most likely first. A phoneme's frame score is the
+# best of the spellings present in the model vocabulary.
+ARPABET_TO_IPA: Dict[str, Tuple[str, ...]] = {
+    "AA": ("ɑː", "ɑ"), "AE": ("æ",), "AH": ("ʌ", "ə"), "AO": ("ɔː", "ɔ"),
+    "AW": ("aʊ",), "AY": ("aɪ",), "B": ("b",), "CH": ("tʃ",), "D": ("d", "ɾ"),
+    "DH": ("ð",), "EH": ("ɛ",), "ER": ("ɚ", "ɜː", "ɝ"), "EY": ("eɪ",),
+    "F": ("f",), "G": ("ɡ", "g"), "HH": ("h",), "IH": ("ɪ", "ᵻ"), "IY": ("iː", "i"),
+    "JH": ("dʒ",), "K": ("k",), "L": ("l",), "M": ("m",), "N": ("n",),
+    "NG": ("ŋ",), "OW": ("oʊ", "əʊ"), "OY": ("ɔɪ",), "P": ("p",), "R": ("ɹ", "r"),
+    "S": ("s",), "SH": ("ʃ",), "T": ("t", "ɾ"), "TH": ("θ",), "UH": ("ʊ",),
+    "UW": ("uː", "u"), "V": ("v",), "W": ("w",), "Y": ("j",), "Z": ("z",),
+    "ZH": ("ʒ",)
+}
+
+_model = None
+_vocab: Optional[Dict[str, int]] = None
+_blank_id = 0
+_model_lock = threading.Lock()
+
+
+@dataclass
+class WordSpan:
+    """A word to align: its phonemes and, when known, its ASR time window"""
+    word: str
+    phonemes: List[str]
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+def get_phoneme_model():
+    """
+    Load the wav2vec2 phoneme CTC model and its vocabulary (singleton).
+    Returns (model, vocab, blank_id).
+    """
+    global _model, _vocab, _blank_id
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import json
+                import torch
+                from huggingface_hub import hf_hub_download
+                from transformers import Wav2Vec2ForCTC
+
+                logger.info(f"Loading phoneme model: {settings.PHONEME_MODEL_NAME} on {settings.DEVICE}")
+                vocab_path = hf_hub_download(settings.PHONEME_MODEL_NAME, "vocab.json", cache_dir=settings.MODEL_CACHE_DIR)
+                with open(vocab_path, encoding="utf-8") as f:
+                    vocab = json.load(f)
+                model = Wav2Vec2ForCTC.from_pretrained(settings.PHONEME_MODEL_NAME, cache_dir=settings.MODEL_CACHE_DIR)
+                model.to(settings.DEVICE).eval()
+
+                _blank_id = vocab.get("<pad>", model.config.pad_token_id or 0)
+                _vocab = vocab
+                _model = model
+                logger.info(f"Phoneme model loaded ({len(vocab)} tokens)")
+    return _model, _vocab, _blank_id
+
+
+def frame_geometry(model) -> Tuple[int, int]:
+    """
+    (stride, receptive field) in samples of the model's convolutional
+    feature encoder: output frame k sees samples [k * stride, k * stride +
+    receptive field). 320 and 400 for wav2vec2.
+    """
+    stride, receptive = 1, 1
+    for kernel, step in zip(model.config.conv_kernel, model.config.conv_stride):
+        receptive += (kernel - 1) * stride
+        stride *= step
+    return stride, receptive
+
+
+def phoneme_posteriors(audio: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Frame-level log posteriors for 16kHz mono audio.
+
+    Long recordings are run in ACOUSTIC_WINDOW_SECONDS pieces (rounded to
+    whole frames) so memory stays bounded. Each piece is zero-padded past its
+    end so it yields one frame per started stride, including a tail shorter
+    than the receptive field; frame k therefore starts at k * stride on the
+    original timeline. Returns (log_probs of shape (frames, vocab), seconds
+    per frame).
+    """
+    import torch
+
+    model, _, _ = get_phoneme_model()
+    stride, receptive = frame_geometry(model)
+    window = max(1, int(settings.ACOUSTIC_WINDOW_SECONDS * SAMPLE_RATE) // stride) * stride
+    pieces = []
+    for offset in range(0, len(audio), window):
+        chunk = audio[offset:offset + window]
+        # Same normalisation as Wav2Vec2FeatureExtractor (zero mean, unit variance)
+        chunk = (chunk - chunk.mean()) / np.sqrt(chunk.var() + 1e-7)
+        n_frames = -(-len(chunk) // stride)
+        chunk = np.pad(chunk, (0, (n_frames - 1) * stride + receptive - len(chunk)))
+        inputs = torch.from_numpy(chunk.astype(np.float32))[None].to(settings.DEVICE)
+        with torch.inference_mode():
+            logits = model(inputs).logits[0, :n_frames]
+        pieces.append(torch.log_softmax(logits.float(), dim=-1).cpu().numpy())
+
+    frame_seconds = stride / SAMPLE_RATE
+    if not pieces:
+        return np.zeros((0, 0), dtype=np.float32), frame_seconds
+    return np.concatenate(pieces), frame_seconds
+
+
+def phoneme_token_ids(phoneme: str, vocab: Dict[str, int]) -> List[int]:
+    """Vocabulary ids whose posteriors stand for an ARPAbet phoneme"""
+    spellings = ARPABET_TO_IPA.get(phoneme, ())
+    ids = [vocab[ipa] for ipa in spellings if ipa in vocab]
+    if not ids and spellings:
+        # Diphthongs/affricates the vocabulary splits: score by their characters
+        ids = [vocab[char] for char in spellings[0] if char in vocab]
+    return ids
+
+
+def viterbi_ctc(
+    emissions: np.ndarray,
+    labels: Sequence[int],
+    lo: np.ndarray,
+    hi: np.ndarray
+) -> Optional[np.ndarray]:
+    """
+    Best CTC path through `labels` (blank-interleaved internally).
+
+    Args:
+        emissions: (frames, 1 + n_labels) log scores; column 0 is blank and
+            column k + 1 belongs to labels[k]
+        labels: Label identity per position; equal neighbours need a blank
+            between them, as in CTC
+        lo, hi: First/last frame each label may occupy (the band)
+
+    Returns:
+        Frame -> label position (-1 for blank), or None if no path fits
+    """
+    n_frames, n = len(emissions), len(labels)
+    n_states = 2 * n + 1
+    if n == 0 or n_frames < n:
+        return None
+
+    # Extended state sequence: blank, l0, blank, l1, ..., blank
+    columns = np.zeros(n_states, dtype=np.int64)
+    columns[1::2] = np.arange(1, n + 1)
+    state_emissions = emissions[:, columns]
+
+    # Band: labels are confined to [lo, hi]; blanks are free (the path is
+    # monotonic, so the neighbouring labels already pin them down)
+    frames = np.arange(n_frames)[:, None]
+    banned = (frames < lo[None, :]) | (frames > hi[None, :])
+    state_emissions[:, 1::2][banned] = -np.inf
+
+    # Skipping the blank between two labels is only allowed when they differ
+    labels = np.asarray(labels)
+    can_skip = np.zeros(n_states, dtype=bool)
+    can_skip[3::2] = labels[1:] != labels[:-1]
+
+    neg_inf = np.full(n_states, -np.inf)
+    score = neg_inf.copy()
+    score[:2] = state_emissions[0, :2]
+    backptr = np.zeros((n_frames, n_states), dtype=np.int8)
+
+    for t in range(1, n_frames):
+        from_prev = np.concatenate(([-np.inf], score[:-1]))
+        from_skip = np.concatenate(([-np.inf, -np.inf], score[:-2]))
+        from_skip[~can_skip] = -np.inf
+
+        best = score
+        step = np.zeros(n_states, dtype=np.int8)
+        better = from_prev > best
+        best = np.where(better, from_prev, best)
+        step[better] = 1
+        better = from_skip > best
+        best = np.where(better, from_skip, best)
+        step[better] = 2
+
+        score = best + state_emissions[t]
+        backptr[t] = step
+
+    end = n_states - 1 if score[-1] >= score[-2] else n_states - 2
+    if not np.isfinite(score[end]):
+        return None
+
+    path = np.empty(n_frames, dtype=np.int64)
+    state = end
+    for t in range(n_frames - 1, -1, -1):
+        path[t] = state
+        state -= int(backptr[t, state])
+    return np.where(path % 2 == 1, path // 2, -1)
+
+
+def align_words(
+    log_probs: np.ndarray,
+    frame_seconds: float,
+    words: List[WordSpan],
+    band_seconds: float
+) -> Optional[List[Tuple[str, int, float, float, float]]]:
+    """
+    Align every word's phonemes in one Viterbi pass over the utterance.
+
+    Returns (phoneme, index into `words`, start, end, confidence) per
+    phoneme, or None when the phonemes cannot be fitted to the audio (e.g.
+    far too many for its length) so the caller can fall back to uniform
+    timing.
+    """
+    _, vocab, blank_id = get_phoneme_model()
+    n_frames = len(log_probs)
+
+    labels, owners, lo, hi, columns = [], [], [], [], [blank_id]
+    label_ids: Dict[str, int] = {}
+    for index, span in enumerate(words):
+        if span.start is not None and span.end is not None:
+            first = max(0, int((span.start - band_seconds) / frame_seconds))
+            last = min(n_frames - 1, int(np.ceil((span.end + band_seconds) / frame_seconds)))
+        else:
+            first, last = 0, n_frames - 1
+        for phoneme in span.phonemes:
+            token_ids = phoneme_token_ids(phoneme, vocab)
+            if not token_ids:
+                logger.debug(f"No model tokens for phoneme {phoneme}, skipping acoustic alignment")
+                return None
+            labels.append(label_ids.setdefault(phoneme, len(label_ids)))
+            owners.append((phoneme, index))
+            lo.append(first)
+            hi.append(last)
+            columns.append(token_ids)
+
+    if not labels:
+        return []
+
+    # Per-label score = best spelling's log posterior
+    emissions = np.empty((n_frames, len(columns)), dtype=np.float32)
+    emissions[:, 0] = log_probs[:, blank_id]
+    for k, token_ids in enumerate(columns[1:], start=1):
+        emissions[:, k] = log_probs[:, token_ids].max(axis=1)
+
+    path = viterbi_ctc(emissions, labels, np.asarray(lo), np.asarray(hi))
+    if path is None:
+        return None
+
+    # Frames per label; blanks after a label are given to it when the next
+    # label belongs to the same word, so phonemes inside a word are contiguous
+    occupied = path >= 0
+    positions = np.arange(len(labels))
+    first_frame = np.full(len(labels), n_frames)
+    last_frame = np.full(len(labels), -1)
+    np.minimum.at(first_frame, path[occupied], np.nonzero(occupied)[0])
+    np.maximum.at(last_frame, path[occupied], np.nonzero(occupied)[0])
+    scores = np.zeros(len(labels))
+    np.add.at(scores, path[occupied], np.exp(emissions[occupied, path[occupied] + 1]))
+    counts = np.bincount(path[occupied], minlength=len(labels))
+
+    results = []
+    for k in positions:
+        phoneme, index = owners[k]
+        end_frame = last_frame[k] + 1
+        if k + 1 < len(labels) and owners[k + 1][1] == index:
+            end_frame = first_frame[k + 1]
+        confidence = scores[k] / counts[k] if counts[k] else 0.0
+        results.append((
+            phoneme,
+            index,
+            float(first_frame[k] * frame_seconds),
+            float(end_frame * frame_seconds),
+            float(confidence)
+        ))
+    return results
@@ -0,0 +1,74 @@
+"""
+Alignment Service Bulk - Alignment of many utterances per call
+
+Pronunciations for every word of the batch are resolved in one pass (one G2P
+batch for all OOV words), then items are fetched and aligned concurrently
+and yielded in completion order.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.services.fetch import AudioTooLargeError
+from app.services.logic import request_words, run_service_logic
+from app.services.pronunciation import get_resolver
+from app.services.serialize import PhonemeTrack
+
+logger = logging.getLogger(__name__)
+
+
+def error_status(error: Exception) -> int:
+    """HTTP status an item error would have had on /alignment/process"""
+    if isinstance(error, AudioTooLargeError):
+        return 413
+    return 500
+
+
+async def align_many(
+    items: List,
+    concurrency: int
+) -> AsyncIterator[Tuple[int, Optional[PhonemeTrack], Optional[Exception]]]:
+    """
+    Align items concurrently and yield (index, track, error) as each one
+    finishes.
+
+    At most `concurrency` items are in flight at once, so audio downloads
+    and acoustic alignment of different items overlap. Remaining items are
+    cancelled if the consumer stops iterating (e.g. the client disconnects).
+
+    Args:
+        items: AlignmentRequest-shaped items
+        concurrency: Maximum items in flight
+    """
+    # Distinct words across the whole batch go through the lexicon/G2P once
+    words = list(dict.fromkeys(word for item in items for word in request_words(item)))
+    try:
+        await asyncio.to_thread(lambda: get_resolver().resolve_many(words))
+        resolved = True
+        logger.info(f"Resolved {len(words)} distinct word(s) for {len(items)} item(s)")
+    except Exception as e:
+        # Each item resolves its own words (and reports its own error)
+        resolved = False
+        logger.warning(f"Batch pronunciation pass failed: {e}")
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_item(index: int, item):
+        async with slots:
+            try:
+                return index, await run_service_logic(item, resolve_pronunciations=not resolved), None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.ensure_future(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"Bulk alignment stopped early, cancelled {len(pending)} item(s)")
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,241 @@
+"""
+Alignment Service Fetch - Pooled, non-blocking audio downloads
+
+Audio is streamed from HTTP URLs and MinIO/S3 object keys over one shared
+keep-alive connection pool. When only the duration is needed, a ranged
+request reads just the file header instead of the whole recording.
+"""
+
+import logging
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+except ImportError:
+    boto3 = None
+
+
+class AudioTooLargeError(ValueError):
+    """Raised when a download exceeds DOWNLOAD_MAX_BYTES"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Audio file exceeds maximum allowed ({max_bytes / 1024 / 1024:.0f} MB)")
+
+
+def header_duration(head: bytes, size_bytes: Optional[int]) -> Optional[float]:
+    """
+    Duration from WAV or FLAC headers, or None when the header does not say
+    (other formats, streaming WAV writers, truncated head).
+    """
+    try:
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            offset, byte_rate = 12, None
+            while offset + 8 <= len(head):
+                chunk_id = head[offset:offset + 4]
+                chunk_size = struct.unpack_from("<I", head, offset + 4)[0]
+                if chunk_id == b"fmt ":
+                    byte_rate = struct.unpack_from("<I", head, offset + 16)[0]
+                elif chunk_id == b"data":
+                    if not byte_rate:
+                        return None
+                    if size_bytes is not None:
+                        # Streaming writers leave the size as 0 or 0xFFFFFFFF
+                        available = size_bytes - (offset + 8)
+                        if not 0 < chunk_size <= available:
+                            chunk_size = max(0, available)
+                    elif chunk_size in (0, 0xFFFFFFFF):
+                        return None
+                    return chunk_size / byte_rate
+                offset += 8 + chunk_size + (chunk_size & 1)
+        elif head[:4] == b"fLaC" and len(head) >= 8 + 18 and head[4] & 0x7F == 0:
+            packed = int.from_bytes(head[8 + 10:8 + 18], "big")
+            sample_rate, total_samples = packed >> 44, packed & ((1 << 36) - 1)
+            if sample_rate and total_samples:
+                return total_samples / sample_rate
+    except struct.error:
+        pass
+    return None
+
+
+class AudioFetcher:
+    """
+    Shared downloader for URL and object-store audio.
+
+    One httpx.AsyncClient is reused for every request, so downloads never
+    block the event loop and connections to the same host (typically MinIO)
+    are kept alive. Bodies are streamed to a temp file in chunks and aborted
+    once they exceed `max_bytes`. Object keys are turned into presigned GET
+    URLs locally (no network call) and fetched over the same pool.
+
+    Args:
+        max_bytes: Largest download accepted
+        timeout: Per-request timeout in seconds
+        max_connections: Connection pool size
+        max_keepalive: Idle connections kept open for reuse
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    HEAD_BYTES = 64 * 1024
+
+    def __init__(
+        self,
+        max_bytes: int,
+        timeout: float = 30.0,
+        max_connections: int = 32,
+        max_keepalive: int = 16
+    ):
+        self.max_bytes = max_bytes
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive
+            ),
+            follow_redirects=True
+        )
+        self._s3 = None
+
+        # Stats
+        self.downloads = 0
+        self.head_reads = 0
+        self.bytes_downloaded = 0
+        self.rejected_too_large = 0
+        self.errors = 0
+
+    async def fetch_to_file(self, url: str) -> str:
+        """
+        Stream a URL into a temp file under TEMP_DIR and return its path.
+        The caller deletes the file.
+        """
+        suffix = os.path.splitext(urlparse(url).path)[1] or ".wav"
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.TEMP_DIR)
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with self._client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    declared = response.headers.get("content-length")
+                    if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                        raise AudioTooLargeError(self.max_bytes)
+                    async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise AudioTooLargeError(self.max_bytes)
+                        f.write(chunk)
+        except Exception as e:
+            if isinstance(e, AudioTooLargeError):
+                self.rejected_too_large += 1
+            elif isinstance(e, httpx.HTTPError):
+                self.errors += 1
+            os.unlink(path)
+            raise
+
+        self.downloads += 1
+        self.bytes_downloaded += size
+        logger.debug(f"Downloaded {size} bytes from {url.split('?')[0]}")
+        return path
+
+    async def fetch_head(self, url: str) -> Tuple[bytes, Optional[int]]:
+        """
+        First HEAD_BYTES of a URL and the full size when the server reports
+        it. Uses a Range request; servers that ignore Range are cut off after
+        HEAD_BYTES.
+        """
+        head = bytearray()
+        total = None
+        try:
+            async with self._client.stream("GET", url, headers={"Range": f"bytes=0-{self.HEAD_BYTES - 1}"}) as response:
+                response.raise_for_status()
+                if response.status_code == 206:
+                    # Content-Range: bytes 0-65535/1234567
+                    size = response.headers.get("content-range", "").rpartition("/")[2]
+                    total = int(size) if size.isdigit() else None
+                else:
+                    declared = response.headers.get("content-length")
+                    total = int(declared) if declared is not None and declared.isdigit() else None
+                async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                    head += chunk
+                    if len(head) >= self.HEAD_BYTES:
+                        break
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+
+        self.head_reads += 1
+        self.bytes_downloaded += len(head)
+        return bytes(head[:self.HEAD_BYTES]), total
+
+    def object_url(self, key: str, bucket: Optional[str] = None) -> str:
+        """Presigned GET URL for a MinIO/S3 object (computed locally, no request made)"""
+        return self._s3_client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket or settings.STORAGE_BUCKET, "Key": key},
+            ExpiresIn=300
+        )
+
+    def _s3_client(self):
+        if self._s3 is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is not installed, object keys are unavailable")
+            self._s3 = boto3.client(
+                "s3",
+                endpoint_url=settings.STORAGE_ENDPOINT,
+                aws_access_key_id=settings.STORAGE_ACCESS_KEY,
+                aws_secret_access_key=settings.STORAGE_SECRET_KEY,
+                region_name="us-east-1",
+                config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"})
+            )
+        return self._s3
+
+    def stats(self) -> Dict[str, Any]:
+        """Return download counters"""
+        return {
+            "max_bytes": self.max_bytes,
+            "downloads": self.downloads,
+            "head_reads": self.head_reads,
+            "bytes_downloaded": self.bytes_downloaded,
+            "rejected_too_large": self.rejected_too_large,
+            "errors": self.errors
+        }
+
+    async def close(self):
+        """Close pooled connections"""
+        await self._client.aclose()
+
+
+_fetcher: Optional[AudioFetcher] = None
+
+
+def get_fetcher() -> AudioFetcher:
+    """Get the pooled audio downloader (singleton pattern)"""
+    global _fetcher
+
+    if _fetcher is None:
+        _fetcher = AudioFetcher(
+            max_bytes=settings.DOWNLOAD_MAX_BYTES,
+            timeout=settings.DOWNLOAD_TIMEOUT_SECONDS,
+            max_connections=settings.DOWNLOAD_MAX_CONNECTIONS,
+            max_keepalive=settings.DOWNLOAD_KEEPALIVE_CONNECTIONS
+        )
+    return _fetcher
+
+
+async def shutdown_fetcher():
+    """Close the downloader's pooled connections"""
+    global _fetcher
+
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
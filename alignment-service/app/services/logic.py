@@ -3,81 +3,58 @@ Alignment Service Logic - Real Phoneme Forced Alignment
 
 This module performs phoneme-level forced alignment using:
 - g2p_en for grapheme-to-phoneme conversion (ARPAbet)
-- Audio duration analysis
+- wav2vec2 phoneme posteriors + CTC Viterbi (app.services.acoustic)
 - Word boundary constraints from ASR timestamps
+- Uniform distribution within words when no audio is available
 """
 
+import asyncio
 import logging
 import os
-import requests
-import tempfile
-import re
-import librosa
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Optional, Union
+
+import numpy as np
 from app.core.config import settings
-from app.schemas.request_response import Phoneme, AlignmentResponse, WordInput
+from app.schemas.request_response import WordInput
+from app.services.acoustic import SAMPLE_RATE, WordSpan, align_words, phoneme_posteriors
+from app.services.fetch import get_fetcher, header_duration
+from app.services.pronunciation import get_resolver
+from app.services.serialize import PhonemeTrack
 
 logger = logging.getLogger(__name__)
 
-# Global G2P model
-_G2P = None
-
-
-def get_g2p():
-    """Load the grapheme-to-phoneme model (g2p_en)."""
-    global _G2P
-    if _G2P is None:
-        try:
-            from g2p_en import G2p
-            _G2P = G2p()
-            logger.info("G2P model loaded successfully")
-        except ImportError as e:
-            logger.error("g2p_en not installed. Install with: pip install g2p_en")
-            raise RuntimeError("g2p_en not available") from e
-    return _G2P
+try:
+    from shared.utils.audio_cache import DecodedAudioCache
+except ImportError:
+    # shared/ is copied into the image; without it audio is always fetched and decoded here
+    DecodedAudioCache = None
+    logger.warning("shared.utils.audio_cache not importable, decoded audio cache disabled")
 
 
 def word_to_phonemes(word: str) -> List[str]:
     """
-    Convert a word to its ARPAbet phoneme sequence using g2p_en.
+    Convert a word to its ARPAbet phoneme sequence.
+    
+    CMUdict (and the optional site lexicon) is checked first; other words go
+    through g2p_en, memoized. See app.services.pronunciation.
     
     Returns list of phoneme symbols (without stress markers for simplicity).
     Example: "hello" -> ["HH", "AH", "L", "OW"]
     """
-    g2p = get_g2p()
-    
-    # Clean the word - keep only alphabetic characters
-    clean_word = re.sub(r'[^a-zA-Z]', '', word.lower())
-    if not clean_word:
-        return []
-    
-    # Get phonemes from g2p_en
-    phonemes_raw = g2p(clean_word)
-    
-    # Filter out spaces and clean up stress markers
-    phonemes = []
-    for p in phonemes_raw:
-        p = p.strip()
-        if not p or p == ' ':
-            continue
-        # Remove stress markers (0, 1, 2) from vowels for cleaner output
-        # but keep them if you want stress info
-        p_clean = re.sub(r'[0-9]', '', p)
-        if p_clean:
-            phonemes.append(p_clean.upper())
-    
-    return phonemes
+    return get_resolver().resolve(word)
 
 
 def distribute_phonemes_in_word(
+    track: PhonemeTrack,
     word: str,
     word_start: float,
     word_end: float,
     phonemes: List[str]
-) -> List[Phoneme]:
+):
     """
-    Distribute phonemes evenly within the word's time boundaries.
+    Distribute phonemes evenly within the word's time boundaries, appending
+    them to `track`.
     
     This is a simple but effective approach when we have word boundaries
     but not frame-level alignment data. Phonemes are distributed proportionally.
@@ -86,7 +63,7 @@ def distribute_phonemes_in_word(
     phoneme durations based on acoustic features.
     """
     if not phonemes:
-        return []
+        return
     
     word_duration = word_end - word_start
     if word_duration <= 0:
@@ -96,7 +73,7 @@ def distribute_phonemes_in_word(
     num_phonemes = len(phonemes)
     phoneme_duration = word_duration / num_phonemes
     
-    result = []
+    word_index = track.add_word(word)
     current_time = word_start
     
     for i, phoneme_symbol in enumerate(phonemes):
@@ -108,21 +85,17 @@ def distribute_phonemes_in_word(
         if i == num_phonemes - 1:
             end = word_end
         
-        result.append(Phoneme(
-            symbol=phoneme_symbol,
-            word=word,
-            start=round(start, 4),
-            end=round(end, 4),
-            confidence=0.9  # High confidence when using word boundaries
-        ))
+        # High confidence when using word boundaries
+        track.add(phoneme_symbol, word_index, start, end, 0.9)
         
         current_time = end
-    
-    return result
 
 
 def get_audio_duration(audio_path: str) -> float:
     """Get the duration of an audio file in seconds using librosa."""
+    # Imported here: requests that carry their duration never need librosa
+    import librosa
+    
     try:
         duration = librosa.get_duration(path=audio_path)
         return duration
@@ -141,7 +114,7 @@ def align_with_word_boundaries(
     transcript: str,
     words: List[WordInput],
     audio_duration: float
-) -> List[Phoneme]:
+) -> PhonemeTrack:
     """
     Perform phoneme alignment using word boundaries from ASR.
     
@@ -153,7 +126,7 @@ def align_with_word_boundaries(
     logger.info(f"Aligning transcript: '{transcript}'")
     logger.info(f"Number of words with timestamps: {len(words)}")
     
-    all_phonemes = []
+    track = PhonemeTrack(audio_duration)
     
     for word_info in words:
         word = word_info.word
@@ -178,25 +151,103 @@ def align_with_word_boundaries(
             continue
         
         # Distribute phonemes within word boundaries
-        word_phonemes = distribute_phonemes_in_word(
+        distribute_phonemes_in_word(
+            track,
             word=word,
             word_start=word_start,
             word_end=word_end,
             phonemes=phonemes
         )
-        
-        all_phonemes.extend(word_phonemes)
     
-    logger.info(f"Total phonemes generated: {len(all_phonemes)}")
+    logger.info(f"Total phonemes generated: {len(track)}")
     logger.info(f"Audio duration: {audio_duration:.3f}s")
     
-    return all_phonemes
+    return track
+
+
+def needs_audio_samples() -> bool:
+    """Whether alignment uses the audio itself (otherwise only its duration)"""
+    return settings.ACOUSTIC_ALIGNMENT_ENABLED and not settings.MOCK_MODE
+
+
+_decoded_cache = None
+
+
+def cached_audio(req) -> Optional[np.ndarray]:
+    """
+    Decoded 16kHz audio that asr-service left in the shared cache for this
+    request (by audio_cache_key, else content_hash), or None.
+    """
+    global _decoded_cache
+    
+    key = req.audio_cache_key or req.content_hash
+    if not key or not settings.DECODED_AUDIO_CACHE_DIR or DecodedAudioCache is None:
+        return None
+    if req.sample_rate is not None and req.sample_rate != SAMPLE_RATE:
+        return None
+    if _decoded_cache is None:
+        _decoded_cache = DecodedAudioCache(settings.DECODED_AUDIO_CACHE_DIR)
+    return _decoded_cache.get(key)
+
+
+def align_acoustic(
+    audio: Union[str, np.ndarray],
+    transcript: str,
+    words: Optional[List[WordInput]],
+    audio_duration: float
+) -> Optional[PhonemeTrack]:
+    """
+    Acoustic phoneme alignment against the audio.
+    
+    `audio` is a file path or already-decoded 16kHz samples. Phoneme
+    posteriors are computed once for the utterance and every word's
+    phonemes are placed by CTC Viterbi, within the word's ASR time window
+    when word timestamps are given. Returns None when acoustic alignment is
+    disabled, the model is unavailable or the phonemes do not fit the audio,
+    so the caller can fall back to uniform distribution.
+    """
+    if not needs_audio_samples():
+        return None
+    
+    spans = []
+    if words:
+        for word_info in words:
+            word_start = max(0.0, word_info.start)
+            word_end = min(audio_duration, word_info.end)
+            if word_start >= word_end:
+                logger.warning(f"Skipping word '{word_info.word}' with invalid timing: {word_start} - {word_end}")
+                continue
+            spans.append(WordSpan(word_info.word, word_to_phonemes(word_info.word), word_start, word_end))
+    else:
+        spans = [WordSpan(word, word_to_phonemes(word)) for word in transcript.split()]
+    spans = [span for span in spans if span.phonemes]
+    
+    try:
+        if isinstance(audio, str):
+            import librosa
+            audio, _ = librosa.load(audio, sr=SAMPLE_RATE, mono=True)
+        log_probs, frame_seconds = phoneme_posteriors(audio)
+        aligned = align_words(log_probs, frame_seconds, spans, settings.ACOUSTIC_BAND_SECONDS)
+    except Exception as e:
+        logger.warning(f"Acoustic alignment unavailable, using uniform distribution: {e}")
+        return None
+    
+    if aligned is None:
+        logger.warning("Phonemes do not fit the audio, using uniform distribution")
+        return None
+    
+    logger.info(f"Acoustically aligned {len(aligned)} phonemes over {len(log_probs)} frames")
+    track = PhonemeTrack(audio_duration)
+    word_indices = [track.add_word(span.word) for span in spans]
+    for symbol, span_index, start, end, confidence in aligned:
+        track.add(symbol, word_indices[span_index], start, end, confidence)
+    return track
 
 
 def align_transcript_only(
     transcript: str,
     audio_duration: float
-) -> List[Phoneme]:
+) -> PhonemeTrack:
     """
     Fallback alignment when no word boundaries are provided.
     
@@ -204,10 +255,12 @@ def align_transcript_only(
     """
     logger.info(f"Aligning transcript without word boundaries: '{transcript}'")
     
+    track = PhonemeTrack(audio_duration)
+    
     # Split transcript into words
     words = transcript.split()
     if not words:
-        return []
+        return track
     
     # Get phoneme count for each word to distribute time proportionally
     word_phonemes_map = []
@@ -223,12 +276,11 @@ def align_transcript_only(
         total_phoneme_count += len(phonemes) if phonemes else 1
     
     if total_phoneme_count == 0:
-        return []
+        return track
     
     # Distribute time based on phoneme count
     time_per_phoneme = audio_duration / total_phoneme_count
     current_time = 0.0
-    all_phonemes = []
     
     for entry in word_phonemes_map:
         word = entry['word']
@@ -237,38 +289,41 @@ def align_transcript_only(
         if not phonemes:
             continue
         
-        word_start = current_time
-        word_duration = len(phonemes) * time_per_phoneme
+        word_index = track.add_word(word)
         
-        for i, phoneme_symbol in enumerate(phonemes):
+        for phoneme_symbol in phonemes:
             start = current_time
             end = current_time + time_per_phoneme
             
-            all_phonemes.append(Phoneme(
-                symbol=phoneme_symbol,
-                word=word,
-                start=round(start, 4),
-                end=round(end, 4),
-                confidence=0.7  # Lower confidence without word boundaries
-            ))
+            # Lower confidence without word boundaries
+            track.add(phoneme_symbol, word_index, start, end, 0.7)
             
             current_time = end
     
-    logger.info(f"Total phonemes generated: {len(all_phonemes)}")
+    logger.info(f"Total phonemes generated: {len(track)}")
     logger.info(f"Audio duration: {audio_duration:.3f}s")
     
-    return all_phonemes
+    return track
+
+
+def request_words(req) -> List[str]:
+    """Words of a request whose pronunciations alignment will need"""
+    return [w.word for w in req.words] if req.words else req.transcript.split()
 
 
-async def run_service_logic(req) -> Dict[str, Any]:
+async def run_service_logic(req, resolve_pronunciations: bool = True) -> PhonemeTrack:
     """
     Main entry point for alignment service.
     
-    1. Download/Load Audio
-    2. Get audio duration
+    `resolve_pronunciations=False` skips the up-front pronunciation pass when
+    the caller already resolved the request's words (e.g. a whole batch).
+    
+    1. Get audio duration (and samples, for acoustic alignment) from upstream
+       metadata / the shared decoded-audio cache, or by fetching the audio
+    2. Resolve pronunciations
     3. Perform phoneme alignment using word boundaries (if provided)
        or fall back to transcript-only alignment
-    4. Return phoneme timestamps
+    4. Return phoneme timestamps as a PhonemeTrack (see serialize.render)
     """
     logger.info("=" * 50)
     logger.info("ALIGNMENT SERVICE - Processing Request")
@@ -281,27 +336,52 @@ async def run_service_logic(req) -> Dict[str, Any]:
     audio_duration = 0.0
     
     try:
-        # 1. Determine audio duration - either from audio_url or from word timestamps
-        if hasattr(req, "audio_url") and req.audio_url:
-            logger.info(f"Downloading audio from: {req.audio_url}")
-            
-            # Handle local file paths
-            if os.path.exists(req.audio_url):
+        # 1. Determine audio duration - from upstream metadata, the audio or word timestamps
+        samples = None
+        source_url = None
+        header_seconds = None
+        if needs_audio_samples():
+            # Decoded by asr-service already: no download, no decode
+            samples = cached_audio(req)
+            if samples is not None:
+                logger.info("Using decoded audio from the shared cache")
+        
+        # Skip the audio altogether when upstream metadata covers what we need
+        if samples is None and (req.duration is None or needs_audio_samples()):
+            if req.object_key:
+                logger.info(f"Fetching audio object: {req.bucket or settings.STORAGE_BUCKET}/{req.object_key}")
+                source_url = get_fetcher().object_url(req.object_key, req.bucket)
+            elif req.audio_url and os.path.exists(req.audio_url):
+                # Handle local file paths
                 user_audio_path = req.audio_url
                 logger.info("Using local audio file")
-            else:
-                # Download from URL
-                resp = requests.get(req.audio_url, timeout=30)
-                resp.raise_for_status()
-                
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                    tmp.write(resp.content)
-                    user_audio_path = tmp.name
-                    is_temp_file = True
-                    logger.info(f"Audio downloaded to: {user_audio_path}")
-            
+            elif req.audio_url:
+                logger.info(f"Downloading audio from: {req.audio_url}")
+                source_url = req.audio_url
+        
+        if source_url and not needs_audio_samples():
+            # Only the duration is needed: read it from the file header
+            head, size_bytes = await get_fetcher().fetch_head(source_url)
+            header_seconds = header_duration(head, size_bytes)
+            if header_seconds is not None:
+                source_url = None
+        
+        if source_url:
+            user_audio_path = await get_fetcher().fetch_to_file(source_url)
+            is_temp_file = True
+            logger.info(f"Audio downloaded to: {user_audio_path}")
+        
+        if req.duration is not None:
+            audio_duration = req.duration
+            logger.info(f"Using duration from upstream: {audio_duration:.3f}s")
+        elif samples is not None:
+            audio_duration = len(samples) / SAMPLE_RATE
+        elif user_audio_path:
             # Get audio duration from file
-            audio_duration = get_audio_duration(user_audio_path)
+            audio_duration = await asyncio.to_thread(get_audio_duration, user_audio_path)
+        elif header_seconds is not None:
+            audio_duration = header_seconds
+            logger.info(f"Duration read from audio header: {audio_duration:.3f}s")
         elif req.words and len(req.words) > 0:
             # No audio URL but we have word timestamps - compute duration from words
             audio_duration = max(w.end for w in req.words) if req.words else 0.0
@@ -315,32 +395,45 @@ async def run_service_logic(req) -> Dict[str, Any]:
         
         logger.info(f"Audio duration: {audio_duration:.3f} seconds")
         
-        # 2. Perform alignment
-        if req.words and len(req.words) > 0:
+        # 2. Resolve every word's pronunciation up front so OOV words go
+        #    through G2P as one batch; the aligners below then hit the cache
+        if resolve_pronunciations:
+            await asyncio.to_thread(get_resolver().resolve_many, request_words(req))
+        
+        # 3. Perform alignment: acoustic when we have audio, uniform otherwise
+        phonemes = None
+        if samples is not None or user_audio_path:
+            phonemes = await asyncio.to_thread(
+                align_acoustic,
+                samples if samples is not None else user_audio_path,
+                req.transcript,
+                req.words,
+                audio_duration
+            )
+        
+        if phonemes is None and req.words and len(req.words) > 0:
             # Use word boundaries for accurate alignment
             phonemes = align_with_word_boundaries(
                 transcript=req.transcript,
                 words=req.words,
                 audio_duration=audio_duration
             )
-        else:
+        elif phonemes is None:
             # Fall back to transcript-only alignment
             phonemes = align_transcript_only(
                 transcript=req.transcript,
                 audio_duration=audio_duration
             )
         
-        # 3. Build response
+        # 4. Return the track; the endpoint encodes it
+        phonemes.duration = audio_duration
         logger.info("=" * 50)
         logger.info(f"ALIGNMENT COMPLETE")
         logger.info(f"Phonemes generated: {len(phonemes)}")
         logger.info(f"Duration: {audio_duration:.3f}s")
         logger.info("=" * 50)
         
-        return AlignmentResponse(
-            phonemes=phonemes,
-            duration=round(audio_duration, 4)
-        )
+        return phonemes
     
     except Exception as e:
         logger.error(f"Alignment processing error: {e}")
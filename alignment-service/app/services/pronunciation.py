@@ -0,0 +1,212 @@
+"""
+Alignment Service Pronunciation - Word to ARPAbet resolution
+
+Words are looked up in a preloaded lexicon (CMUdict as shipped with g2p_en,
+plus an optional site lexicon) before falling back to the neural g2p_en
+model, whose results are memoized in a bounded LRU. Out-of-vocabulary words
+of a request are predicted together in one batched pass
+(shared.utils.g2p_batch). Stress digits are stripped once when an entry is
+stored, not per lookup.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from shared.utils.g2p_batch import g2p_batch
+except ImportError:
+    # shared/ is copied into the image; without it OOV words are predicted one by one
+    g2p_batch = None
+    logger.warning("shared.utils.g2p_batch not importable, G2P batching disabled")
+
+_NON_ALPHA = re.compile(r"[^a-z]")
+_STRIP_STRESS = str.maketrans("", "", "012")
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase and keep only the letters of a word"""
+    return _NON_ALPHA.sub("", word.lower())
+
+
+def clean_pronunciation(phonemes) -> Tuple[str, ...]:
+    """Drop separators and stress markers: ["HH", "AH0", " "] -> ("HH", "AH")"""
+    cleaned = (p.strip().translate(_STRIP_STRESS).upper() for p in phonemes)
+    return tuple(p for p in cleaned if p)
+
+
+def load_lexicon_file(path: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Read a CMUdict-format lexicon ("WORD  P1 P2 ..." per line, ";;;" comments).
+    Only the first pronunciation of a word is kept.
+    """
+    lexicon: Dict[str, Tuple[str, ...]] = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip() or line.startswith(";;;"):
+                continue
+            word, *phonemes = line.split()
+            # Alternates are written WORD(2)
+            word = normalize_word(word.split("(", 1)[0])
+            if word and phonemes and word not in lexicon:
+                lexicon[word] = clean_pronunciation(phonemes)
+    return lexicon
+
+
+class PronunciationResolver:
+    """
+    Lexicon-first pronunciation lookup with a memoized G2P fallback.
+
+    Args:
+        g2p: A g2p_en.G2p instance
+        lexicon: Word -> stress-free phonemes, checked before the model
+        max_entries: Maximum G2P results kept in the LRU
+    """
+
+    def __init__(self, g2p, lexicon: Dict[str, Tuple[str, ...]], max_entries: int = 50000):
+        self.g2p = g2p
+        self.lexicon = lexicon
+        self.max_entries = max(1, max_entries)
+        self._cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.lexicon_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(self, word: str) -> List[str]:
+        """ARPAbet phonemes without stress markers; [] for words with no letters"""
+        return self.resolve_many([word])[0]
+
+    def resolve_many(self, words: List[str]) -> List[List[str]]:
+        """
+        resolve() for a list of words, with every word missing from the
+        lexicon and cache predicted in a single G2P batch.
+        """
+        results: List[Optional[Tuple[str, ...]]] = [None] * len(words)
+        missing: Dict[str, List[int]] = {}
+
+        for i, word in enumerate(words):
+            clean_word = normalize_word(word)
+            if not clean_word:
+                results[i] = ()
+                continue
+            phonemes = self.lexicon.get(clean_word)
+            if phonemes is not None:
+                self.lexicon_hits += 1
+                results[i] = phonemes
+            else:
+                missing.setdefault(clean_word, []).append(i)
+
+        if missing:
+            with self._lock:
+                for clean_word in list(missing):
+                    phonemes = self._cache.get(clean_word)
+                    if phonemes is not None:
+                        self._cache.move_to_end(clean_word)
+                        self.cache_hits += len(missing[clean_word])
+                        for i in missing.pop(clean_word):
+                            results[i] = phonemes
+                self.misses += len(missing)
+
+        if missing:
+            # Model call outside the lock; a concurrent miss on the same word
+            # just computes it twice
+            if g2p_batch is not None:
+                raw = g2p_batch(self.g2p, list(missing))
+            else:
+                raw = [self.g2p(clean_word) for clean_word in missing]
+            predicted = [clean_pronunciation(p) for p in raw]
+            with self._lock:
+                for (clean_word, positions), phonemes in zip(missing.items(), predicted):
+                    self._cache[clean_word] = phonemes
+                    self._cache.move_to_end(clean_word)
+                    for i in positions:
+                        results[i] = phonemes
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+
+        return [list(phonemes) for phonemes in results]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return lexicon/cache hit, miss and eviction counters"""
+        lookups = self.lexicon_hits + self.cache_hits + self.misses
+        return {
+            "lexicon_entries": len(self.lexicon),
+            "cache_entries": len(self._cache),
+            "max_entries": self.max_entries,
+            "lexicon_hits": self.lexicon_hits,
+            "cache_hits": self.cache_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.lexicon_hits + self.cache_hits) / lookups, 3) if lookups else 0.0
+        }
+
+
+_G2P = None
+_resolver: Optional[PronunciationResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_g2p():
+    """Load the grapheme-to-phoneme model (g2p_en)."""
+    global _G2P
+    if _G2P is None:
+        try:
+            from g2p_en import G2p
+            _G2P = G2p()
+            logger.info("G2P model loaded successfully")
+        except ImportError as e:
+            logger.error("g2p_en not installed. Install with: pip install g2p_en")
+            raise RuntimeError("g2p_en not available") from e
+    return _G2P
+
+
+def build_lexicon(g2p) -> Dict[str, Tuple[str, ...]]:
+    """
+    CMUdict as loaded by g2p_en, overlaid with PRONUNCIATION_LEXICON_PATH.
+
+    Homographs are left out: g2p_en picks their reading from a POS tag, so
+    they go through the model (and its cache) to keep the same output.
+    """
+    homographs = set(getattr(g2p, "homograph2features", {}))
+    lexicon = {
+        word: clean_pronunciation(prons[0])
+        for word, prons in getattr(g2p, "cmu", {}).items()
+        if prons and word.isalpha() and word not in homographs
+    }
+    if settings.PRONUNCIATION_LEXICON_PATH:
+        extra = load_lexicon_file(settings.PRONUNCIATION_LEXICON_PATH)
+        lexicon.update(extra)
+        logger.info(f"Loaded {len(extra)} entries from {settings.PRONUNCIATION_LEXICON_PATH}")
+    return lexicon
+
+
+def get_resolver() -> PronunciationResolver:
+    """Build the pronunciation resolver (singleton; loads g2p_en and the lexicon)"""
+    global _resolver
+
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                g2p = get_g2p()
+                lexicon = build_lexicon(g2p)
+                _resolver = PronunciationResolver(g2p, lexicon, settings.PRONUNCIATION_CACHE_SIZE)
+                logger.info(f"Pronunciation lexicon ready ({len(lexicon)} words)")
+    return _resolver
+
+
+def pronunciation_stats() -> Dict[str, Any]:
+    """Resolver stats, or a not-loaded marker before the first lookup"""
+    if _resolver is None:
+        return {"loaded": False}
+    return {"loaded": True, **_resolver.stats()}
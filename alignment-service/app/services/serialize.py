@@ -0,0 +1,103 @@
+"""
+Alignment Service Serialize - Phoneme tracks and response encoding
+
+Aligners append phonemes to a PhonemeTrack (parallel lists, no per-phoneme
+objects). Responses are encoded straight from those lists with orjson, so
+FastAPI never builds or re-validates thousands of Phoneme models.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.warning("orjson not installed, alignment responses use the json module")
+
+# Decimals kept for times and confidences in responses
+PRECISION = 4
+
+
+class PhonemeTrack:
+    """
+    Aligned phonemes as parallel lists.
+
+    `word_index` points into `words`, which holds one entry per aligned word
+    occurrence (so repeated words stay distinct).
+    """
+
+    __slots__ = ("words", "symbols", "word_index", "starts", "ends", "confidences", "duration")
+
+    def __init__(self, duration: float = 0.0):
+        self.words: List[str] = []
+        self.symbols: List[str] = []
+        self.word_index: List[int] = []
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.confidences: List[float] = []
+        self.duration = duration
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def add_word(self, word: str) -> int:
+        """Register a word occurrence; returns its index for add()"""
+        self.words.append(word)
+        return len(self.words) - 1
+
+    def add(self, symbol: str, word_index: int, start: float, end: float, confidence: float):
+        self.symbols.append(symbol)
+        self.word_index.append(word_index)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.confidences.append(confidence)
+
+    def _rounded(self, values: List[float]) -> List[float]:
+        return np.round(np.asarray(values, dtype=np.float64), PRECISION).tolist()
+
+    def to_rows(self) -> Dict[str, Any]:
+        """AlignmentResponse payload: one object per phoneme"""
+        words = self.words
+        rows = [
+            {"symbol": symbol, "word": words[index], "start": start, "end": end, "confidence": confidence}
+            for symbol, index, start, end, confidence in zip(
+                self.symbols,
+                self.word_index,
+                self._rounded(self.starts),
+                self._rounded(self.ends),
+                self._rounded(self.confidences)
+            )
+        ]
+        return {"phonemes": rows, "duration": round(self.duration, PRECISION)}
+
+    def to_columns(self) -> Dict[str, Any]:
+        """AlignmentColumnarResponse payload: parallel arrays"""
+        return {
+            "symbols": self.symbols,
+            "starts": self._rounded(self.starts),
+            "ends": self._rounded(self.ends),
+            "confidences": self._rounded(self.confidences),
+            "word_index": self.word_index,
+            "words": self.words,
+            "duration": round(self.duration, PRECISION)
+        }
+
+
+def dumps(payload: Any) -> bytes:
+    """JSON-encode a payload (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def render(track: PhonemeTrack, response_format: Optional[str] = "json") -> Response:
+    """Encode a track as the json (default) or columnar response"""
+    payload = track.to_columns() if response_format == "columnar" else track.to_rows()
+    return Response(content=dumps(payload), media_type="application/json")
@@ -0,0 +1,110 @@
+"""
+Alignment Service Acoustic Benchmark
+Real-time factor of acoustic phoneme alignment on CPU: wav2vec2 phoneme
+posteriors plus the banded CTC Viterbi pass, against the clip duration.
+Alignment has to run faster than real time (RTF < 1) on 30s clips.
+
+    python benchmark_acoustic.py [clip seconds...]
+    python benchmark_acoustic.py --viterbi-only [clip seconds...]
+
+--viterbi-only times the Viterbi pass on synthetic emissions and needs no
+model download.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.acoustic import SAMPLE_RATE, WordSpan, align_words, phoneme_posteriors, viterbi_ctc
+
+WORDS_PER_SECOND = 2.5
+SYMBOLS = ["HH", "AH", "L", "OW", "W", "ER", "D", "IY"]
+PHONEMES_PER_WORD = 4
+FRAMES_PER_SECOND = 50  # wav2vec2 frame rate
+
+
+def synthetic_clip(seconds: float) -> np.ndarray:
+    """Amplitude-modulated tones with noise; timing only, not recognition quality"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * WORDS_PER_SECOND * t)
+    tone = np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 660 * t)
+    return (0.2 * envelope * tone + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def synthetic_words(seconds: float):
+    """Evenly spaced words with ASR-style time windows"""
+    count = int(seconds * WORDS_PER_SECOND)
+    step = seconds / count
+    return [
+        WordSpan(
+            f"word{i}",
+            [SYMBOLS[(i * PHONEMES_PER_WORD + k) % len(SYMBOLS)] for k in range(PHONEMES_PER_WORD)],
+            i * step,
+            (i + 1) * step
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    """Best-of-`repeat` seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def viterbi_seconds(seconds: float) -> float:
+    """Time the banded Viterbi pass alone on random emissions"""
+    rng = np.random.default_rng(0)
+    n_frames = int(seconds * FRAMES_PER_SECOND)
+    n_labels = int(seconds * WORDS_PER_SECOND) * PHONEMES_PER_WORD
+    emissions = np.log(rng.dirichlet(np.ones(n_labels + 1), size=n_frames)).astype(np.float32)
+
+    # Each label may move one word's length around its uniform position
+    centre = (np.arange(n_labels) + 0.5) * n_frames / n_labels
+    slack = n_frames / n_labels * PHONEMES_PER_WORD
+    lo = np.maximum(0, centre - slack).astype(np.int64)
+    hi = np.minimum(n_frames - 1, centre + slack).astype(np.int64)
+    labels = [k % len(SYMBOLS) for k in range(n_labels)]
+    return best_of(lambda: viterbi_ctc(emissions, labels, lo, hi))
+
+
+def main():
+    args = sys.argv[1:]
+    viterbi_only = "--viterbi-only" in args
+    durations = [float(arg) for arg in args if arg != "--viterbi-only"] or [5.0, 10.0, 30.0]
+
+    if viterbi_only:
+        print(f"{'seconds':>8} {'viterbi s':>10} {'RTF':>7}")
+        for seconds in durations:
+            elapsed = viterbi_seconds(seconds)
+            print(f"{seconds:>8.1f} {elapsed:>10.3f} {elapsed / seconds:>7.3f}")
+        return
+
+    # The requirement is for CPU serving
+    settings.DEVICE = "cpu"
+    phoneme_posteriors(synthetic_clip(1.0))  # load the model outside the timings
+
+    print(f"model: {settings.PHONEME_MODEL_NAME} on cpu")
+    print(f"{'seconds':>8} {'posteriors s':>13} {'viterbi s':>10} {'total s':>8} {'RTF':>7} {'real time':>10}")
+    for seconds in durations:
+        audio = synthetic_clip(seconds)
+        spans = synthetic_words(seconds)
+        posteriors = best_of(lambda: phoneme_posteriors(audio))
+        log_probs, frame_seconds = phoneme_posteriors(audio)
+        viterbi = best_of(lambda: align_words(log_probs, frame_seconds, spans, settings.ACOUSTIC_BAND_SECONDS))
+        total = posteriors + viterbi
+        print(
+            f"{seconds:>8.1f} {posteriors:>13.3f} {viterbi:>10.3f} {total:>8.3f}"
+            f" {total / seconds:>7.3f} {'faster' if total < seconds else 'SLOWER':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Alignment Service Response Benchmark
+Per-phoneme cost of building and encoding /alignment/process responses:
+the previous path (Phoneme models + round() per field, then FastAPI's
+response_model validation and JSON encoding) against PhonemeTrack + orjson.
+
+    python benchmark_response.py [phoneme counts...]
+"""
+
+import json
+import sys
+import time
+
+from pydantic import TypeAdapter
+
+from app.schemas.request_response import AlignmentResponse, Phoneme
+from app.services.serialize import PhonemeTrack, orjson, render
+
+PHONEMES_PER_WORD = 4
+SYMBOLS = ["HH", "AH", "L", "OW", "W", "ER", "D", "IY"]
+
+
+def models_path(count: int) -> bytes:
+    """What the endpoint did before: models in the aligner, validation in FastAPI"""
+    phonemes = []
+    for i in range(count):
+        start = i * 0.0731
+        phonemes.append(Phoneme(
+            symbol=SYMBOLS[i % len(SYMBOLS)],
+            word=f"word{i // PHONEMES_PER_WORD}",
+            start=round(start, 4),
+            end=round(start + 0.0731, 4),
+            confidence=0.9
+        ))
+    response = AlignmentResponse(phonemes=phonemes, duration=round(count * 0.0731, 4))
+
+    # FastAPI with response_model: dump, re-validate, serialize, json.dumps
+    adapter = TypeAdapter(AlignmentResponse)
+    value = adapter.validate_python(response.model_dump())
+    return json.dumps(adapter.dump_python(value, mode="json")).encode()
+
+
+def build_track(count: int) -> PhonemeTrack:
+    track = PhonemeTrack(count * 0.0731)
+    word_index = -1
+    for i in range(count):
+        if i % PHONEMES_PER_WORD == 0:
+            word_index = track.add_word(f"word{i // PHONEMES_PER_WORD}")
+        start = i * 0.0731
+        track.add(SYMBOLS[i % len(SYMBOLS)], word_index, start, start + 0.0731, 0.9)
+    return track
+
+
+def track_path(count: int) -> bytes:
+    return render(build_track(count), "json").body
+
+
+def columnar_path(count: int) -> bytes:
+    return render(build_track(count), "columnar").body
+
+
+def measure(fn, count: int, repeat: int = 5) -> float:
+    """Best-of-`repeat` microseconds per phoneme"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(count)
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+
+    # Both paths must produce the same JSON document
+    assert json.loads(models_path(50)) == json.loads(track_path(50))
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'phonemes':>9} {'models us/ph':>13} {'track us/ph':>12} {'columnar us/ph':>15} {'speedup':>8} {'json KB':>8} {'columnar KB':>12}")
+    for count in counts:
+        before = measure(models_path, count)
+        after = measure(track_path, count)
+        columnar = measure(columnar_path, count)
+        print(
+            f"{count:>9} {before:>13.2f} {after:>12.2f} {columnar:>15.2f} {before / after:>7.1f}x"
+            f" {len(track_path(count)) / 1024:>8.1f} {len(columnar_path(count)) / 1024:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
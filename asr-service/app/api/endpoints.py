@@ -3,29 +3,69 @@ ASR Service API Endpoints
 Supports both file upload and audio URL processing
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, Literal, Optional, Union
+import json
 import logging
 
-from app.services.logic import run_service_logic, is_model_loaded, get_gpu_info
+from app.services.logic import (
+    run_service_logic,
+    is_model_loaded,
+    get_gpu_info,
+    get_batcher,
+    get_executor,
+    get_cache,
+    get_align_registry,
+    loaded_models,
+    get_fetcher,
+    get_readiness,
+    to_columnar
+)
+from app.services.router import routable_models
+from app.services.decode import decode_counts
+from app.services.probe import probe_counts
+from app.services.executor import ExecutorSaturatedError
+from app.services.fetch import AudioTooLargeError
+from app.services.quality import AudioQualityError
+from app.services.streaming import StreamSession
+from app.services.bulk import transcribe_many, error_status
 from app.schemas.request_response import (
     ASRRequest,
     ASRResponse,
+    ASRColumnarResponse,
+    ASRBatchRequest,
+    ASRBatchResult,
     HealthResponse,
-    ErrorResponse
+    ErrorResponse,
+    RerecordResponse,
+    StreamMessage
 )
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+ResponseFormat = Literal["json", "columnar"]
+
+
+def build_response(result: Dict[str, Any], response_format: str = "json", include_segments: bool = True):
+    """Shape a transcription payload into the requested response format"""
+    if response_format == "columnar":
+        return ASRColumnarResponse(**to_columnar(result, include_segments))
+    if not include_segments:
+        result = {**result, "segments": None}
+    return ASRResponse(**result)
+
 
 @router.post(
     "/process",
-    response_model=ASRResponse,
+    response_model=Union[ASRColumnarResponse, ASRResponse],
     responses={
         400: {"model": ErrorResponse, "description": "Bad Request"},
+        413: {"model": ErrorResponse, "description": "Audio file too large"},
+        422: {"model": RerecordResponse, "description": "Recording too quiet, clipped or noisy; re-record (under detail)"},
+        429: {"model": ErrorResponse, "description": "Service at capacity, see Retry-After"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"}
     },
     summary="Process Audio File",
@@ -33,7 +73,12 @@ router = APIRouter()
 )
 async def process_audio_file(
     file: UploadFile = File(..., description="Audio file to transcribe"),
-    language: Optional[str] = Form(None, description="Language code (e.g., 'en'). Auto-detect if not provided")
+    language: Optional[str] = Form(None, description="Language code (e.g., 'en'). Auto-detect if not provided"),
+    accuracy: Optional[str] = Form(None, description="Accuracy tier for model routing: fast, balanced or accurate"),
+    include_timings: bool = Form(False, description="Return per-stage timings in the response"),
+    target_text: Optional[str] = Form(None, description="Script the speaker was asked to read; enables forced-alignment scoring"),
+    response_format: ResponseFormat = Query("json", alias="format", description="json, or columnar for parallel word/segment arrays"),
+    include_segments: bool = Query(True, description="Set false to drop segments (words are always returned)")
 ):
     """
     Process uploaded audio file and return transcription with word timestamps.
@@ -52,9 +97,26 @@ async def process_audio_file(
                     detail=f"Unsupported audio format: {ext}. Supported: {settings.SUPPORTED_AUDIO_FORMATS}"
                 )
         
-        result = await run_service_logic(file=file, language=language)
-        return ASRResponse(**result)
+        result = await run_service_logic(
+            file=file,
+            language=language,
+            accuracy=accuracy,
+            include_timings=include_timings,
+            target_text=target_text
+        )
+        return build_response(result, response_format, include_segments)
         
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except AudioTooLargeError as e:
+        logger.warning(f"Upload rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioQualityError as e:
+        raise HTTPException(status_code=422, detail=e.result)
     except ValueError as e:
         logger.warning(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -68,30 +130,55 @@ async def process_audio_file(
 
 @router.post(
     "/url",
-    response_model=ASRResponse,
+    response_model=Union[ASRColumnarResponse, ASRResponse],
     responses={
         400: {"model": ErrorResponse, "description": "Bad Request"},
+        413: {"model": ErrorResponse, "description": "Audio file too large"},
+        422: {"model": RerecordResponse, "description": "Recording too quiet, clipped or noisy; re-record (under detail)"},
+        429: {"model": ErrorResponse, "description": "Service at capacity, see Retry-After"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"}
     },
     summary="Process Audio URL",
-    description="Transcribe audio from a URL with word-level timestamps"
+    description="Transcribe audio from a URL or MinIO/S3 object key with word-level timestamps"
 )
-async def process_audio_url(request: ASRRequest):
+async def process_audio_url(
+    request: ASRRequest,
+    response_format: ResponseFormat = Query("json", alias="format", description="json, or columnar for parallel word/segment arrays"),
+    include_segments: bool = Query(True, description="Set false to drop segments (words are always returned)")
+):
     """
     Process audio file from URL and return transcription with word timestamps.
     
-    The audio file will be downloaded and processed.
+    The audio file will be downloaded and processed. Internal callers can pass
+    `object_key` (and optionally `bucket`) to read straight from MinIO/S3.
     Supported formats: wav, mp3, m4a, webm, ogg, flac
     """
     try:
-        logger.info(f"Processing audio from URL: {request.audio_url}, language: {request.language}")
+        source = request.audio_url or f"{request.bucket or settings.STORAGE_BUCKET}/{request.object_key}"
+        logger.info(f"Processing audio from: {source}, language: {request.language}")
         
         result = await run_service_logic(
-            audio_url=str(request.audio_url),
-            language=request.language
+            audio_url=str(request.audio_url) if request.audio_url else None,
+            object_key=request.object_key,
+            bucket=request.bucket,
+            language=request.language,
+            accuracy=request.accuracy,
+            include_timings=request.include_timings,
+            target_text=request.target_text
         )
-        return ASRResponse(**result)
+        return build_response(result, response_format, include_segments)
         
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except AudioTooLargeError as e:
+        logger.warning(f"Download rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioQualityError as e:
+        raise HTTPException(status_code=422, detail=e.result)
     except ValueError as e:
         logger.warning(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -103,6 +190,147 @@ async def process_audio_url(request: ASRRequest):
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
 
+@router.post(
+    "/batch",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One ASRBatchResult JSON object per line, in completion order"
+        },
+        400: {"model": ErrorResponse, "description": "Bad Request"}
+    },
+    summary="Batch Transcription",
+    description="Transcribe many audio URLs / MinIO object keys, streaming NDJSON results as they complete"
+)
+async def process_batch(
+    request: ASRBatchRequest,
+    response_format: ResponseFormat = Query("json", alias="format", description="json, or columnar for parallel word/segment arrays"),
+    include_segments: bool = Query(True, description="Set false to drop segments (words are always returned)")
+):
+    """
+    Bulk transcription for re-scoring jobs.
+    
+    Items are downloaded, decoded and transcribed concurrently (up to
+    BULK_CONCURRENCY at a time, sharing micro-batched model calls) and wait
+    for capacity instead of receiving 429. Each finished item is streamed
+    back immediately as one NDJSON line carrying its request `index`, the
+    caller's `id`, and either `result` or `error` with the status code the
+    item would have had on /asr/url.
+    """
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items ({len(request.items)}). Maximum per request: {settings.BULK_MAX_ITEMS}"
+        )
+    
+    items = [
+        {
+            "audio_url": str(item.audio_url) if item.audio_url else None,
+            "object_key": item.object_key,
+            "bucket": item.bucket,
+            "language": item.language or request.language,
+            "accuracy": item.accuracy or request.accuracy,
+            "target_text": item.target_text
+        }
+        for item in request.items
+    ]
+    include_timings = request.include_timings or any(item.include_timings for item in request.items)
+    logger.info(f"Processing batch of {len(items)} item(s), concurrency {settings.BULK_CONCURRENCY}")
+    
+    async def results():
+        failed = 0
+        async for index, result, error in transcribe_many(items, settings.BULK_CONCURRENCY, include_timings):
+            item = request.items[index]
+            if error is None:
+                line = ASRBatchResult(
+                    index=index,
+                    id=item.id,
+                    status="ok",
+                    status_code=200,
+                    result=build_response(result, response_format, include_segments)
+                )
+            else:
+                failed += 1
+                logger.warning(f"Batch item {index} failed: {str(error)}")
+                line = ASRBatchResult(
+                    index=index,
+                    id=item.id,
+                    status="error",
+                    status_code=error_status(error),
+                    error=str(error),
+                    rerecord=error.result if isinstance(error, AudioQualityError) else None
+                )
+            yield line.model_dump_json() + "\n"
+        logger.info(f"Batch complete: {len(items) - failed} succeeded, {failed} failed")
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.websocket("/stream")
+async def stream_audio(
+    websocket: WebSocket,
+    language: Optional[str] = None,
+    encoding: str = "pcm_s16le",
+    sample_rate: int = 16000
+):
+    """
+    Streaming transcription over WebSocket.
+    
+    Send audio as binary frames (pcm_s16le / pcm_f32le at `sample_rate`, or
+    webm / ogg Opus fragments from MediaRecorder) and a text frame
+    `{"event": "end"}` when the recording stops. The server pushes
+    `partial` and `final` segment messages while audio arrives and a
+    `done` message with the full transcript at the end.
+    """
+    await websocket.accept()
+    
+    async def send(message: dict):
+        await websocket.send_json(StreamMessage(**message).model_dump(exclude_none=True))
+    
+    try:
+        session = StreamSession(language=language, encoding=encoding, sample_rate=sample_rate)
+    except ValueError as e:
+        await send({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    
+    logger.info(f"Stream opened: encoding={encoding}, sample_rate={sample_rate}, language={language}")
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info("Stream client disconnected before end of stream")
+                return
+            
+            if message.get("bytes"):
+                for event in await session.feed(message["bytes"]):
+                    await send(event)
+            elif message.get("text"):
+                control = json.loads(message["text"])
+                if control.get("event") == "end":
+                    break
+        
+        for event in await session.finish():
+            await send(event)
+        await websocket.close()
+        logger.info(f"Stream complete: {len(session.segments)} segment(s), {session.duration:.2f}s")
+    
+    except WebSocketDisconnect:
+        logger.info("Stream client disconnected")
+    except (ValueError, json.JSONDecodeError) as e:
+        logger.warning(f"Stream validation error: {str(e)}")
+        await send({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+    except Exception as e:
+        logger.exception("Unexpected error during streaming transcription")
+        await send({"type": "error", "detail": f"Transcription failed: {str(e)}"})
+        await websocket.close(code=1011)
+    finally:
+        await session.close()
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
@@ -145,12 +373,33 @@ async def service_info():
     return {
         "service": settings.SERVICE_NAME,
         "version": settings.SERVICE_VERSION,
+        "startup": get_readiness(),
         "model": {
             "name": settings.WHISPER_MODEL,
             "loaded": is_model_loaded(),
             "compute_type": settings.compute_type,
             "batch_size": settings.WHISPER_BATCH_SIZE
         },
+        "routing": {
+            "models": routable_models(),
+            "loaded": loaded_models(),
+            "short_clip_seconds": settings.ROUTER_SHORT_CLIP_SECONDS,
+            "long_clip_seconds": settings.ROUTER_LONG_CLIP_SECONDS,
+            "load_shed_threshold": settings.ROUTER_LOAD_SHED_THRESHOLD
+        },
+        "batching": {
+            "enabled": settings.BATCH_ENABLED,
+            **get_batcher().stats()
+        },
+        "executor": get_executor().stats(),
+        "alignment_models": get_align_registry().stats(),
+        "decode": dict(decode_counts),
+        "probe_rejections": dict(probe_counts),
+        "downloads": get_fetcher().stats(),
+        "cache": {
+            "enabled": settings.CACHE_ENABLED,
+            **get_cache().stats()
+        },
         "device": {
             "type": settings.DEVICE,
             "cuda_available": torch.cuda.is_available(),
@@ -160,6 +409,7 @@ async def service_info():
         },
         "config": {
             "max_audio_duration": settings.MAX_AUDIO_DURATION_SECONDS,
+            "max_upload_bytes": settings.UPLOAD_MAX_BYTES,
             "supported_formats": settings.SUPPORTED_AUDIO_FORMATS,
             "default_language": settings.WHISPER_LANGUAGE,
             "mock_mode": settings.MOCK_MODE
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+import os
 import torch
 
 
@@ -17,6 +18,39 @@ class Settings(BaseSettings):
     WHISPER_BATCH_SIZE: int = 16  # Reduce if running out of GPU memory
     WHISPER_LANGUAGE: Optional[str] = "en"  # Set to None for auto-detect
     
+    # Model routing: extra Whisper models kept loaded alongside WHISPER_MODEL,
+    # picked per request by duration, accuracy tier and load
+    WHISPER_MODELS: list = []  # e.g. ["tiny", "small"]
+    ROUTER_SHORT_CLIP_SECONDS: float = 5.0  # Shorter clips use the smallest model
+    ROUTER_LONG_CLIP_SECONDS: float = 30.0  # Longer clips use the largest model
+    ROUTER_LOAD_SHED_THRESHOLD: int = 16  # Requests in flight before stepping down a size
+    
+    # Request-level micro-batching (clips from concurrent requests share a model call)
+    BATCH_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8  # Max clips per model call
+    BATCH_MAX_WAIT_MS: int = 20  # Max time the first clip waits for the batch to fill
+    
+    # Inference executor (blocking decode/model work runs off the event loop)
+    INFERENCE_WORKERS: int = 2  # Worker threads; model calls share one lock-guarded model
+    INFERENCE_MAX_PENDING: int = 32  # Requests in flight before returning 429
+    
+    # Multi-process serving (gunicorn.conf.py): CPU alignment weights are loaded
+    # once pre-fork and shared copy-on-write by WORKERS processes
+    WORKERS: int = 1
+    INTRA_OP_THREADS: int = 0  # torch/CTranslate2 threads per worker (0 = cores // WORKERS)
+    
+    # Bulk transcription (/asr/batch)
+    BULK_MAX_ITEMS: int = 1000  # Items accepted per request
+    BULK_CONCURRENCY: int = 8  # Items of one request in flight at once; the rest wait for capacity
+    
+    # Alignment models (wav2vec2, one per language)
+    ALIGN_MODEL_MEMORY_BUDGET_MB: int = 2048  # LRU eviction once resident models exceed this
+    ALIGN_PRELOAD_LANGUAGES: list = ["en"]  # Loaded at startup, e.g. ["en", "es", "hi"]
+    
+    # Startup warmup: a synthetic clip runs through every model before /ready passes
+    WARMUP_ENABLED: bool = True
+    WARMUP_SECONDS: float = 2.0
+    
     # Device Configuration
     DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
     
@@ -30,14 +64,71 @@ class Settings(BaseSettings):
     STORAGE_BUCKET: str = "audio-files"
     STORAGE_SECURE: bool = False
     
+    # Audio downloads (/asr/url): one pooled keep-alive client, streamed bodies
+    DOWNLOAD_MAX_BYTES: int = 100 * 1024 * 1024  # Larger downloads are aborted with 413
+    DOWNLOAD_TIMEOUT_SECONDS: float = 60.0
+    DOWNLOAD_MAX_CONNECTIONS: int = 32
+    DOWNLOAD_KEEPALIVE_CONNECTIONS: int = 16  # Idle connections kept open for reuse
+    
     # Redis Configuration
     REDIS_URL: str = "redis://redis:6379/0"
     
+    # Transcription result cache (keyed by decoded audio + model settings)
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 512  # In-memory LRU size
+    CACHE_REDIS_ENABLED: bool = False  # Share cached results across replicas via REDIS_URL
+    CACHE_TTL_SECONDS: int = 86400  # Expiry for Redis entries
+    
+    # Recording quality gate: near-silent, clipped or noise-only audio is answered
+    # with 422 + re-record guidance instead of being transcribed
+    QUALITY_GATE_ENABLED: bool = True
+    QUALITY_MIN_SPEECH_DBFS: float = -40.0  # Loud frames (95th percentile) must reach this level
+    QUALITY_MAX_CLIPPING_RATIO: float = 0.01  # Fraction of samples at full scale
+    QUALITY_MIN_SNR_DB: float = 10.0  # Speech level over the estimated noise floor
+    QUALITY_MIN_SPEECH_RATIO: float = 0.1  # Fraction of frames that carry speech
+    
+    # Decoded audio shared with alignment-service: 16kHz samples are written to
+    # this directory (a volume mounted in both) and the key is returned as
+    # audio_cache_key. Empty disables it
+    DECODED_AUDIO_CACHE_DIR: str = ""
+    DECODED_AUDIO_CACHE_MAX_MB: int = 2048  # Least recently used files are deleted past this
+    
     # Audio Processing
-    MAX_AUDIO_DURATION_SECONDS: int = 600  # 10 minutes max
+    MAX_AUDIO_DURATION_SECONDS: int = 600  # 10 minutes max; checked from headers before decode when possible
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024  # Larger uploads are rejected with 413
     SUPPORTED_AUDIO_FORMATS: list = ["wav", "mp3", "m4a", "webm", "ogg", "flac"]
     TEMP_DIR: str = "/tmp/asr_temp"
     
+    # Long-form transcription: recordings of at least LONGFORM_MIN_SECONDS are
+    # cut at VAD silence gaps into overlapping chunks transcribed in parallel
+    LONGFORM_ENABLED: bool = True
+    LONGFORM_MIN_SECONDS: float = 60.0
+    LONGFORM_CHUNK_SECONDS: float = 30.0  # Max chunk length before overlap
+    LONGFORM_OVERLAP_SECONDS: float = 1.0  # Audio shared with each neighbouring chunk
+    LONGFORM_PROCESS_WORKERS: int = 0  # CPU only: worker processes with their own model copy (0 = in-process)
+    
+    # Scripted drills: when the caller sends target_text, CTC forced alignment of
+    # that text replaces Whisper decoding; off-script speech falls back to decode
+    SCRIPTED_ALIGNMENT_ENABLED: bool = True
+    SCRIPTED_MIN_SCORE: float = 0.4  # Mean word alignment score needed to accept the script
+    SCRIPTED_MIN_COVERAGE: float = 0.8  # Fraction of script words that must be aligned
+    SCRIPTED_MAX_SECONDS: float = 120.0  # Longer clips are always decoded
+    
+    # Voice activity detection (energy based)
+    VAD_TRIM_ENABLED: bool = True  # Decode only speech regions, remap timestamps afterwards
+    VAD_FRAME_MS: int = 30
+    VAD_ENERGY_THRESHOLD_DB: float = -45.0  # Minimum frame energy (dBFS) treated as speech
+    VAD_NOISE_MARGIN_DB: float = 10.0  # Speech must sit this far above the estimated noise floor
+    VAD_SPEECH_RANGE_DB: float = 25.0  # ...but speech this far below the loud frames always counts
+    VAD_PADDING_MS: int = 200  # Audio kept around each speech region
+    VAD_MIN_SILENCE_MS: int = 300  # Shorter pauses are kept inside a region
+    VAD_MIN_SPEECH_MS: int = 100  # Shorter regions are treated as noise
+    
+    # Streaming transcription (/asr/stream)
+    STREAM_ENDPOINT_SILENCE_MS: int = 600  # Trailing silence that closes a segment
+    STREAM_PARTIAL_INTERVAL_MS: int = 1000  # New audio between partial hypotheses
+    STREAM_MAX_SEGMENT_SECONDS: float = 20.0  # Force-close long segments
+    
     # Model Cache
     MODEL_CACHE_DIR: str = "/models_cache"
     
@@ -54,6 +145,13 @@ class Settings(BaseSettings):
         if self.DEVICE == "cpu":
             return "int8"
         return self.WHISPER_COMPUTE_TYPE
+    
+    @property
+    def intra_op_threads(self) -> int:
+        """Compute threads per worker process, so workers don't oversubscribe cores"""
+        if self.INTRA_OP_THREADS > 0:
+            return self.INTRA_OP_THREADS
+        return max(1, (os.cpu_count() or 1) // max(1, self.WORKERS))
 
 
 settings = Settings()
@@ -66,6 +164,7 @@ def log_config():
     print(f"   Device: {settings.DEVICE}")
     print(f"   Compute Type: {settings.compute_type}")
     print(f"   Mock Mode: {settings.MOCK_MODE}")
+    print(f"   Workers: {settings.WORKERS} x {settings.intra_op_threads} thread(s)")
     print(f"   CUDA Available: {torch.cuda.is_available()}")
     if torch.cuda.is_available():
         print(f"   GPU: {torch.cuda.get_device_name(0)}")
@@ -25,14 +25,28 @@ except ImportError:
     pass
 # ============================================================
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from app.api.endpoints import router
 from app.core.config import settings, log_config
-from app.services.logic import get_model, is_model_loaded
+from app.services.logic import (
+    configure_threads,
+    warm_start,
+    is_model_loaded,
+    is_ready,
+    get_readiness,
+    shutdown_batcher,
+    shutdown_executor,
+    shutdown_cache,
+    shutdown_fetcher,
+    shutdown_chunk_pool
+)
+from app.services.metrics import render_metrics
 
 # Configure standard logging
 logging.basicConfig(
@@ -46,28 +60,27 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events.
-    Preloads the WhisperX model on startup.
+    Loads and warms up all models in the background; /ready returns 503
+    until that finishes while /health already answers.
     """
     # Startup
     logger.info("Starting ASR Service...")
     log_config()
     
-    # Preload model (non-blocking in mock mode)
-    if not settings.MOCK_MODE:
-        try:
-            logger.info("Preloading WhisperX model...")
-            get_model()
-            logger.info("WhisperX model preloaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to preload model: {str(e)}")
-            # Don't fail startup - service can still work in degraded mode
-    else:
+    if settings.MOCK_MODE:
         logger.info("Running in MOCK_MODE - model not loaded")
+    configure_threads()
+    app.state.warmup = asyncio.create_task(asyncio.to_thread(warm_start))
     
     yield
     
     # Shutdown
     logger.info("Shutting down ASR Service...")
+    await shutdown_batcher()
+    shutdown_executor()
+    await shutdown_cache()
+    await shutdown_fetcher()
+    shutdown_chunk_pool()
 
 
 # Create FastAPI application
@@ -107,9 +120,26 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """
+    Reject uploads whose Content-Length is over UPLOAD_MAX_BYTES before the
+    multipart body is read and spooled to a temp file.
+    """
+    declared = request.headers.get("content-length")
+    # Allow for the multipart boundaries and form fields around the file
+    if declared is not None and declared.isdigit() and int(declared) > settings.UPLOAD_MAX_BYTES + 64 * 1024:
+        limit_mb = settings.UPLOAD_MAX_BYTES / 1024 / 1024
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body ({int(declared) / 1024 / 1024:.1f} MB) exceeds maximum allowed ({limit_mb:.0f} MB)"}
+        )
+    return await call_next(request)
+
+
 @app.get("/health", tags=["Health"])
 def health():
-    """Basic health check endpoint"""
+    """Liveness check; answers while models are still loading (see /ready)"""
     return {
         "status": "ok" if is_model_loaded() else "degraded",
         "service": settings.SERVICE_NAME,
@@ -117,6 +147,23 @@ def health():
     }
 
 
+@app.get("/ready", tags=["Health"])
+def ready():
+    """
+    Readiness probe: 503 until every configured model is loaded and warmed up,
+    so orchestration does not route traffic to a cold replica.
+    """
+    readiness = get_readiness()
+    return JSONResponse(status_code=200 if is_ready() else 503, content=readiness)
+
+
+@app.get("/metrics", tags=["Health"])
+def metrics():
+    """Prometheus metrics: stage timings, queue waits, model loads, audio seconds"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/", tags=["Root"])
 def root():
     """Root endpoint with service info"""
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from typing import Dict, List, Literal, Optional, Union
 from enum import Enum
 
 
@@ -25,10 +25,22 @@ class Segment(BaseModel):
     words: List[Word] = Field(default_factory=list, description="Words in this segment")
 
 
+class VADSummary(BaseModel):
+    """How much of the recording was decoded after silence trimming"""
+    speech_duration: float = Field(..., description="Seconds of audio sent to the model")
+    skipped_duration: float = Field(..., description="Seconds of silence skipped before decoding")
+    regions: int = Field(..., description="Number of speech regions decoded")
+
+
 class ASRRequest(BaseModel):
-    """Request model for ASR processing via URL"""
-    audio_url: HttpUrl = Field(..., description="URL of the audio file to transcribe")
+    """Request model for ASR processing via URL or MinIO/S3 object key"""
+    audio_url: Optional[HttpUrl] = Field(None, description="URL of the audio file to transcribe")
+    object_key: Optional[str] = Field(None, description="MinIO/S3 object key of the audio file (instead of audio_url)")
+    bucket: Optional[str] = Field(None, description="Bucket for object_key. Defaults to STORAGE_BUCKET")
     language: Optional[str] = Field(None, description="Language code (e.g., 'en'). Auto-detect if not provided")
+    accuracy: Optional[Literal["fast", "balanced", "accurate"]] = Field(None, description="Accuracy tier used for model routing")
+    include_timings: bool = Field(False, description="Return per-stage timings in the response")
+    target_text: Optional[str] = Field(None, description="Script the speaker was asked to read; enables forced-alignment scoring")
     
     class Config:
         json_schema_extra = {
@@ -37,6 +49,12 @@ class ASRRequest(BaseModel):
                 "language": "en"
             }
         }
+    
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.audio_url is None) == (self.object_key is None):
+            raise ValueError("Provide exactly one of audio_url or object_key")
+        return self
 
 
 class ASRResponse(BaseModel):
@@ -48,6 +66,23 @@ class ASRResponse(BaseModel):
     duration: Optional[float] = Field(None, description="Audio duration in seconds")
     model_used: Optional[str] = Field(None, description="WhisperX model used for transcription")
     processing_time: Optional[float] = Field(None, description="Processing time in seconds")
+    vad: Optional[VADSummary] = Field(None, description="Silence trimming summary (when VAD trimming is enabled)")
+    cached: Optional[bool] = Field(None, description="True when served from the transcription cache")
+    mode: Optional[Literal["decode", "forced_alignment"]] = Field(
+        None,
+        description="decode: Whisper transcription; forced_alignment: target_text aligned without decoding"
+    )
+    script_score: Optional[float] = Field(None, description="Mean alignment score of target_text against the audio (0-1)")
+    quality: Optional[Dict[str, Optional[float]]] = Field(
+        None,
+        description="Recording quality metrics (levels in dBFS, clipping_ratio, snr_db, speech_ratio)"
+    )
+    content_hash: Optional[str] = Field(None, description="Hash of the decoded 16kHz audio (when DECODED_AUDIO_CACHE_DIR is set)")
+    audio_cache_key: Optional[str] = Field(None, description="Key of the decoded audio in the shared cache, for alignment-service")
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Seconds per stage (upload, probe, decode, quality, share, cache, vad, queue, transcribe, align, serialize), when requested"
+    )
     
     class Config:
         json_schema_extra = {
@@ -69,6 +104,109 @@ class ASRResponse(BaseModel):
         }
 
 
+class ColumnarWords(BaseModel):
+    """Word timestamps as parallel arrays (one entry per word)"""
+    word: List[str] = Field(default_factory=list, description="Transcribed words")
+    start: List[float] = Field(default_factory=list, description="Start times in seconds")
+    end: List[float] = Field(default_factory=list, description="End times in seconds")
+    confidence: List[Optional[float]] = Field(default_factory=list, description="Confidence scores (0-1)")
+
+
+class ColumnarSegments(BaseModel):
+    """Segments as parallel arrays; segment i spans words[word_offsets[i]:word_offsets[i + 1]]"""
+    text: List[str] = Field(default_factory=list, description="Segment texts")
+    start: List[float] = Field(default_factory=list, description="Segment start times in seconds")
+    end: List[float] = Field(default_factory=list, description="Segment end times in seconds")
+    word_offsets: List[int] = Field(default_factory=lambda: [0], description="Index of each segment's first word, plus the total word count")
+
+
+class ASRColumnarResponse(ASRResponse):
+    """Compact ASR response (?format=columnar): words and segments as parallel arrays"""
+    words: ColumnarWords = Field(default_factory=ColumnarWords, description="Word timestamps as parallel arrays")
+    segments: Optional[ColumnarSegments] = Field(None, description="Segments as parallel arrays (omitted with include_segments=false)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "transcript": "Hello, this is a test.",
+                "words": {
+                    "word": ["Hello", "this", "is", "a", "test"],
+                    "start": [0.0, 0.6, 0.9, 1.1, 1.3],
+                    "end": [0.5, 0.8, 1.0, 1.2, 1.6],
+                    "confidence": [0.98, 0.95, 0.97, 0.92, 0.99]
+                },
+                "segments": {
+                    "text": ["Hello, this is a test."],
+                    "start": [0.0],
+                    "end": [1.6],
+                    "word_offsets": [0, 5]
+                },
+                "language": "en",
+                "duration": 2.0,
+                "model_used": "base",
+                "processing_time": 0.84
+            }
+        }
+
+
+class StreamMessage(BaseModel):
+    """Message pushed to /asr/stream WebSocket clients"""
+    type: str = Field(..., description="Message type: partial, final, done or error")
+    segment_index: Optional[int] = Field(None, description="Index of the speech segment (partial/final)")
+    segment: Optional[Segment] = Field(None, description="Segment hypothesis with word timestamps (partial/final)")
+    transcript: Optional[str] = Field(None, description="Full transcript (done)")
+    words: Optional[List[Word]] = Field(None, description="All words with timestamps (done)")
+    segments: Optional[List[Segment]] = Field(None, description="All final segments (done)")
+    language: Optional[str] = Field(None, description="Transcription language (done)")
+    duration: Optional[float] = Field(None, description="Streamed audio duration in seconds (done)")
+    model_used: Optional[str] = Field(None, description="WhisperX model used for transcription (done)")
+    detail: Optional[str] = Field(None, description="Error detail (error)")
+    retry_after: Optional[int] = Field(None, description="Seconds to wait before reconnecting (error)")
+
+
+class ASRBatchItem(ASRRequest):
+    """One recording in a /asr/batch request"""
+    id: Optional[str] = Field(None, description="Caller-supplied identifier echoed back with the result")
+
+
+class ASRBatchRequest(BaseModel):
+    """Request model for bulk transcription (e.g. re-scoring archived recordings)"""
+    items: List[ASRBatchItem] = Field(..., min_length=1, description="Recordings to transcribe (audio_url or object_key each)")
+    language: Optional[str] = Field(None, description="Default language for items that do not set one")
+    accuracy: Optional[Literal["fast", "balanced", "accurate"]] = Field(None, description="Default accuracy tier for items that do not set one")
+    include_timings: bool = Field(False, description="Return per-stage timings with each result")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "rec-1", "object_key": "cohort-7/rec-1.webm"},
+                    {"id": "rec-2", "audio_url": "https://storage.example.com/audio/rec-2.wav", "language": "es"}
+                ],
+                "language": "en"
+            }
+        }
+
+
+class RerecordResponse(BaseModel):
+    """422 detail for a recording that failed the quality gate"""
+    status: Literal["rerecord"] = Field("rerecord", description="The user should record again")
+    issues: List[str] = Field(..., description="too_quiet, clipped, noisy and/or no_speech")
+    messages: List[str] = Field(..., description="One user-facing hint per issue")
+    quality: Dict[str, Optional[float]] = Field(..., description="Measured quality metrics (snr_db is null when the clip has no pauses)")
+
+
+class ASRBatchResult(BaseModel):
+    """One NDJSON line streamed back from /asr/batch, in completion order"""
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[str] = Field(None, description="Caller-supplied item identifier")
+    status: Literal["ok", "error"] = Field(..., description="Item outcome")
+    status_code: int = Field(..., description="HTTP status the item would have had on /asr/url")
+    result: Optional[Union[ASRColumnarResponse, ASRResponse]] = Field(None, description="Transcription (status ok)")
+    error: Optional[str] = Field(None, description="Error detail (status error)")
+    rerecord: Optional[RerecordResponse] = Field(None, description="Quality gate result (status_code 422)")
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str = Field(..., description="Service status")
@@ -0,0 +1,237 @@
+"""
+ASR Service Batching - Request-level micro-batching
+Collects clips from concurrent requests and transcribes them together
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.services.metrics import QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingClip:
+    """A decoded clip waiting to be transcribed"""
+    audio: Any
+    language: Optional[str]
+    model_name: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    dispatched_at: Optional[float] = None
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler.
+
+    The first clip to arrive opens a batching window. The window closes after
+    `max_wait_ms` or as soon as `max_batch_size` clips are collected, and the
+    whole batch is handed to `transcribe_fn` in one call. Batches run as
+    concurrent tasks, at most one per executor worker; while every worker is
+    busy new clips keep queueing, so under load the next window fills up
+    immediately.
+
+    Args:
+        transcribe_fn: Callable (audios, language, model_name) -> list of results, one per clip
+        max_batch_size: Maximum clips per model call
+        max_wait_ms: Maximum time the first clip in a window waits for company
+        executor: Optional InferenceExecutor to run batches on (default: a worker thread)
+        max_concurrent_batches: Batches in flight at once (default: the executor's workers, else 1)
+    """
+
+    def __init__(
+        self,
+        transcribe_fn: Callable[[List[Any], Optional[str], Optional[str]], List[Dict[str, Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: int = 20,
+        executor=None,
+        max_concurrent_batches: Optional[int] = None
+    ):
+        self._transcribe_fn = transcribe_fn
+        self._executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        if max_concurrent_batches is None:
+            max_concurrent_batches = executor.max_workers if executor is not None else 1
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+        # Stats
+        self.batches = 0
+        self.clips = 0
+        self.largest_batch = 0
+
+    def start(self):
+        """Start the collector task on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+            logger.info(
+                f"Micro-batcher started (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait * 1000:.0f}, "
+                f"max_concurrent_batches={self.max_concurrent_batches})"
+            )
+
+    async def stop(self):
+        """Stop the collector task, let running batches finish and fail clips that are still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                clip = self._queue.get_nowait()
+                if not clip.future.done():
+                    clip.future.set_exception(RuntimeError("ASR service is shutting down"))
+
+    async def submit(
+        self,
+        audio,
+        language: Optional[str] = None,
+        model_name: Optional[str] = None,
+        timer=None
+    ) -> Dict[str, Any]:
+        """
+        Queue a decoded clip and wait for its transcription result.
+
+        If a StageTimer is given, time spent waiting for the batch window is
+        recorded as "queue" and the model call as "transcribe".
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        clip = PendingClip(audio=audio, language=language, model_name=model_name, future=future)
+        await self._queue.put(clip)
+        try:
+            return await future
+        finally:
+            if timer is not None and clip.dispatched_at is not None:
+                timer.record("queue", clip.dispatched_at - clip.enqueued_at)
+                timer.record("transcribe", time.monotonic() - clip.dispatched_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batching counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": int(self.max_wait * 1000),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running_batches": len(self._dispatches),
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch
+        }
+
+    async def _collect(self) -> List[PendingClip]:
+        """Wait for the first clip, then gather more until the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Collector loop"""
+        while True:
+            # Open the next window only once a batch slot is free, so clips
+            # keep queueing (and batches grow) while every worker is busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # Drop clips whose requests were cancelled while waiting
+            batch = [clip for clip in batch if not clip.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            # A model call decodes one language with one model at a time
+            groups: Dict[tuple, List[PendingClip]] = {}
+            for clip in batch:
+                groups.setdefault((clip.model_name, clip.language), []).append(clip)
+
+            for index, ((model_name, language), clips) in enumerate(groups.items()):
+                if index > 0:
+                    try:
+                        await self._slots.acquire()
+                    except asyncio.CancelledError:
+                        for clip in clips:
+                            if not clip.future.done():
+                                clip.future.set_exception(RuntimeError("ASR service is shutting down"))
+                        raise
+                task = asyncio.get_running_loop().create_task(self._dispatch(clips, language, model_name))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._dispatches.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, clips: List[PendingClip], language: Optional[str], model_name: Optional[str]):
+        """Run one batch through the model off the event loop and resolve futures"""
+        self.batches += 1
+        self.clips += len(clips)
+        self.largest_batch = max(self.largest_batch, len(clips))
+
+        dispatched_at = time.monotonic()
+        for clip in clips:
+            clip.dispatched_at = dispatched_at
+            QUEUE_WAIT_SECONDS.labels(queue="batch").observe(dispatched_at - clip.enqueued_at)
+
+        waited_ms = (dispatched_at - clips[0].enqueued_at) * 1000
+        logger.info(
+            f"Dispatching batch of {len(clips)} clip(s), model={model_name}, language={language}, "
+            f"oldest waited {waited_ms:.1f}ms"
+        )
+
+        run = self._executor.run if self._executor is not None else asyncio.to_thread
+        try:
+            results = await run(
+                self._transcribe_fn,
+                [clip.audio for clip in clips],
+                language,
+                model_name
+            )
+        except Exception as e:
+            logger.error(f"Batched transcription failed: {str(e)}")
+            for clip in clips:
+                if not clip.future.done():
+                    clip.future.set_exception(e)
+            return
+
+        for clip, result in zip(clips, results):
+            if not clip.future.done():
+                clip.future.set_result(result)
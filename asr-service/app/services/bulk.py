@@ -0,0 +1,79 @@
+"""
+ASR Service Bulk - Batch transcription of many recordings
+Runs items concurrently through download -> decode -> micro-batched inference
+and yields results in completion order
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.fetch import AudioTooLargeError
+from app.services.quality import AudioQualityError
+from app.services.logic import run_service_logic
+
+logger = logging.getLogger(__name__)
+
+
+def error_status(error: Exception) -> int:
+    """HTTP status an item error would have had on /asr/url"""
+    if isinstance(error, AudioTooLargeError):
+        return 413
+    if isinstance(error, AudioQualityError):
+        return 422
+    if isinstance(error, ValueError):
+        return 400
+    return 500
+
+
+async def transcribe_many(
+    items: List[Dict[str, Any]],
+    concurrency: int,
+    include_timings: bool = False
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Transcribe items concurrently and yield (index, result, error) as each
+    one finishes.
+
+    At most `concurrency` items are in flight at once. While some items are
+    downloading or decoding, others sit in the micro-batcher, so the stages
+    overlap and concurrent clips share model calls. Items wait for executor
+    capacity instead of being rejected. Remaining items are cancelled if the
+    consumer stops iterating (e.g. the client disconnects).
+
+    Args:
+        items: Dicts with audio_url or object_key (+ bucket), language,
+            accuracy and target_text
+        concurrency: Maximum items in flight
+        include_timings: Attach per-stage timings to each result
+    """
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_item(index: int, item: Dict[str, Any]):
+        async with slots:
+            try:
+                result = await run_service_logic(
+                    audio_url=item.get("audio_url"),
+                    object_key=item.get("object_key"),
+                    bucket=item.get("bucket"),
+                    language=item.get("language"),
+                    accuracy=item.get("accuracy"),
+                    target_text=item.get("target_text"),
+                    include_timings=include_timings,
+                    wait_for_capacity=True
+                )
+                return index, result, None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.ensure_future(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"Bulk transcription stopped early, cancelled {len(pending)} item(s)")
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,154 @@
+"""
+ASR Service Cache - Content-addressed transcription result cache
+In-memory LRU with an optional shared Redis tier
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class TranscriptionCache:
+    """
+    Cache of ASR response payloads keyed by decoded audio content.
+
+    Lookups check the in-process LRU first, then Redis (when configured).
+    Redis hits are promoted into the LRU. Redis failures are logged and
+    treated as misses so the cache never fails a request.
+
+    Args:
+        max_entries: Maximum payloads kept in memory
+        redis_url: Redis connection URL for the shared tier (None disables it)
+        ttl_seconds: Expiry for Redis entries
+    """
+
+    KEY_PREFIX = "asr:transcript:"
+
+    def __init__(self, max_entries: int = 512, redis_url: Optional[str] = None, ttl_seconds: int = 86400):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        self._redis = None
+        if redis_url:
+            if aioredis is None:
+                logger.warning("redis package not installed, transcription cache is memory-only")
+            else:
+                self._redis = aioredis.from_url(redis_url)
+                logger.info("Transcription cache Redis tier enabled")
+
+        # Stats
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def make_key(audio, model: str, compute_type: str, language: Optional[str], variant: str = "") -> str:
+        """
+        Build a cache key from the decoded audio samples and every setting
+        that changes the transcription output.
+        """
+        return TranscriptionCache.make_keys(audio, [model], compute_type, language, variant)[0]
+
+    @staticmethod
+    def make_keys(
+        audio,
+        models: Sequence[str],
+        compute_type: str,
+        language: Optional[str],
+        variant: str = ""
+    ) -> List[str]:
+        """make_key() for each of several models, hashing the audio only once"""
+        audio_digest = hashlib.blake2b(digest_size=20)
+        audio_digest.update(memoryview(np.ascontiguousarray(audio)).cast("B"))
+        keys = []
+        for model in models:
+            digest = audio_digest.copy()
+            digest.update(f"|{model}|{compute_type}|{language or 'auto'}|{variant}".encode())
+            keys.append(digest.hexdigest())
+        return keys
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached payload or None"""
+        return await self.get_any([key])
+
+    async def get_any(self, keys: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """
+        Return the payload of the first cached key, or None. Counts as one
+        lookup in the stats however many keys are tried.
+        """
+        for key in keys:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+
+        if self._redis is not None:
+            for key in keys:
+                try:
+                    raw = await self._redis.get(self.KEY_PREFIX + key)
+                except Exception as e:
+                    self.redis_errors += 1
+                    logger.warning(f"Redis cache lookup failed: {str(e)}")
+                    break
+                if raw is not None:
+                    payload = json.loads(raw)
+                    self._remember(key, payload)
+                    self.redis_hits += 1
+                    return payload
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, payload: Dict[str, Any]):
+        """Store a payload in memory and in Redis"""
+        self._remember(key, payload)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.KEY_PREFIX + key, json.dumps(payload), ex=self.ttl_seconds)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache write failed: {str(e)}")
+
+    def _remember(self, key: str, payload: Dict[str, Any]):
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters"""
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "redis_enabled": self._redis is not None,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+            "hit_rate": round((self.hits + self.redis_hits) / lookups, 3) if lookups else 0.0
+        }
+
+    async def close(self):
+        """Close the Redis connection pool"""
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
@@ -0,0 +1,317 @@
+"""
+ASR Service Decode - In-memory audio decoding
+Turns uploaded/downloaded bytes into 16kHz mono float32 without temp files
+or ffmpeg subprocesses for the common formats
+"""
+
+import io
+import logging
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# Decoder backend usage, reported on /asr/info
+decode_counts: Counter = Counter()
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """Identify the container from its magic bytes"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[4:8] == b"ftyp":
+        return "m4a"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def _to_mono(audio: np.ndarray) -> np.ndarray:
+    """Downmix (frames, channels) to mono"""
+    if audio.ndim == 2:
+        return audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+    return audio
+
+
+def resample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Resample mono float32 audio to 16kHz"""
+    if sample_rate == SAMPLE_RATE or len(audio) == 0:
+        return audio
+    try:
+        import soxr
+        return soxr.resample(audio, sample_rate, SAMPLE_RATE).astype(np.float32, copy=False)
+    except ImportError:
+        return resample_linear(audio, sample_rate)
+
+
+def resample_linear(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Resample to 16kHz by linear interpolation (cheap, for streaming chunks)"""
+    if sample_rate == SAMPLE_RATE or len(audio) == 0:
+        return audio
+    n_out = int(round(len(audio) * SAMPLE_RATE / sample_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (sample_rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def decode_wav_pcm(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Parse a PCM16/float32 WAV by walking its RIFF chunks.
+
+    Samples are read with np.frombuffer directly over the request bytes; for
+    16kHz mono the int16 -> float32 conversion is the only copy made.
+    Returns None for encodings this parser does not handle.
+    """
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                format_tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            format_tag, channels, sample_rate, bits = fmt
+            if format_tag == _WAVE_FORMAT_PCM and bits == 16:
+                dtype = np.dtype("<i2")
+            elif format_tag == _WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                dtype = np.dtype("<f4")
+            else:
+                return None
+
+            # Streaming writers leave the data size as 0 or 0xFFFFFFFF
+            available = len(data) - body
+            size = chunk_size if 0 < chunk_size <= available else available
+            frames = size // (dtype.itemsize * channels)
+            samples = np.frombuffer(data, dtype=dtype, count=frames * channels, offset=body)
+
+            if dtype.kind == "i":
+                audio = samples.astype(np.float32) * (1.0 / 32768.0)
+            else:
+                audio = samples.astype(np.float32, copy=False)
+            if channels > 1:
+                audio = audio.reshape(frames, channels).mean(axis=1, dtype=np.float32)
+            return audio, sample_rate
+
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def decode_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode WAV/FLAC/OGG in-process with libsndfile"""
+    audio, sample_rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return _to_mono(audio), sample_rate
+
+
+def decode_pyav(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode compressed containers (webm/ogg Opus, m4a, mp3) in-process with PyAV"""
+    with av.open(io.BytesIO(data), mode="r") as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        chunks = []
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32), SAMPLE_RATE
+    return np.concatenate(chunks).astype(np.float32, copy=False), SAMPLE_RATE
+
+
+def decode_ffmpeg(data: bytes, suffix: str = ".wav") -> Tuple[np.ndarray, int]:
+    """
+    Last-resort decode through ffmpeg. Bytes are piped through stdin; formats
+    that need a seekable input (e.g. mp4 with a trailing moov atom) are
+    spooled to a temp file first.
+    """
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "0"]
+    output = ["-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+    process = subprocess.run(command + ["-i", "pipe:0"] + output, input=data, capture_output=True)
+    if process.returncode == 0 and process.stdout:
+        return np.frombuffer(process.stdout, dtype=np.float32), SAMPLE_RATE
+
+    os.makedirs(settings.TEMP_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.TEMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        process = subprocess.run(command + ["-i", path] + output, capture_output=True)
+    finally:
+        os.remove(path)
+
+    if process.returncode != 0:
+        raise ValueError(f"Could not decode audio: {process.stderr.decode(errors='ignore').strip()[-200:]}")
+    return np.frombuffer(process.stdout, dtype=np.float32), SAMPLE_RATE
+
+
+class ContainerDecoder:
+    """
+    Incremental in-process decoder for a growing webm/ogg Opus stream.
+
+    One PyAV demuxer, codec context and resampler live for the whole stream on
+    a background thread that reads from a buffer `feed()` appends to. Each
+    `feed()` waits until the demuxer has consumed the new bytes and returns
+    only the 16kHz samples they produced, so a chunk costs time proportional
+    to its own length. `close()` signals end of stream and flushes the rest.
+
+    Args:
+        fmt: Container format, webm or ogg
+    """
+
+    def __init__(self, fmt: str):
+        if av is None:
+            raise RuntimeError("PyAV is required to decode webm/ogg streams")
+
+        self.format = fmt
+        self._pending = bytearray()
+        self._samples: List[np.ndarray] = []
+        self._cond = threading.Condition()
+        self._eof = False
+        self._idle = False  # demuxer is blocked waiting for more bytes
+        self._done = False
+        self._error: Optional[Exception] = None
+
+        self._thread = threading.Thread(target=self._run, name="asr-stream-decode", daemon=True)
+        self._thread.start()
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Append container bytes and return the samples decoded from them"""
+        with self._cond:
+            self._pending.extend(data)
+            self._idle = False
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._idle or self._done)
+            return self._take()
+
+    def close(self) -> np.ndarray:
+        """End the stream and return the samples still buffered in the decoder"""
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._cond:
+            return self._take()
+
+    def read(self, size: int) -> bytes:
+        """File interface for the demuxer: block until bytes arrive or the stream ends"""
+        with self._cond:
+            while not self._pending and not self._eof:
+                self._idle = True
+                self._cond.notify_all()
+                self._cond.wait()
+            data = bytes(self._pending[:size])
+            del self._pending[:size]
+            return data
+
+    def _run(self):
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        try:
+            with av.open(self, mode="r", format=self.format) as container:
+                stream = container.streams.audio[0]
+                for frame in container.decode(stream):
+                    self._emit(resampler.resample(frame))
+            self._emit(resampler.resample(None))
+        except Exception as e:
+            # A truncated tail after end of stream is expected; anything else
+            # is surfaced on the next feed()
+            if not self._eof:
+                self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def _emit(self, frames):
+        chunks = [frame.to_ndarray().reshape(-1) for frame in frames]
+        if chunks:
+            with self._cond:
+                self._samples.extend(chunks)
+
+    def _take(self) -> np.ndarray:
+        if self._error is not None:
+            raise ValueError(f"Could not decode {self.format} stream: {str(self._error)}")
+        if not self._samples:
+            return np.zeros(0, dtype=np.float32)
+        samples = np.concatenate(self._samples).astype(np.float32, copy=False)
+        self._samples = []
+        return samples
+
+
+def decode_audio_bytes(data: bytes, filename: Optional[str] = None, fmt: Optional[str] = None) -> np.ndarray:
+    """
+    Decode audio bytes to a 16kHz mono float32 array.
+
+    Tries, in order: the zero-copy PCM WAV parser, libsndfile (WAV/FLAC/OGG),
+    PyAV (webm/ogg Opus, m4a, mp3), and finally ffmpeg. `fmt` is the
+    container already identified by the probe stage, if any.
+    """
+    if not data:
+        raise ValueError("Audio file is empty")
+
+    fmt = fmt or sniff_format(data)
+    suffix = os.path.splitext(filename or "")[1] or f".{fmt or 'wav'}"
+
+    if fmt == "wav":
+        decoded = decode_wav_pcm(data)
+        if decoded is not None:
+            decode_counts["wav_pcm"] += 1
+            return resample(*decoded)
+
+    if fmt in ("wav", "flac", "ogg") and soundfile is not None:
+        try:
+            audio, sample_rate = decode_soundfile(data)
+            decode_counts["soundfile"] += 1
+            return resample(audio, sample_rate)
+        except Exception as e:
+            logger.debug(f"libsndfile could not decode {fmt}: {str(e)}")
+
+    if av is not None:
+        try:
+            audio, sample_rate = decode_pyav(data)
+            decode_counts["pyav"] += 1
+            return resample(audio, sample_rate)
+        except Exception as e:
+            logger.debug(f"PyAV could not decode {fmt}: {str(e)}")
+
+    logger.info(f"Falling back to ffmpeg for {fmt or 'unknown'} audio")
+    audio, sample_rate = decode_ffmpeg(data, suffix)
+    decode_counts["ffmpeg"] += 1
+    return resample(audio, sample_rate)
@@ -0,0 +1,165 @@
+"""
+ASR Service Executor - Bounded inference executor
+Runs blocking decode/inference work off the event loop with admission control
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from app.services.metrics import IN_FLIGHT, QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the service already holds the maximum number of pending requests"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"ASR service is at capacity, retry after {retry_after}s")
+
+
+class InferenceExecutor:
+    """
+    Thread pool for blocking work (file I/O, ffmpeg decode, model inference).
+
+    Requests are admitted through `admission()`, which bounds the number of
+    requests in flight and rejects the rest with ExecutorSaturatedError instead
+    of letting the backlog grow without limit. Bulk callers can pass
+    `wait=True` to queue for a free slot instead. Work items submitted via
+    `run()` never reject; their queue wait is recorded for metrics.
+
+    Args:
+        max_workers: Number of worker threads
+        max_pending: Maximum admitted requests (running + queued)
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asr-inference")
+        self._lock = threading.Lock()
+
+        # Admission state (touched from the event loop only)
+        self._in_flight = 0
+        self._slot_freed: Optional[asyncio.Condition] = None
+
+        # Job state (touched from worker threads)
+        self._queued_jobs = 0
+        self._running_jobs = 0
+
+        # Stats
+        self.admitted = 0
+        self.rejected = 0
+        self.jobs_completed = 0
+        self._wait_times = deque(maxlen=512)
+        self._request_times = deque(maxlen=128)
+        self._max_wait = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently admitted"""
+        return self._in_flight
+
+    @asynccontextmanager
+    async def admission(self, wait: bool = False):
+        """
+        Admit a request or raise ExecutorSaturatedError when the queue is full.
+        With `wait`, block until a slot frees up instead of rejecting.
+        """
+        if self._in_flight >= self.max_pending:
+            if wait:
+                await self._wait_for_slot()
+            else:
+                self.rejected += 1
+                retry_after = self.retry_after()
+                logger.warning(f"Rejecting request: {self._in_flight} in flight, retry after {retry_after}s")
+                raise ExecutorSaturatedError(retry_after)
+
+        self._in_flight += 1
+        self.admitted += 1
+        IN_FLIGHT.inc()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            IN_FLIGHT.dec()
+            self._request_times.append(time.monotonic() - started)
+            if self._slot_freed is not None:
+                async with self._slot_freed:
+                    self._slot_freed.notify_all()
+
+    async def _wait_for_slot(self):
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(lambda: self._in_flight < self.max_pending)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the pool and await its result"""
+        enqueued = time.monotonic()
+        with self._lock:
+            self._queued_jobs += 1
+
+        def job():
+            wait = time.monotonic() - enqueued
+            with self._lock:
+                self._queued_jobs -= 1
+                self._running_jobs += 1
+                self._wait_times.append(wait)
+                self._max_wait = max(self._max_wait, wait)
+            QUEUE_WAIT_SECONDS.labels(queue="executor").observe(wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running_jobs -= 1
+                    self.jobs_completed += 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+
+    def retry_after(self) -> int:
+        """Estimate seconds until capacity frees up, from recent request latency"""
+        if not self._request_times:
+            return 1
+        avg_request = sum(self._request_times) / len(self._request_times)
+        estimate = avg_request * self._in_flight / self.max_workers
+        return min(60, max(1, math.ceil(estimate)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and wait-time metrics"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            queued_jobs = self._queued_jobs
+            running_jobs = self._running_jobs
+            max_wait = self._max_wait
+
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "queue_depth": queued_jobs,
+            "running": running_jobs,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "jobs_completed": self.jobs_completed,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p95": round(p95 * 1000, 2),
+                "max": round(max_wait * 1000, 2)
+            }
+        }
+
+    def shutdown(self):
+        """Stop accepting work and release worker threads"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,169 @@
+"""
+ASR Service Fetch - Pooled audio downloads
+Streams audio from HTTP URLs and MinIO/S3 object keys over one shared,
+keep-alive connection pool with an early size guard
+"""
+
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+except ImportError:
+    boto3 = None
+
+
+class AudioTooLargeError(ValueError):
+    """Raised when a download exceeds DOWNLOAD_MAX_BYTES"""
+
+    def __init__(self, max_bytes: int, size: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.size = size
+        limit_mb = max_bytes / 1024 / 1024
+        if size is not None:
+            message = f"Audio file ({size / 1024 / 1024:.1f} MB) exceeds maximum allowed ({limit_mb:.0f} MB)"
+        else:
+            message = f"Audio file exceeds maximum allowed ({limit_mb:.0f} MB)"
+        super().__init__(message)
+
+
+class AudioFetcher:
+    """
+    Shared downloader for URL and object-store audio.
+
+    One httpx.AsyncClient is reused for every request, so connections to the
+    same host (typically MinIO on the internal network) are kept alive
+    instead of re-doing TCP/TLS setup per clip. Bodies are streamed in
+    chunks; a Content-Length above `max_bytes` is rejected before reading,
+    and a body that grows past it is aborted mid-stream.
+
+    Object keys are turned into presigned GET URLs locally (no network call)
+    and fetched over the same pool. An optional `check_head` callback sees
+    the first HEAD_BYTES together with the declared size and can abort the
+    download by raising (e.g. when the audio headers show it is too long).
+
+    Args:
+        max_bytes: Largest download accepted
+        timeout: Per-request timeout in seconds
+        max_connections: Connection pool size
+        max_keepalive: Idle connections kept open for reuse
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    HEAD_BYTES = 64 * 1024
+
+    def __init__(
+        self,
+        max_bytes: int,
+        timeout: float = 60.0,
+        max_connections: int = 32,
+        max_keepalive: int = 16
+    ):
+        self.max_bytes = max_bytes
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive
+            ),
+            follow_redirects=True
+        )
+        self._s3 = None
+
+        # Stats
+        self.downloads = 0
+        self.object_downloads = 0
+        self.bytes_downloaded = 0
+        self.rejected_too_large = 0
+        self.errors = 0
+
+    async def fetch_url(self, url: str, check_head: Optional[Callable[[bytes, int], Any]] = None) -> bytearray:
+        """
+        Download a URL into memory.
+        Returns a bytearray so the body is not copied again after streaming.
+        """
+        try:
+            async with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+
+                declared = response.headers.get("content-length")
+                if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                    self.rejected_too_large += 1
+                    raise AudioTooLargeError(self.max_bytes, int(declared))
+
+                total = int(declared) if declared is not None and declared.isdigit() else None
+                head_checked = check_head is None or total is None
+                data = bytearray()
+                async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                    data += chunk
+                    if len(data) > self.max_bytes:
+                        self.rejected_too_large += 1
+                        raise AudioTooLargeError(self.max_bytes)
+                    if not head_checked and (len(data) >= self.HEAD_BYTES or len(data) >= total):
+                        head_checked = True
+                        check_head(bytes(data[:self.HEAD_BYTES]), total)
+
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+
+        self.downloads += 1
+        self.bytes_downloaded += len(data)
+        logger.debug(f"Downloaded {len(data)} bytes from {url.split('?')[0]}")
+        return data
+
+    async def fetch_object(
+        self,
+        key: str,
+        bucket: Optional[str] = None,
+        check_head: Optional[Callable[[bytes, int], Any]] = None
+    ) -> bytearray:
+        """Download a MinIO/S3 object by key over the shared connection pool"""
+        url = self.presign(key, bucket or settings.STORAGE_BUCKET)
+        data = await self.fetch_url(url, check_head)
+        self.object_downloads += 1
+        return data
+
+    def presign(self, key: str, bucket: str) -> str:
+        """Presigned GET URL for an object (computed locally, no request made)"""
+        return self._s3_client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=300
+        )
+
+    def _s3_client(self):
+        if self._s3 is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is not installed, object keys are unavailable")
+            self._s3 = boto3.client(
+                "s3",
+                endpoint_url=settings.STORAGE_ENDPOINT,
+                aws_access_key_id=settings.STORAGE_ACCESS_KEY,
+                aws_secret_access_key=settings.STORAGE_SECRET_KEY,
+                region_name="us-east-1",
+                config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"})
+            )
+        return self._s3
+
+    def stats(self) -> Dict[str, Any]:
+        """Return download counters"""
+        return {
+            "max_bytes": self.max_bytes,
+            "downloads": self.downloads,
+            "object_downloads": self.object_downloads,
+            "bytes_downloaded": self.bytes_downloaded,
+            "rejected_too_large": self.rejected_too_large,
+            "errors": self.errors
+        }
+
+    async def close(self):
+        """Close pooled connections"""
+        await self._client.aclose()
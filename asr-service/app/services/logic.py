@@ -3,21 +3,48 @@ ASR Service Logic - WhisperX Implementation
 Handles audio transcription with word-level timestamps
 """
 
+import asyncio
+import multiprocessing
 import os
-import shutil
-import tempfile
+import threading
 import time
-from pathlib import Path
-from typing import Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 import httpx
+import numpy as np
 import torch
 import logging
 
 from app.core.config import settings
+from app.services.batching import MicroBatcher
+from app.services.executor import InferenceExecutor, ExecutorSaturatedError
+from app.services.cache import TranscriptionCache
+from app.services.model_registry import AlignModelRegistry
+from app.services.router import routable_models, route_model, validate_accuracy
+from app.services.vad import trim_silence, remap_transcription
+from app.services.decode import decode_audio_bytes
+from app.services.fetch import AudioFetcher, AudioTooLargeError
+from app.services.probe import PROBE_BYTES, AudioInfo, finish_probe, probe_and_check
+from app.services.quality import AudioQualityError, check_quality
+from app.services.longform import plan_chunks, stitch_chunks, init_chunk_worker, transcribe_chunk_in_worker
+from app.services.metrics import (
+    StageTimer,
+    MODEL_LOAD_SECONDS,
+    REQUEST_SECONDS,
+    AUDIO_SECONDS,
+    PROCESSING_SECONDS,
+    REQUESTS
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+try:
+    from shared.utils.audio_cache import DecodedAudioCache, content_hash
+except ImportError:
+    # shared/ is mounted into the container by docker-compose
+    DecodedAudioCache = None
+
 # Fix for PyTorch 2.6+ weights_only default change
 # This allows loading models that use omegaconf (like pyannote/WhisperX)
 try:
@@ -36,200 +63,755 @@ def _patched_torch_load(*args, **kwargs):
     return _original_torch_load(*args, **kwargs)
 torch.load = _patched_torch_load
 
-# Global model instance (singleton pattern)
-_whisperx_model = None
-_align_model = None
-_align_metadata = None
+# Global model instances (singleton pattern, one per configured Whisper model)
+_whisperx_models: Dict[str, Any] = {}
+_align_registry: Optional[AlignModelRegistry] = None
+_batcher: Optional[MicroBatcher] = None
+_executor: Optional[InferenceExecutor] = None
+_cache: Optional[TranscriptionCache] = None
+_fetcher: Optional[AudioFetcher] = None
+_decoded_cache = None
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+_model_load_seconds: Dict[str, float] = {}
+
+# Startup phase, reported on /ready: starting -> loading -> warming -> ready (or failed)
+_startup: Dict[str, Any] = {
+    "state": "starting",
+    "detail": None,
+    "started_at": time.time(),
+    "ready_after_seconds": None,
+    "load_seconds": {},
+    "warmup_seconds": {},
+    "shared_models": []
+}
+
+# The WhisperX pipeline mutates its tokenizer per call and the aligner is not
+# re-entrant, so executor threads share each model behind its own lock
+_model_locks: Dict[str, threading.Lock] = {}
+_align_lock = threading.Lock()
+_load_lock = threading.Lock()
+
 
+def _model_lock(model_name: str) -> threading.Lock:
+    with _load_lock:
+        return _model_locks.setdefault(model_name, threading.Lock())
 
-def get_model():
+
+def get_model(model_name: Optional[str] = None):
     """
-    Load WhisperX model (singleton pattern).
-    Model is loaded once and reused for all requests.
+    Load a WhisperX model (singleton pattern per model name).
+    Each model is loaded once and reused for all requests.
+    
+    Args:
+        model_name: Whisper model to load (default: WHISPER_MODEL)
     """
-    global _whisperx_model
+    model_name = model_name or settings.WHISPER_MODEL
     
-    if _whisperx_model is not None:
-        return _whisperx_model
+    if model_name in _whisperx_models:
+        return _whisperx_models[model_name]
     
     if settings.MOCK_MODE:
         logger.info("Mock mode enabled, skipping model load")
         return None
     
-    try:
-        import whisperx
-        
-        logger.info(f"Loading WhisperX model: {settings.WHISPER_MODEL} on {settings.DEVICE} with {settings.compute_type}")
+    with _model_lock(model_name):
+        if model_name in _whisperx_models:
+            return _whisperx_models[model_name]
         
-        # Load the WhisperX model
-        _whisperx_model = whisperx.load_model(
-            settings.WHISPER_MODEL,
-            device=settings.DEVICE,
-            compute_type=settings.compute_type,
-            download_root=settings.MODEL_CACHE_DIR
+        try:
+            import whisperx
+            
+            logger.info(f"Loading WhisperX model: {model_name} on {settings.DEVICE} with {settings.compute_type}")
+            
+            # Load the WhisperX model
+            started = time.time()
+            model = whisperx.load_model(
+                model_name,
+                device=settings.DEVICE,
+                compute_type=settings.compute_type,
+                download_root=settings.MODEL_CACHE_DIR,
+                threads=settings.intra_op_threads
+            )
+            _whisperx_models[model_name] = model
+            load_seconds = time.time() - started
+            _model_load_seconds[model_name] = round(load_seconds, 3)
+            MODEL_LOAD_SECONDS.labels(kind="whisper", model=model_name).observe(load_seconds)
+            
+            logger.info(f"WhisperX model {model_name} loaded successfully in {load_seconds:.2f}s")
+            return model
+            
+        except ImportError:
+            logger.error("WhisperX not installed, falling back to mock mode")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load WhisperX model {model_name}: {str(e)}")
+            raise RuntimeError(f"Failed to load WhisperX model {model_name}: {e}")
+
+
+def preload_models():
+    """Load every Whisper model the router can pick"""
+    for model_name in routable_models():
+        get_model(model_name)
+
+
+def _load_align_model(language_code: str):
+    """Load a WhisperX alignment model from disk/hub"""
+    import whisperx
+    
+    started = time.time()
+    loaded = whisperx.load_align_model(
+        language_code=language_code,
+        device=settings.DEVICE,
+        model_dir=settings.MODEL_CACHE_DIR
+    )
+    MODEL_LOAD_SECONDS.labels(kind="align", model=language_code).observe(time.time() - started)
+    return loaded
+
+
+def _release_device_memory():
+    """Return freed model memory to the device after an eviction"""
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def get_align_registry() -> AlignModelRegistry:
+    """
+    Get the per-language alignment model registry (singleton pattern).
+    """
+    global _align_registry
+    
+    if _align_registry is None:
+        _align_registry = AlignModelRegistry(
+            loader=_load_align_model,
+            budget_bytes=settings.ALIGN_MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+            on_evict=_release_device_memory
         )
-        
-        logger.info("WhisperX model loaded successfully")
-        return _whisperx_model
-        
-    except ImportError:
-        logger.error("WhisperX not installed, falling back to mock mode")
-        return None
-    except Exception as e:
-        logger.error(f"Failed to load WhisperX model: {str(e)}")
-        raise RuntimeError(f"Failed to load WhisperX model: {e}")
+    return _align_registry
 
 
 def get_align_model(language_code: str = "en"):
     """
     Load WhisperX alignment model for word-level timestamps.
+    Models are cached per language and evicted LRU under a memory budget.
     """
-    global _align_model, _align_metadata
-    
     if settings.MOCK_MODE:
         return None, None
     
     try:
-        import whisperx
-        
-        # Only reload if language changed
-        if _align_model is None:
-            logger.info(f"Loading alignment model for language: {language_code}")
-            _align_model, _align_metadata = whisperx.load_align_model(
-                language_code=language_code,
-                device=settings.DEVICE
-            )
-            logger.info("Alignment model loaded successfully")
-        
-        return _align_model, _align_metadata
-        
+        return get_align_registry().get(language_code)
     except Exception as e:
-        logger.warning(f"Failed to load alignment model: {str(e)}")
+        logger.warning(f"Failed to load alignment model for '{language_code}': {str(e)}")
         return None, None
 
 
-def save_temp_audio(file) -> str:
+def preload_align_models():
+    """Load alignment models for ALIGN_PRELOAD_LANGUAGES"""
+    if settings.MOCK_MODE or not settings.ALIGN_PRELOAD_LANGUAGES:
+        return
+    
+    logger.info(f"Preloading alignment models: {settings.ALIGN_PRELOAD_LANGUAGES}")
+    get_align_registry().preload(settings.ALIGN_PRELOAD_LANGUAGES)
+
+
+def configure_threads():
     """
-    Save uploaded file to temporary location.
-    Returns the path to the temporary file.
+    Cap torch intra-op threads for this process at INTRA_OP_THREADS (by
+    default cores // WORKERS). Call from the main thread of each worker.
     """
+    threads = settings.intra_op_threads
+    torch.set_num_threads(threads)
+    logger.info(f"Process {os.getpid()} using {threads} intra-op thread(s)")
+
+
+def preload_shared_models():
+    """
+    Load alignment models in the pre-fork master process (gunicorn
+    preload_app) so every worker shares their weights copy-on-write.
+    
+    CPU only: CUDA contexts do not survive fork. The master stays on one
+    intra-op thread while loading, because an OpenMP pool started before
+    fork is unusable in the children. Whisper (CTranslate2) models are not
+    loaded here for the same reason - their worker threads are gone after
+    fork - so each worker loads its own Whisper copy in warm_start().
+    """
+    if settings.MOCK_MODE or settings.DEVICE != "cpu":
+        return
+    
+    torch.set_num_threads(1)
+    preload_align_models()
+    _startup["shared_models"] = [f"align:{code}" for code in get_align_registry().loaded_languages()]
+    logger.info(f"Loaded shared models pre-fork: {_startup['shared_models']}")
+
+
+def warmup_models():
+    """
+    Run a synthetic clip through every loaded Whisper model and alignment
+    model, so CUDA kernel selection, allocator growth and lazy init happen
+    before the first real request instead of during it.
+    """
+    import whisperx
+    
+    samples = int(16000 * settings.WARMUP_SECONDS)
+    t = np.arange(samples) / 16000
+    noise = np.random.default_rng(0).standard_normal(samples)
+    clip = (0.1 * np.sin(2 * np.pi * 220 * t) + 0.01 * noise).astype(np.float32)
+    
+    for model_name, model in list(_whisperx_models.items()):
+        started = time.time()
+        with _model_lock(model_name):
+            model.transcribe(
+                clip,
+                batch_size=settings.WHISPER_BATCH_SIZE,
+                language=settings.WHISPER_LANGUAGE or "en"
+            )
+        _startup["warmup_seconds"][f"whisper:{model_name}"] = round(time.time() - started, 3)
+    
+    registry = get_align_registry()
+    for language_code in registry.loaded_languages():
+        align_model, align_metadata = registry.get(language_code)
+        started = time.time()
+        with _align_lock:
+            whisperx.align(
+                [{"text": "warm up", "start": 0.0, "end": settings.WARMUP_SECONDS}],
+                align_model,
+                align_metadata,
+                clip,
+                device=settings.DEVICE,
+                return_char_alignments=False
+            )
+        _startup["warmup_seconds"][f"align:{language_code}"] = round(time.time() - started, 3)
+
+
+def warm_start():
+    """
+    Startup phase: load every configured Whisper and alignment model, run
+    warmup inference, then mark the replica ready. Meant to run in a
+    background thread so /health answers while /ready still returns 503.
+    """
+    if settings.MOCK_MODE:
+        _startup["state"] = "ready"
+        _startup["ready_after_seconds"] = 0.0
+        return
+    
     try:
-        # Create temp directory if it doesn't exist
-        os.makedirs(settings.TEMP_DIR, exist_ok=True)
+        _startup["state"] = "loading"
+        logger.info("Preloading WhisperX models...")
+        preload_models()
+        preload_align_models()
+        if not is_model_loaded():
+            raise RuntimeError(f"WhisperX model {settings.WHISPER_MODEL} is not loaded")
         
-        # Determine file extension
-        filename = getattr(file, 'filename', 'audio.wav')
-        suffix = Path(filename).suffix or '.wav'
-        
-        # Create temp file
-        fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.TEMP_DIR)
-        with os.fdopen(fd, 'wb') as tmp:
-            shutil.copyfileobj(file.file, tmp)
+        _startup["load_seconds"] = {
+            **{f"whisper:{name}": seconds for name, seconds in _model_load_seconds.items()},
+            **{f"align:{code}": seconds for code, seconds in get_align_registry().load_seconds.items()}
+        }
         
-        logger.debug(f"Saved temp audio file: {path}")
-        return path
+        if settings.WARMUP_ENABLED:
+            _startup["state"] = "warming"
+            try:
+                warmup_models()
+            except Exception as e:
+                # Warmup only saves latency; a loaded model can still serve
+                logger.warning(f"Warmup inference failed: {str(e)}")
         
+        _startup["state"] = "ready"
+        _startup["ready_after_seconds"] = round(time.time() - _startup["started_at"], 3)
+        logger.info(f"ASR service ready after {_startup['ready_after_seconds']:.1f}s")
+    
     except Exception as e:
-        logger.error(f"Error saving temp file: {str(e)}")
-        raise RuntimeError(f"Failed to save uploaded file: {e}")
+        _startup["state"] = "failed"
+        _startup["detail"] = str(e)
+        logger.error(f"Startup failed, replica stays unready: {str(e)}")
+
+
+def is_ready() -> bool:
+    """Whether startup (model load + warmup) has finished"""
+    return _startup["state"] == "ready"
 
 
-async def download_audio_from_url(audio_url: str) -> str:
+def get_readiness() -> Dict[str, Any]:
+    """Startup state, load times and warmup times"""
+    return {
+        **_startup,
+        "ready": is_ready(),
+        "pid": os.getpid(),
+        "intra_op_threads": torch.get_num_threads(),
+        "shared_models": list(_startup["shared_models"]),
+        "load_seconds": dict(_startup["load_seconds"]),
+        "warmup_seconds": dict(_startup["warmup_seconds"])
+    }
+
+
+async def read_upload(file) -> Tuple[bytearray, Optional[AudioInfo]]:
     """
-    Download audio file from URL to temporary location.
-    Returns the path to the downloaded file.
+    Read an uploaded file into memory in chunks.
+    
+    Stops with AudioTooLargeError past UPLOAD_MAX_BYTES. When the upload
+    size is known, the headers are probed as soon as the first PROBE_BYTES
+    are in, so an over-long, empty or corrupt file is rejected without
+    reading the rest.
+    
+    Returns:
+        Tuple of (file bytes, AudioInfo from the head probe or None)
     """
+    max_bytes = settings.UPLOAD_MAX_BYTES
+    total = getattr(file, "size", None)
+    if total is not None and total > max_bytes:
+        raise AudioTooLargeError(max_bytes, total)
+    
     try:
-        os.makedirs(settings.TEMP_DIR, exist_ok=True)
-        
-        # Extract file extension from URL
-        url_path = str(audio_url).split('?')[0]  # Remove query params
-        suffix = Path(url_path).suffix or '.wav'
-        
-        # Download the file
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(str(audio_url))
-            response.raise_for_status()
+        data = bytearray()
+        info = None
+        head_checked = total is None
+        while True:
+            chunk = await file.read(PROBE_BYTES)
+            if not chunk:
+                break
+            data += chunk
+            if len(data) > max_bytes:
+                raise AudioTooLargeError(max_bytes)
+            if not head_checked and (len(data) >= PROBE_BYTES or len(data) >= total):
+                head_checked = True
+                info = probe_and_check(bytes(data[:PROBE_BYTES]), total)
         
-        # Save to temp file
-        fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.TEMP_DIR)
-        with os.fdopen(fd, 'wb') as tmp:
-            tmp.write(response.content)
+        logger.debug(f"Read {len(data)} bytes from upload {getattr(file, 'filename', None)}")
+        return data, info
         
-        logger.debug(f"Downloaded audio from URL: {audio_url} to {path}")
-        return path
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading upload: {str(e)}")
+        raise RuntimeError(f"Failed to read uploaded file: {e}")
+
+
+def get_fetcher() -> AudioFetcher:
+    """
+    Get the pooled audio downloader (singleton pattern).
+    """
+    global _fetcher
+    
+    if _fetcher is None:
+        _fetcher = AudioFetcher(
+            max_bytes=settings.DOWNLOAD_MAX_BYTES,
+            timeout=settings.DOWNLOAD_TIMEOUT_SECONDS,
+            max_connections=settings.DOWNLOAD_MAX_CONNECTIONS,
+            max_keepalive=settings.DOWNLOAD_KEEPALIVE_CONNECTIONS
+        )
+    return _fetcher
+
+
+async def shutdown_fetcher():
+    """Close the downloader's pooled connections"""
+    global _fetcher
+    
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
+
+
+async def download_audio_bytes(
+    audio_url: Optional[str] = None,
+    object_key: Optional[str] = None,
+    bucket: Optional[str] = None
+) -> Tuple[bytearray, Optional[AudioInfo]]:
+    """
+    Download an audio file from a URL or a MinIO/S3 object key into memory.
+    Returns the raw file bytes and the AudioInfo from probing its head while
+    it streamed in (None when the size was not declared).
+    """
+    source = audio_url or f"{bucket or settings.STORAGE_BUCKET}/{object_key}"
+    probed = {}
+    
+    def check_head(head: bytes, total: int):
+        probed["info"] = probe_and_check(head, total)
+    
+    try:
+        if object_key is not None:
+            data = await get_fetcher().fetch_object(object_key, bucket, check_head=check_head)
+        else:
+            data = await get_fetcher().fetch_url(str(audio_url), check_head=check_head)
+        return data, probed.get("info")
         
+    except ValueError as e:
+        logger.warning(f"Rejected download from {source}: {str(e)}")
+        raise
     except httpx.HTTPError as e:
-        logger.error(f"Failed to download audio from {audio_url}: {str(e)}")
+        logger.error(f"Failed to download audio from {source}: {str(e)}")
         raise RuntimeError(f"Failed to download audio from URL: {e}")
     except Exception as e:
         logger.error(f"Error downloading audio: {str(e)}")
         raise RuntimeError(f"Failed to download audio: {e}")
 
 
-def cleanup_temp_file(path: str):
-    """Clean up temporary file"""
+def decode_audio(data: bytes, filename: Optional[str] = None, info: Optional[AudioInfo] = None):
+    """
+    Decode audio bytes into a 16kHz mono float32 array.
+    
+    Args:
+        data: Encoded audio file
+        filename: Original name, used as a format hint for ffmpeg
+        info: Result of the probe stage; its container format is reused
+    
+    Returns:
+        Tuple of (audio array, duration in seconds)
+    """
+    audio = decode_audio_bytes(data, filename, fmt=info.format if info else None)
+    duration = len(audio) / 16000
+    
+    # Check duration limit
+    if duration > settings.MAX_AUDIO_DURATION_SECONDS:
+        raise ValueError(f"Audio duration ({duration:.1f}s) exceeds maximum allowed ({settings.MAX_AUDIO_DURATION_SECONDS}s)")
+    
+    return audio, duration
+
+
+def load_audio_array(audio_path: str):
+    """
+    Decode an audio file into a 16kHz mono float32 array.
+    
+    Returns:
+        Tuple of (audio array, duration in seconds)
+    """
+    logger.info(f"Loading audio file: {audio_path}")
+    with open(audio_path, "rb") as f:
+        # Reject from the headers before reading and decoding the whole file
+        info = probe_and_check(f.read(PROBE_BYTES), os.path.getsize(audio_path))
+        f.seek(0)
+        data = f.read()
+    return decode_audio(data, audio_path, finish_probe(data, info))
+
+
+def _vad_segments(model, audio, chunk_size: int = 30) -> List[Dict[str, Any]]:
+    """
+    Run the pipeline's VAD on a clip and merge speech into decode chunks,
+    mirroring what FasterWhisperPipeline.transcribe does internally.
+    """
     try:
-        if path and os.path.exists(path):
-            os.remove(path)
-            logger.debug(f"Cleaned up temp file: {path}")
-    except Exception as e:
-        logger.warning(f"Failed to cleanup temp file {path}: {str(e)}")
+        from whisperx.vads import Vad, Pyannote
+        
+        if issubclass(type(model.vad_model), Vad):
+            waveform = model.vad_model.preprocess_audio(audio)
+            merge_chunks = model.vad_model.merge_chunks
+        else:
+            waveform = Pyannote.preprocess_audio(audio)
+            merge_chunks = Pyannote.merge_chunks
+    except ImportError:
+        # Older WhisperX releases (3.1.x) expose a pyannote pipeline directly
+        from whisperx.vad import merge_chunks
+        waveform = torch.from_numpy(audio).unsqueeze(0)
+    
+    vad_segments = model.vad_model({"waveform": waveform, "sample_rate": 16000})
+    return merge_chunks(
+        vad_segments,
+        chunk_size,
+        onset=model._vad_params["vad_onset"],
+        offset=model._vad_params["vad_offset"],
+    )
 
 
-def transcribe_with_whisperx(audio_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+def _supports_segment_batching(model) -> bool:
+    """Check whether the loaded model exposes the pipeline hooks used for cross-clip batching."""
+    return (
+        hasattr(model, "vad_model")
+        and hasattr(model, "_vad_params")
+        and hasattr(model, "tokenizer")
+        and not getattr(model, "suppress_numerals", False)
+    )
+
+
+def _transcribe_same_language(model, audios: List[Any], language: str) -> List[Dict[str, Any]]:
     """
-    Transcribe audio using WhisperX with word-level alignment.
+    Transcribe several clips that share a language in a single pipeline pass.
+    
+    VAD chunks from every clip are fed through one batched decoder loop, so
+    short clips from concurrent requests fill the same WHISPER_BATCH_SIZE batch
+    instead of each paying a full per-call overhead.
+    """
+    from faster_whisper.tokenizer import Tokenizer
+    
+    clip_segments = [_vad_segments(model, audio) for audio in audios]
+    
+    previous_tokenizer = model.tokenizer
+    if model.tokenizer is None or model.tokenizer.language_code != language or model.tokenizer.task != "transcribe":
+        model.tokenizer = Tokenizer(
+            model.model.hf_tokenizer,
+            model.model.model.is_multilingual,
+            task="transcribe",
+            language=language,
+        )
+    
+    def data():
+        for audio, segments in zip(audios, clip_segments):
+            for seg in segments:
+                f1 = int(seg["start"] * 16000)
+                f2 = int(seg["end"] * 16000)
+                yield {"inputs": audio[f1:f2]}
+    
+    # Flat index -> (clip index, vad segment)
+    owners = [
+        (clip_idx, seg)
+        for clip_idx, segments in enumerate(clip_segments)
+        for seg in segments
+    ]
+    
+    batch_size = settings.WHISPER_BATCH_SIZE
+    results = [{"segments": [], "language": language} for _ in audios]
+    
+    try:
+        for idx, out in enumerate(model(data(), batch_size=batch_size, num_workers=0)):
+            text = out["text"]
+            if batch_size in [0, 1, None] and isinstance(text, list):
+                text = text[0]
+            clip_idx, seg = owners[idx]
+            results[clip_idx]["segments"].append({
+                "text": text,
+                "start": round(seg["start"], 3),
+                "end": round(seg["end"], 3),
+            })
+    finally:
+        if getattr(model, "preset_language", None) is None:
+            model.tokenizer = previous_tokenizer
+    
+    return results
+
+
+def transcribe_batch(
+    audios: List[Any],
+    language: Optional[str] = None,
+    model_name: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Transcribe a batch of decoded clips without word alignment.
     
     Args:
-        audio_path: Path to the audio file
-        language: Optional language code (auto-detect if None)
+        audios: List of 16kHz float32 audio arrays
+        language: Language code shared by the batch (auto-detect per clip if None)
+        model_name: Whisper model to use (default: WHISPER_MODEL)
     
     Returns:
-        Dictionary with transcript, words, segments, language, duration
+        One WhisperX-style result ({"segments", "language"}) per input clip
     """
-    import whisperx
-    
-    model = get_model()
+    model_name = model_name or settings.WHISPER_MODEL
+    model = get_model(model_name)
     if model is None:
         raise RuntimeError("WhisperX model not loaded")
     
-    start_time = time.time()
+    language = language or settings.WHISPER_LANGUAGE
     
-    # Load audio
-    logger.info(f"Loading audio file: {audio_path}")
-    audio = whisperx.load_audio(audio_path)
-    duration = len(audio) / 16000  # WhisperX uses 16kHz sample rate
+    with _model_lock(model_name):
+        if len(audios) == 1 or not _supports_segment_batching(model):
+            return [
+                model.transcribe(audio, batch_size=settings.WHISPER_BATCH_SIZE, language=language)
+                for audio in audios
+            ]
+        
+        if language:
+            languages = [language] * len(audios)
+        else:
+            languages = [model.detect_language(audio) for audio in audios]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(audios)
+        for lang in dict.fromkeys(languages):
+            indices = [i for i, clip_lang in enumerate(languages) if clip_lang == lang]
+            group = _transcribe_same_language(model, [audios[i] for i in indices], lang)
+            for i, result in zip(indices, group):
+                results[i] = result
     
-    # Check duration limit
-    if duration > settings.MAX_AUDIO_DURATION_SECONDS:
-        raise ValueError(f"Audio duration ({duration:.1f}s) exceeds maximum allowed ({settings.MAX_AUDIO_DURATION_SECONDS}s)")
+    return results
+
+
+def get_batcher() -> MicroBatcher:
+    """
+    Get the request-level micro-batcher (singleton pattern).
+    Clips submitted from concurrent requests are transcribed together.
+    """
+    global _batcher
     
-    # Transcribe
-    logger.info(f"Transcribing audio, duration: {duration:.2f}s")
-    result = model.transcribe(
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            transcribe_fn=transcribe_batch,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            executor=get_executor()
+        )
+    return _batcher
+
+
+def get_executor() -> InferenceExecutor:
+    """
+    Get the bounded inference executor (singleton pattern).
+    All blocking decode and model work runs here instead of on the event loop.
+    """
+    global _executor
+    
+    if _executor is None:
+        _executor = InferenceExecutor(
+            max_workers=settings.INFERENCE_WORKERS,
+            max_pending=settings.INFERENCE_MAX_PENDING
+        )
+    return _executor
+
+
+async def shutdown_batcher():
+    """Stop the micro-batcher and fail any clips still waiting in its queue"""
+    global _batcher
+    
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+
+def get_cache() -> TranscriptionCache:
+    """
+    Get the transcription result cache (singleton pattern).
+    """
+    global _cache
+    
+    if _cache is None:
+        _cache = TranscriptionCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            redis_url=settings.REDIS_URL if settings.CACHE_REDIS_ENABLED else None,
+            ttl_seconds=settings.CACHE_TTL_SECONDS
+        )
+    return _cache
+
+
+def transcription_cache_keys(
+    audio,
+    language: Optional[str] = None,
+    model_names: Optional[List[str]] = None,
+    target_text: Optional[str] = None
+) -> List[str]:
+    """
+    Cache keys for a decoded clip under each of `model_names` (in order,
+    duplicates dropped) and the current model configuration.
+    
+    Keys depend only on the audio, the model that produced the result and
+    settings that change its output - never on load, so the same clip maps
+    to the same keys whichever model routing picks at the moment.
+    """
+    variant = f"vad={settings.VAD_TRIM_ENABLED}"
+    if target_text:
+        variant += f"|script={target_text}|min_score={settings.SCRIPTED_MIN_SCORE}"
+    models = list(dict.fromkeys(name or settings.WHISPER_MODEL for name in (model_names or [None])))
+    return TranscriptionCache.make_keys(
         audio,
-        batch_size=settings.WHISPER_BATCH_SIZE,
-        language=language or settings.WHISPER_LANGUAGE
+        models=models,
+        compute_type=settings.compute_type,
+        language=language or settings.WHISPER_LANGUAGE,
+        variant=variant
     )
+
+
+def get_decoded_cache():
+    """
+    Get the decoded audio cache shared with alignment-service (singleton
+    pattern). None when DECODED_AUDIO_CACHE_DIR is unset or shared/ is missing.
+    """
+    global _decoded_cache
+    
+    if _decoded_cache is None and settings.DECODED_AUDIO_CACHE_DIR:
+        if DecodedAudioCache is None:
+            logger.warning("shared.utils.audio_cache not importable, decoded audio is not shared")
+            return None
+        _decoded_cache = DecodedAudioCache(
+            settings.DECODED_AUDIO_CACHE_DIR,
+            max_bytes=settings.DECODED_AUDIO_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _decoded_cache
+
+
+def share_decoded_audio(audio) -> Dict[str, Any]:
+    """
+    Store decoded audio for downstream services.
+    Returns the response fields that point at it (empty when disabled).
+    """
+    cache = get_decoded_cache()
+    if cache is None:
+        return {}
+    key = content_hash(audio)
+    try:
+        cache.put(key, audio)
+    except OSError as e:
+        logger.warning(f"Could not share decoded audio: {str(e)}")
+        return {"content_hash": key}
+    return {"content_hash": key, "audio_cache_key": key}
+
+
+async def shutdown_cache():
+    """Close the cache's Redis connection"""
+    global _cache
+    
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+
+
+def shutdown_executor():
+    """Release inference worker threads"""
+    global _executor
+    
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def align_transcription(result: Dict[str, Any], audio, language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Align a raw WhisperX result for word-level timestamps.
+    Returns the result unchanged if no alignment model is available.
+    """
+    import whisperx
     
     detected_language = result.get("language", language or "en")
     
-    # Align for word-level timestamps
     logger.info("Aligning transcript for word timestamps")
     align_model, align_metadata = get_align_model(detected_language)
     
     if align_model is not None:
-        result = whisperx.align(
-            result["segments"],
-            align_model,
-            align_metadata,
-            audio,
-            device=settings.DEVICE,
-            return_char_alignments=False
-        )
+        with _align_lock:
+            aligned = whisperx.align(
+                result["segments"],
+                align_model,
+                align_metadata,
+                audio,
+                device=settings.DEVICE,
+                return_char_alignments=False
+            )
+        aligned["language"] = detected_language
+        return aligned
     
-    # Extract words from segments
+    return result
+
+
+def trim_for_decode(audio):
+    """
+    Drop silence before decoding when VAD trimming is enabled.
+    
+    Returns:
+        Tuple of (audio to decode, layout for remapping timestamps or None,
+        VAD summary for the response or None when trimming is disabled)
+    """
+    if not settings.VAD_TRIM_ENABLED:
+        return audio, None, None
+    
+    speech, layout = trim_silence(audio)
+    if layout is None:
+        summary = {"speech_duration": round(len(audio) / 16000, 3), "skipped_duration": 0.0, "regions": 1}
+    else:
+        summary = layout.summary()
+    return speech, layout, summary
+
+
+def format_transcription(
+    result: Dict[str, Any],
+    duration: float,
+    processing_time: float,
+    vad_summary: Optional[Dict[str, Any]] = None,
+    model_name: Optional[str] = None,
+    mode: str = "decode"
+) -> Dict[str, Any]:
+    """Convert an aligned WhisperX result into the ASRResponse payload."""
     words = []
     segments = []
     full_transcript = []
@@ -254,21 +836,293 @@ def transcribe_with_whisperx(audio_path: str, language: Optional[str] = None) ->
         })
         full_transcript.append(segment.get("text", "").strip())
     
-    processing_time = time.time() - start_time
-    
     logger.info(f"Transcription complete: {len(words)} words in {processing_time:.2f}s")
     
     return {
         "transcript": " ".join(full_transcript),
         "words": words,
         "segments": segments,
-        "language": detected_language,
+        "language": result.get("language", "en"),
         "duration": round(duration, 3),
-        "model_used": settings.WHISPER_MODEL,
-        "processing_time": round(processing_time, 3)
+        "model_used": model_name or settings.WHISPER_MODEL,
+        "processing_time": round(processing_time, 3),
+        "vad": vad_summary,
+        "mode": mode
     }
 
 
+def to_columnar(result: Dict[str, Any], include_segments: bool = True) -> Dict[str, Any]:
+    """
+    Convert an ASRResponse payload to the columnar layout: parallel arrays
+    for words, and for segments plus offsets into the word arrays.
+    """
+    words = result.get("words") or []
+    columnar = {
+        **result,
+        "words": {
+            "word": [word["word"] for word in words],
+            "start": [word["start"] for word in words],
+            "end": [word["end"] for word in words],
+            "confidence": [word.get("confidence") for word in words]
+        },
+        "segments": None
+    }
+    
+    segments = result.get("segments")
+    if include_segments and segments is not None:
+        offsets = [0]
+        for segment in segments:
+            offsets.append(offsets[-1] + len(segment.get("words") or []))
+        columnar["segments"] = {
+            "text": [segment["text"] for segment in segments],
+            "start": [segment["start"] for segment in segments],
+            "end": [segment["end"] for segment in segments],
+            "word_offsets": offsets
+        }
+    return columnar
+
+
+def transcribe_audio(
+    audio,
+    duration: float,
+    language: Optional[str] = None,
+    start_time: Optional[float] = None,
+    model_name: Optional[str] = None,
+    timer: Optional[StageTimer] = None
+) -> Dict[str, Any]:
+    """
+    Transcribe a decoded clip with word-level alignment, without batching.
+    
+    Args:
+        audio: 16kHz float32 audio array
+        duration: Audio duration in seconds
+        language: Optional language code (auto-detect if None)
+        start_time: Time the request started, for processing_time
+        model_name: Whisper model to use (default: WHISPER_MODEL)
+        timer: Per-stage timer to record into (optional)
+    
+    Returns:
+        ASRResponse payload dictionary
+    """
+    model_name = model_name or settings.WHISPER_MODEL
+    timer = timer or StageTimer()
+    model = get_model(model_name)
+    if model is None:
+        raise RuntimeError("WhisperX model not loaded")
+    
+    start_time = start_time or time.time()
+    with timer.stage("vad"):
+        speech, layout, vad_summary = trim_for_decode(audio)
+    
+    # Transcribe
+    logger.info(f"Transcribing audio with {model_name}, duration: {duration:.2f}s")
+    with timer.stage("transcribe"), _model_lock(model_name):
+        result = model.transcribe(
+            speech,
+            batch_size=settings.WHISPER_BATCH_SIZE,
+            language=language or settings.WHISPER_LANGUAGE
+        )
+    
+    with timer.stage("align"):
+        result = align_transcription(result, speech, language)
+    
+    with timer.stage("serialize"):
+        result = remap_transcription(result, layout)
+        return format_transcription(result, duration, time.time() - start_time, vad_summary, model_name)
+
+
+def script_match(aligned: Dict[str, Any], target_text: str):
+    """
+    Cheap likelihood check for a forced alignment.
+    
+    Returns (mean word alignment score, fraction of script words aligned).
+    Off-script speech forced onto the script gets low CTC posteriors, and
+    words it cannot place come back without timestamps.
+    """
+    scores = [
+        word["score"]
+        for segment in aligned.get("segments", [])
+        for word in segment.get("words", [])
+        if word.get("score") is not None and word.get("start") is not None
+    ]
+    expected = max(1, len(target_text.split()))
+    mean_score = sum(scores) / len(scores) if scores else 0.0
+    return mean_score, min(1.0, len(scores) / expected)
+
+
+def transcribe_scripted(
+    audio,
+    duration: float,
+    target_text: str,
+    language: Optional[str] = None,
+    start_time: Optional[float] = None,
+    timer: Optional[StageTimer] = None
+):
+    """
+    Score a scripted drill by CTC forced alignment of the known text,
+    skipping Whisper decoding entirely.
+    
+    Returns:
+        Tuple of (ASRResponse payload, or None when the speech does not match
+        the script or no alignment model exists, and the mean alignment score)
+    """
+    import whisperx
+    
+    timer = timer or StageTimer()
+    start_time = start_time or time.time()
+    language = language or settings.WHISPER_LANGUAGE or "en"
+    
+    align_model, align_metadata = get_align_model(language)
+    if align_model is None:
+        return None, None
+    
+    with timer.stage("vad"):
+        speech, layout, vad_summary = trim_for_decode(audio)
+    
+    # The whole script as one segment spanning the (trimmed) clip
+    script = [{"text": target_text.strip(), "start": 0.0, "end": len(speech) / 16000}]
+    with timer.stage("align"), _align_lock:
+        aligned = whisperx.align(
+            script,
+            align_model,
+            align_metadata,
+            speech,
+            device=settings.DEVICE,
+            return_char_alignments=False
+        )
+    
+    score, coverage = script_match(aligned, target_text)
+    if score < settings.SCRIPTED_MIN_SCORE or coverage < settings.SCRIPTED_MIN_COVERAGE:
+        logger.info(f"Speech does not match script (score {score:.2f}, coverage {coverage:.2f}), decoding instead")
+        return None, round(score, 3)
+    
+    aligned["language"] = language
+    with timer.stage("serialize"):
+        aligned = remap_transcription(aligned, layout)
+        result = format_transcription(
+            aligned,
+            duration,
+            time.time() - start_time,
+            vad_summary,
+            model_name=f"forced-alignment:{language}",
+            mode="forced_alignment"
+        )
+    return result, round(score, 3)
+
+
+def transcribe_chunk(audio, language: Optional[str] = None, model_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Transcribe and align one chunk of a long recording.
+    Returns the raw (unformatted) WhisperX result in chunk-local time.
+    """
+    model_name = model_name or settings.WHISPER_MODEL
+    model = get_model(model_name)
+    if model is None:
+        raise RuntimeError("WhisperX model not loaded")
+    
+    with _model_lock(model_name):
+        result = model.transcribe(
+            audio,
+            batch_size=settings.WHISPER_BATCH_SIZE,
+            language=language or settings.WHISPER_LANGUAGE
+        )
+    return align_transcription(result, audio, language)
+
+
+def get_chunk_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the long-form chunk process pool (singleton pattern).
+    Only used on CPU, where separate processes sidestep the GIL and the
+    per-model lock; each worker holds its own model copy. Returns None when
+    LONGFORM_PROCESS_WORKERS is 0 or the service runs on GPU.
+    """
+    global _chunk_pool
+    
+    if settings.LONGFORM_PROCESS_WORKERS <= 0 or settings.DEVICE != "cpu":
+        return None
+    
+    if _chunk_pool is None:
+        workers = settings.LONGFORM_PROCESS_WORKERS
+        threads = max(1, settings.intra_op_threads // workers)
+        logger.info(f"Starting long-form chunk pool: {workers} process(es), {threads} thread(s) each")
+        _chunk_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_chunk_worker,
+            initargs=(threads,)
+        )
+    return _chunk_pool
+
+
+def shutdown_chunk_pool():
+    """Stop long-form worker processes"""
+    global _chunk_pool
+    
+    if _chunk_pool is not None:
+        _chunk_pool.shutdown(wait=False, cancel_futures=True)
+        _chunk_pool = None
+
+
+async def transcribe_long_form(
+    audio,
+    duration: float,
+    language: Optional[str],
+    model_name: str,
+    start_time: float,
+    timer: StageTimer
+) -> Dict[str, Any]:
+    """
+    Transcribe a long recording as overlapping chunks cut at VAD silence gaps.
+    
+    Chunks run in parallel: through the chunk process pool on CPU when
+    configured, otherwise through the micro-batcher (so chunks share model
+    calls) or the inference executor. Results are stitched back on the
+    original timeline with the overlaps de-duplicated.
+    """
+    executor = get_executor()
+    
+    with timer.stage("vad"):
+        chunks = await executor.run(plan_chunks, audio)
+    logger.info(f"Long-form transcription: {duration:.1f}s in {len(chunks)} chunk(s) with {model_name}")
+    
+    pool = get_chunk_pool()
+    chunk_language = language or settings.WHISPER_LANGUAGE
+    
+    async def run_chunk(chunk):
+        piece = audio[chunk.start:chunk.end]
+        if pool is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, transcribe_chunk_in_worker, piece, chunk_language, model_name
+            )
+        if settings.BATCH_ENABLED:
+            result = await get_batcher().submit(piece, chunk_language, model_name)
+            return await executor.run(align_transcription, result, piece, language)
+        return await executor.run(transcribe_chunk, piece, chunk_language, model_name)
+    
+    with timer.stage("transcribe"):
+        results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    
+    with timer.stage("serialize"):
+        result = stitch_chunks(chunks, results)
+        return format_transcription(result, duration, time.time() - start_time, None, model_name)
+
+
+def transcribe_with_whisperx(audio_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Transcribe audio using WhisperX with word-level alignment.
+    
+    Args:
+        audio_path: Path to the audio file
+        language: Optional language code (auto-detect if None)
+    
+    Returns:
+        Dictionary with transcript, words, segments, language, duration
+    """
+    start_time = time.time()
+    audio, duration = load_audio_array(audio_path)
+    return transcribe_audio(audio, duration, language, start_time)
+
+
 def get_mock_response() -> Dict[str, Any]:
     """
     Return mock response for testing without GPU/model.
@@ -300,53 +1154,176 @@ def get_mock_response() -> Dict[str, Any]:
     }
 
 
-async def run_service_logic(file=None, audio_url: str = None, language: str = None) -> Dict[str, Any]:
+async def run_service_logic(
+    file=None,
+    audio_url: str = None,
+    language: str = None,
+    accuracy: str = None,
+    object_key: str = None,
+    bucket: str = None,
+    include_timings: bool = False,
+    wait_for_capacity: bool = False,
+    target_text: str = None
+) -> Dict[str, Any]:
     """
     Main entry point for ASR processing.
-    Supports both file upload and audio URL.
+    Supports file upload, audio URL and MinIO/S3 object key.
     
     Args:
         file: Uploaded file object (optional)
         audio_url: URL to audio file (optional)
         language: Language code for transcription (optional)
+        accuracy: Accuracy tier for model routing: fast, balanced or accurate (optional)
+        object_key: MinIO/S3 object key of the audio file (optional)
+        bucket: Bucket for object_key, defaults to STORAGE_BUCKET (optional)
+        include_timings: Add per-stage timings (seconds) under "timings"
+        wait_for_capacity: Queue for an executor slot instead of raising
+            ExecutorSaturatedError (bulk jobs)
+        target_text: Script the speaker was asked to read; forced-aligned
+            instead of decoded when the speech matches it (optional)
     
     Returns:
         ASR response dictionary
     """
-    if file is None and audio_url is None:
-        raise ValueError("Either file or audio_url must be provided")
+    if file is None and audio_url is None and object_key is None:
+        raise ValueError("One of file, audio_url or object_key must be provided")
+    accuracy = validate_accuracy(accuracy)
     
     # Mock mode for testing
     if settings.MOCK_MODE:
         logger.info("Running in mock mode")
         return get_mock_response()
     
-    temp_file_path = None
+    executor = get_executor()
+    timer = StageTimer()
     
     try:
-        # Get audio file path
-        if file is not None:
-            temp_file_path = save_temp_audio(file)
-        else:
-            temp_file_path = await download_audio_from_url(audio_url)
-        
-        # Transcribe
-        result = transcribe_with_whisperx(temp_file_path, language)
-        return result
+        # Bound the number of requests in flight; raises ExecutorSaturatedError when full
+        async with executor.admission(wait=wait_for_capacity):
+            # Read audio into memory and decode in-process
+            with timer.stage("upload"):
+                if file is not None:
+                    data, head_info = await read_upload(file)
+                    filename = file.filename
+                elif object_key is not None:
+                    data, head_info = await download_audio_bytes(object_key=object_key, bucket=bucket)
+                    filename = object_key
+                else:
+                    data, head_info = await download_audio_bytes(audio_url)
+                    filename = str(audio_url).split('?')[0]
+            
+            # Header checks before any decode work; reuses the probe made while
+            # the bytes streamed in when it was conclusive. Re-probing webm/m4a
+            # opens the whole file with PyAV, so it runs on the executor
+            with timer.stage("probe"):
+                info = await executor.run(finish_probe, data, head_info)
+            
+            start_time = time.time()
+            with timer.stage("decode"):
+                audio, duration = await executor.run(decode_audio, data, filename, info)
+            del data
+            
+            # Don't spend inference on recordings the user has to redo anyway
+            with timer.stage("quality"):
+                quality = await executor.run(check_quality, audio)
+            
+            # Let alignment-service reuse the decoded samples instead of re-fetching
+            shared_audio = {}
+            if settings.DECODED_AUDIO_CACHE_DIR:
+                with timer.stage("share"):
+                    shared_audio = await executor.run(share_decoded_audio, audio)
+            model_name = route_model(duration, accuracy, load=executor.in_flight)
+            
+            # Serve repeated audio (retries, re-scoring) from the result cache.
+            # Load shedding may route to a smaller model than the tier asks
+            # for; a cached result from the tier's own model is served first,
+            # and new results are stored under the model that produced them
+            cache_key = None
+            if settings.CACHE_ENABLED:
+                cache = get_cache()
+                preferred_model = route_model(duration, accuracy)
+                with timer.stage("cache"):
+                    cache_keys = await executor.run(
+                        transcription_cache_keys, audio, language, [preferred_model, model_name], target_text
+                    )
+                    cache_key = cache_keys[-1]
+                    cached = await cache.get_any(cache_keys)
+                if cached is not None:
+                    logger.info("Serving transcription from cache")
+                    REQUESTS.labels(outcome="cached").inc()
+                    result = {**cached, **shared_audio, "processing_time": round(time.time() - start_time, 3), "cached": True}
+                    return _with_timings(result, timer, include_timings)
+            
+            # Scripted drills: align the known text, decode only if the speaker went off-script
+            result, script_score = None, None
+            if target_text and target_text.strip() and settings.SCRIPTED_ALIGNMENT_ENABLED and duration <= settings.SCRIPTED_MAX_SECONDS:
+                result, script_score = await executor.run(
+                    transcribe_scripted, audio, duration, target_text, language, start_time, timer
+                )
+            
+            if result is not None:
+                model_name = result["model_used"]
+            elif settings.LONGFORM_ENABLED and duration >= settings.LONGFORM_MIN_SECONDS:
+                result = await transcribe_long_form(audio, duration, language, model_name, start_time, timer)
+            elif not settings.BATCH_ENABLED:
+                result = await executor.run(transcribe_audio, audio, duration, language, start_time, model_name, timer)
+            else:
+                # Only speech regions are decoded; timestamps are mapped back afterwards
+                with timer.stage("vad"):
+                    speech, layout, vad_summary = await executor.run(trim_for_decode, audio)
+                
+                # Transcribe through the shared micro-batcher so concurrent requests
+                # are decoded together
+                logger.info(f"Queueing audio for batched transcription with {model_name}, duration: {duration:.2f}s")
+                result = await get_batcher().submit(speech, language or settings.WHISPER_LANGUAGE, model_name, timer=timer)
+                
+                with timer.stage("align"):
+                    result = await executor.run(align_transcription, result, speech, language)
+                with timer.stage("serialize"):
+                    result = remap_transcription(result, layout)
+                    result = format_transcription(result, duration, time.time() - start_time, vad_summary, model_name)
+            
+            if script_score is not None:
+                result["script_score"] = script_score
+            if quality is not None:
+                result["quality"] = quality
+            result.update(shared_audio)
+            
+            elapsed = time.time() - start_time
+            REQUESTS.labels(outcome="ok").inc()
+            REQUEST_SECONDS.labels(model=model_name).observe(elapsed)
+            AUDIO_SECONDS.labels(model=model_name).inc(duration)
+            PROCESSING_SECONDS.labels(model=model_name).inc(elapsed)
+            
+            if cache_key is not None:
+                await get_cache().set(cache_key, result)
+            return _with_timings(result, timer, include_timings)
         
+    except AudioQualityError as e:
+        REQUESTS.labels(outcome="low_quality").inc()
+        logger.info(f"Asking for a re-record: {str(e)}")
+        raise
     except Exception as e:
+        REQUESTS.labels(outcome="rejected" if isinstance(e, ExecutorSaturatedError) else "error").inc()
         logger.error(f"ASR processing failed: {str(e)}")
         raise
-        
-    finally:
-        # Cleanup
-        if temp_file_path:
-            cleanup_temp_file(temp_file_path)
+
+
+def _with_timings(result: Dict[str, Any], timer: StageTimer, include_timings: bool) -> Dict[str, Any]:
+    """Attach per-stage timings to a response without touching the cached payload"""
+    if not include_timings:
+        return result
+    return {**result, "timings": timer.summary()}
 
 
 def is_model_loaded() -> bool:
     """Check if the WhisperX model is loaded"""
-    return _whisperx_model is not None or settings.MOCK_MODE
+    return settings.WHISPER_MODEL in _whisperx_models or settings.MOCK_MODE
+
+
+def loaded_models() -> List[str]:
+    """Names of the Whisper models currently loaded"""
+    return list(_whisperx_models)
 
 
 def get_gpu_info() -> Dict[str, Any]:
@@ -0,0 +1,201 @@
+"""
+ASR Service Long-form - Chunked transcription of long recordings
+Splits audio at VAD silence gaps into overlapping chunks that are transcribed
+in parallel, then stitches words and segments back on the original timeline
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vad import SAMPLE_RATE, speech_regions
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Chunk:
+    """
+    One piece of a long recording, in samples.
+
+    The chunk owns words whose midpoint falls in [core_start, core_end); it is
+    decoded over [start, end), which adds the overlap on both sides so words
+    cut at the boundary are still heard whole by one of the neighbours.
+    """
+    start: int
+    end: int
+    core_start: int
+    core_end: int
+
+    @property
+    def offset(self) -> float:
+        return self.start / SAMPLE_RATE
+
+
+def plan_chunks(
+    audio: np.ndarray,
+    chunk_seconds: Optional[float] = None,
+    overlap_seconds: Optional[float] = None
+) -> List[Chunk]:
+    """
+    Split a recording into chunks of at most `chunk_seconds` (plus overlap).
+
+    Each cut is placed in the middle of the latest silence gap in the second
+    half of the chunk window; if the speaker never pauses there, the chunk is
+    cut at the window edge and the overlap covers the split word.
+    """
+    chunk_samples = int((chunk_seconds or settings.LONGFORM_CHUNK_SECONDS) * SAMPLE_RATE)
+    overlap_samples = int((settings.LONGFORM_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds) * SAMPLE_RATE)
+    total = len(audio)
+
+    # Midpoints of the silence gaps between speech regions
+    regions = speech_regions(audio)
+    if len(regions) > 1:
+        ends = np.array([end for _, end in regions[:-1]])
+        starts = np.array([start for start, _ in regions[1:]])
+        gap_mids = (ends + starts) // 2
+    else:
+        gap_mids = np.zeros(0, dtype=np.int64)
+
+    cuts = []
+    position = 0
+    while total - position > chunk_samples:
+        window_end = position + chunk_samples
+        candidates = gap_mids[(gap_mids > position + chunk_samples // 2) & (gap_mids <= window_end)]
+        cut = int(candidates[-1]) if len(candidates) else window_end
+        cuts.append(cut)
+        position = cut
+
+    bounds = [0] + cuts + [total]
+    return [
+        Chunk(
+            start=max(0, core_start - overlap_samples),
+            end=min(total, core_end + overlap_samples),
+            core_start=core_start,
+            core_end=core_end
+        )
+        for core_start, core_end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _owns(chunk: Chunk, start: float, end: float, last: bool) -> bool:
+    """Whether a span (seconds, original timeline) belongs to a chunk's core"""
+    middle = (start + end) / 2 * SAMPLE_RATE
+    return chunk.core_start <= middle and (middle < chunk.core_end or last)
+
+
+def _is_timed(word: Dict[str, Any]) -> bool:
+    return word.get("start") is not None and word.get("end") is not None
+
+
+def _anchor_spans(segment: Dict[str, Any], offset: float) -> List[tuple]:
+    """
+    Span (seconds, original timeline) that decides which chunk owns each word
+    of a segment: the word's own timing, else that of the nearest timed word
+    before it (or after it, at the start of the segment), else the segment's.
+    """
+    words = segment.get("words", [])
+    spans: List[Optional[tuple]] = [
+        (word["start"] + offset, word["end"] + offset) if _is_timed(word) else None
+        for word in words
+    ]
+
+    previous = None
+    for i, span in enumerate(spans):
+        if span is not None:
+            previous = span
+        elif previous is not None:
+            spans[i] = previous
+
+    following = (segment["start"] + offset, segment["end"] + offset)
+    for i in range(len(spans) - 1, -1, -1):
+        if spans[i] is None:
+            spans[i] = following
+        elif _is_timed(words[i]):
+            following = spans[i]
+    return spans
+
+
+def stitch_chunks(chunks: List[Chunk], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk WhisperX results into one result on the original timeline.
+
+    Timestamps are shifted by each chunk's offset. Words (or, without word
+    timings, whole segments) are kept only by the chunk whose core contains
+    their midpoint; untimed words follow their timed neighbours. A word
+    repeated across the seam with overlapping times is dropped. Segments
+    that lose words have their text and bounds rebuilt.
+    """
+    segments = []
+    previous_word = None
+
+    for index, (chunk, result) in enumerate(zip(chunks, results)):
+        last = index == len(chunks) - 1
+
+        for segment in result.get("segments", []):
+            words = []
+            anchors = _anchor_spans(segment, chunk.offset)
+            for word, (anchor_start, anchor_end) in zip(segment.get("words", []), anchors):
+                if not _owns(chunk, anchor_start, anchor_end, last):
+                    continue
+                if not _is_timed(word):
+                    # Unaligned token (e.g. a number); it goes with its neighbours
+                    words.append(dict(word))
+                    continue
+                start, end = word["start"] + chunk.offset, word["end"] + chunk.offset
+                if (
+                    previous_word is not None
+                    and start < previous_word["end"]
+                    and _normalize(word.get("word", "")) == _normalize(previous_word.get("word", ""))
+                ):
+                    continue
+                shifted = {**word, "start": start, "end": end}
+                words.append(shifted)
+                previous_word = shifted
+
+            original_words = segment.get("words", [])
+            timed = [word for word in words if _is_timed(word)]
+            if any(_is_timed(word) for word in original_words):
+                if not timed:
+                    continue
+                trimmed = len(words) != len(original_words)
+                segments.append({
+                    **segment,
+                    "text": " ".join(word.get("word", "").strip() for word in words) if trimmed else segment.get("text", ""),
+                    "start": timed[0]["start"] if trimmed else segment["start"] + chunk.offset,
+                    "end": timed[-1]["end"] if trimmed else segment["end"] + chunk.offset,
+                    "words": words
+                })
+            else:
+                # No word timings: keep or drop the segment as a whole
+                start, end = segment["start"] + chunk.offset, segment["end"] + chunk.offset
+                if _owns(chunk, start, end, last):
+                    segments.append({**segment, "start": start, "end": end, "words": words})
+
+    language = next((result.get("language") for result in results if result.get("language")), None)
+    return {"segments": segments, "language": language}
+
+
+def init_chunk_worker(threads: int):
+    """Process pool initializer: split CPU cores between worker processes"""
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+
+
+def transcribe_chunk_in_worker(audio: np.ndarray, language: Optional[str], model_name: Optional[str]) -> Dict[str, Any]:
+    """
+    Process pool entry point. Each worker process loads its own Whisper and
+    alignment models on first use and keeps them for later chunks.
+    """
+    from app.services.logic import transcribe_chunk
+
+    return transcribe_chunk(audio, language, model_name)
@@ -0,0 +1,105 @@
+"""
+ASR Service Metrics - Per-stage timings and Prometheus instruments
+Exposed on /metrics; real-time factor per node is
+rate(asr_processing_seconds_total) / rate(asr_audio_seconds_total)
+
+Under gunicorn with several workers, gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR and /metrics aggregates every worker's samples
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Request pipeline stages, in order
+STAGES = ("upload", "probe", "decode", "quality", "share", "cache", "vad", "queue", "transcribe", "align", "serialize")
+
+_STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "asr_stage_duration_seconds",
+    "Time spent in each request stage",
+    ["stage"],
+    buckets=_STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "asr_request_duration_seconds",
+    "End-to-end processing time of transcribed requests (excluding upload)",
+    ["model"],
+    buckets=_STAGE_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "asr_queue_wait_seconds",
+    "Time work waited before starting: executor = worker thread, batch = micro-batch window",
+    ["queue"],
+    buckets=_STAGE_BUCKETS
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "asr_model_load_seconds",
+    "Model load time",
+    ["kind", "model"],
+    buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+AUDIO_SECONDS = Counter(
+    "asr_audio_seconds_total",
+    "Seconds of audio transcribed (cache hits excluded)",
+    ["model"]
+)
+PROCESSING_SECONDS = Counter(
+    "asr_processing_seconds_total",
+    "Seconds spent transcribing, for real-time factor against asr_audio_seconds_total",
+    ["model"]
+)
+REQUESTS = Counter(
+    "asr_requests_total",
+    "Transcription requests by outcome (ok, cached, rejected, low_quality, error)",
+    ["outcome"]
+)
+IN_FLIGHT = Gauge(
+    "asr_requests_in_flight",
+    "Requests currently admitted by the inference executor",
+    multiprocess_mode="livesum"
+)
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per stage for one request and feeds the
+    stage histogram as each stage finishes.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Stage timings in seconds, in pipeline order"""
+        ordered = [name for name in STAGES if name in self.stages]
+        ordered += [name for name in self.stages if name not in STAGES]
+        return {name: round(self.stages[name], 4) for name in ordered}
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus exposition payload and its content type"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
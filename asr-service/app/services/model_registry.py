@@ -0,0 +1,184 @@
+"""
+ASR Service Model Registry - Per-language alignment model cache
+Lazily loads wav2vec2 alignment models and evicts the least recently used
+ones when the configured memory budget is exceeded
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RegistryEntry:
+    """A loaded model and its bookkeeping"""
+    model: Any
+    metadata: Any
+    size_bytes: int
+    load_seconds: float
+    hits: int = 0
+
+
+def model_size_bytes(model) -> int:
+    """Estimate resident size of a torch module from its parameters and buffers"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+class AlignModelRegistry:
+    """
+    Keyed registry of alignment models, one per language.
+
+    Models are loaded on first use (or via `preload`) and kept in LRU order.
+    After each load, least recently used models are evicted until the total
+    estimated size fits `budget_bytes`; the model just loaded is never
+    evicted, so a single oversized model still works. Languages without an
+    alignment model are remembered and not retried.
+
+    Args:
+        loader: Callable language_code -> (model, metadata)
+        budget_bytes: Memory budget for all resident models
+        on_evict: Optional callback run after a model is evicted
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[Any, Any]],
+        budget_bytes: int,
+        on_evict: Optional[Callable[[], None]] = None
+    ):
+        self._loader = loader
+        self.budget_bytes = budget_bytes
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[str, RegistryEntry]" = OrderedDict()
+        self._unsupported: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds: Dict[str, float] = {}
+
+    def get(self, language_code: str) -> Tuple[Any, Any]:
+        """Return (model, metadata) for a language, loading it if needed"""
+        entry = self._lookup(language_code)
+        if entry is not None:
+            return entry.model, entry.metadata
+
+        if language_code in self._unsupported:
+            raise ValueError(self._unsupported[language_code])
+
+        # One loader per language; concurrent requests wait for the same load
+        with self._lock:
+            load_lock = self._load_locks.setdefault(language_code, threading.Lock())
+
+        with load_lock:
+            entry = self._lookup(language_code, count=False)
+            if entry is not None:
+                return entry.model, entry.metadata
+
+            self.misses += 1
+            logger.info(f"Loading alignment model for language: {language_code}")
+            started = time.time()
+            try:
+                model, metadata = self._loader(language_code)
+            except ValueError as e:
+                # No alignment model exists for this language
+                self._unsupported[language_code] = str(e)
+                raise
+            load_seconds = time.time() - started
+
+            entry = RegistryEntry(
+                model=model,
+                metadata=metadata,
+                size_bytes=model_size_bytes(model),
+                load_seconds=load_seconds
+            )
+            self.load_seconds[language_code] = round(load_seconds, 3)
+            logger.info(
+                f"Alignment model for '{language_code}' loaded in {load_seconds:.2f}s "
+                f"({entry.size_bytes / 1024 / 1024:.0f} MB)"
+            )
+
+            with self._lock:
+                self._entries[language_code] = entry
+                evicted = self._evict_over_budget(keep=language_code)
+
+            if evicted and self._on_evict is not None:
+                self._on_evict()
+
+            return entry.model, entry.metadata
+
+    def preload(self, language_codes: Iterable[str]):
+        """Load alignment models for a list of languages ahead of traffic"""
+        for language_code in language_codes:
+            try:
+                self.get(language_code)
+            except Exception as e:
+                logger.warning(f"Failed to preload alignment model for '{language_code}': {str(e)}")
+
+    def _lookup(self, language_code: str, count: bool = True) -> Optional[RegistryEntry]:
+        with self._lock:
+            entry = self._entries.get(language_code)
+            if entry is not None:
+                self._entries.move_to_end(language_code)
+                if count:
+                    entry.hits += 1
+                    self.hits += 1
+            return entry
+
+    def _evict_over_budget(self, keep: str) -> int:
+        """Evict LRU models until the budget fits (caller holds the lock)"""
+        evicted = 0
+        while self.resident_bytes() > self.budget_bytes and len(self._entries) > 1:
+            language_code = next(iter(self._entries))
+            if language_code == keep:
+                break
+            entry = self._entries.pop(language_code)
+            self.evictions += 1
+            evicted += 1
+            logger.info(
+                f"Evicted alignment model for '{language_code}' "
+                f"({entry.size_bytes / 1024 / 1024:.0f} MB, {entry.hits} hits)"
+            )
+        return evicted
+
+    def resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def loaded_languages(self):
+        return list(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return residency, hit and load-time metrics"""
+        with self._lock:
+            models = {
+                language_code: {
+                    "size_mb": round(entry.size_bytes / 1024 / 1024, 1),
+                    "hits": entry.hits,
+                    "load_seconds": round(entry.load_seconds, 3)
+                }
+                for language_code, entry in self._entries.items()
+            }
+            resident = self.resident_bytes()
+
+        return {
+            "loaded": models,
+            "resident_mb": round(resident / 1024 / 1024, 1),
+            "budget_mb": round(self.budget_bytes / 1024 / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "load_seconds": dict(self.load_seconds),
+            "unsupported": sorted(self._unsupported)
+        }
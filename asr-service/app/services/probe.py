@@ -0,0 +1,307 @@
+"""
+ASR Service Probe - Header inspection before decoding
+Reads duration, sample rate and channels from container headers so empty,
+corrupt or over-long files are rejected before any decode work
+"""
+
+import io
+import logging
+import struct
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.services.decode import av, sniff_format
+
+logger = logging.getLogger(__name__)
+
+# Enough of a file to hold the headers of every format probed here
+PROBE_BYTES = 64 * 1024
+
+# Rejections by reason, reported on /asr/info
+probe_counts: Counter = Counter()
+
+# Bitrate estimates (CBR MP3 without a Xing/VBRI frame) may be off for VBR
+# files, so they get some slack before a file is rejected
+_ESTIMATE_SLACK = 1.25
+
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000)    # MPEG-2.5
+}
+
+
+class AudioProbeError(ValueError):
+    """Raised for files whose headers show they are empty or corrupt"""
+
+    def __init__(self, message: str, reason: str = "corrupt"):
+        self.reason = reason
+        super().__init__(message)
+
+
+@dataclass
+class AudioInfo:
+    """
+    What the headers say about a file.
+
+    `source` is "header" when duration comes from sample counts in the
+    container, "estimate" when it is derived from bitrate and byte size, and
+    None when the duration is unknown until decode.
+    """
+    format: Optional[str]
+    size_bytes: int
+    duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    source: Optional[str] = None
+
+
+def probe_wav(data: bytes, info: AudioInfo) -> AudioInfo:
+    """Read the fmt chunk and the data chunk size"""
+    offset = 12
+    byte_rate = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + 16 > len(data):
+                raise AudioProbeError("Corrupt WAV file: truncated fmt chunk")
+            _, channels, sample_rate, byte_rate, _, _ = struct.unpack_from("<HHIIHH", data, body)
+            if not channels or not sample_rate or not byte_rate:
+                raise AudioProbeError("Corrupt WAV file: invalid fmt chunk")
+            info.channels, info.sample_rate = channels, sample_rate
+        elif chunk_id == b"data":
+            if byte_rate is None:
+                raise AudioProbeError("Corrupt WAV file: data chunk before fmt chunk")
+            # Streaming writers leave the data size as 0 or 0xFFFFFFFF; only
+            # the bytes actually present can be counted then
+            available = info.size_bytes - body
+            size = chunk_size if 0 < chunk_size <= available else max(0, available)
+            info.duration = size / byte_rate
+            info.source = "header"
+            return info
+
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if len(data) < info.size_bytes:
+        # Only the head was probed; the data chunk lies beyond it
+        return info
+    raise AudioProbeError("Corrupt WAV file: no data chunk")
+
+
+def probe_flac(data: bytes, info: AudioInfo) -> AudioInfo:
+    """Read the STREAMINFO block (always the first metadata block)"""
+    if len(data) < 8 + 34 or data[4] & 0x7F != 0:
+        raise AudioProbeError("Corrupt FLAC file: missing STREAMINFO")
+    packed = int.from_bytes(data[8 + 10:8 + 18], "big")
+    info.sample_rate = packed >> 44
+    info.channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & ((1 << 36) - 1)
+    if not info.sample_rate:
+        raise AudioProbeError("Corrupt FLAC file: invalid sample rate")
+    if total_samples:
+        info.duration = total_samples / info.sample_rate
+        info.source = "header"
+    return info
+
+
+def probe_ogg(data: bytes, info: AudioInfo) -> AudioInfo:
+    """
+    Read the Vorbis/Opus identification header from the first page and the
+    granule position of the last page (needs the tail of the file).
+    """
+    if len(data) < 27:
+        raise AudioProbeError("Corrupt OGG file: truncated page header")
+    packet_start = 27 + data[26]
+    packet = bytes(data[packet_start:packet_start + 19])
+    pre_skip, granule_rate = 0, None
+
+    if packet[:7] == b"\x01vorbis" and len(packet) >= 16:
+        info.channels = packet[11]
+        info.sample_rate = struct.unpack_from("<I", packet, 12)[0]
+        granule_rate = info.sample_rate
+    elif packet[:8] == b"OpusHead" and len(packet) >= 16:
+        info.channels = packet[9]
+        pre_skip = struct.unpack_from("<H", packet, 10)[0]
+        info.sample_rate = struct.unpack_from("<I", packet, 12)[0] or 48000
+        # Opus granule positions always count 48kHz samples
+        granule_rate = 48000
+
+    if granule_rate and len(data) == info.size_bytes:
+        last_page = data.rfind(b"OggS", max(0, len(data) - PROBE_BYTES))
+        if last_page >= 0 and last_page + 14 <= len(data):
+            granule = struct.unpack_from("<q", data, last_page + 6)[0]
+            if granule >= 0:
+                info.duration = max(0, granule - pre_skip) / granule_rate
+                info.source = "header"
+    return info
+
+
+def _skip_id3(data: bytes) -> int:
+    """Offset of the first byte after an ID3v2 tag"""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def probe_mp3(data: bytes, info: AudioInfo) -> AudioInfo:
+    """
+    Find the first valid Layer III frame header. Duration comes from a
+    Xing/Info or VBRI frame count when present, otherwise from the bitrate
+    and file size (CBR estimate).
+    """
+    start = _skip_id3(data)
+    if start >= info.size_bytes:
+        raise AudioProbeError("Corrupt MP3 file: no audio after ID3 tag")
+
+    end = min(len(data) - 4, start + PROBE_BYTES)
+    position = start
+    while position < end:
+        position = data.find(b"\xff", position, end)
+        if position < 0:
+            break
+        b1, b2, b3 = data[position + 1], data[position + 2], data[position + 3]
+        version, layer = (b1 >> 3) & 0x3, (b1 >> 1) & 0x3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x3
+        if b1 & 0xE0 != 0xE0 or version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            position += 1
+            continue
+
+        mpeg1 = version == 3
+        mono = (b3 >> 6) == 3
+        info.sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        info.channels = 1 if mono else 2
+        samples_per_frame = 1152 if mpeg1 else 576
+        bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = position + 4 + side_info
+        frames = None
+        if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+            if struct.unpack_from(">I", data, xing + 4)[0] & 0x1:
+                frames = struct.unpack_from(">I", data, xing + 8)[0]
+        elif data[position + 36:position + 40] == b"VBRI" and len(data) >= position + 54:
+            frames = struct.unpack_from(">I", data, position + 36 + 14)[0]
+
+        if frames:
+            info.duration = frames * samples_per_frame / info.sample_rate
+            info.source = "header"
+        else:
+            info.duration = (info.size_bytes - position) * 8 / bitrate
+            info.source = "estimate"
+        return info
+
+    if len(data) < info.size_bytes:
+        return info
+    raise AudioProbeError("Corrupt MP3 file: no valid frame header")
+
+
+def probe_container(data: bytes, info: AudioInfo) -> AudioInfo:
+    """Read webm/m4a/other headers through PyAV (demuxer probe only, no decode)"""
+    if av is None or len(data) < info.size_bytes:
+        return info
+    try:
+        with av.open(io.BytesIO(data), mode="r") as container:
+            if not container.streams.audio:
+                raise AudioProbeError("File contains no audio stream")
+            stream = container.streams.audio[0]
+            info.sample_rate = stream.sample_rate or None
+            info.channels = stream.channels or None
+            if container.duration:
+                info.duration = container.duration / av.time_base
+                info.source = "header"
+    except AudioProbeError:
+        raise
+    except Exception as e:
+        # The ffmpeg fallback in the decoder may still cope with it
+        logger.debug(f"PyAV could not probe {info.format or 'unknown'} audio: {str(e)}")
+    return info
+
+
+_PROBES = {
+    "wav": probe_wav,
+    "flac": probe_flac,
+    "ogg": probe_ogg,
+    "mp3": probe_mp3
+}
+
+
+def probe_audio(data: bytes, size_bytes: Optional[int] = None) -> AudioInfo:
+    """
+    Inspect audio headers without decoding.
+
+    Args:
+        data: The whole file, or just its head while it is still streaming in
+        size_bytes: Total file size when `data` is only the head (e.g. from
+            Content-Length); defaults to len(data)
+
+    Raises:
+        AudioProbeError: The file is empty or its headers are corrupt
+    """
+    size_bytes = len(data) if size_bytes is None else size_bytes
+    if not size_bytes:
+        raise AudioProbeError("Audio file is empty", reason="empty")
+
+    info = AudioInfo(format=sniff_format(data), size_bytes=size_bytes)
+    try:
+        return _PROBES.get(info.format, probe_container)(data, info)
+    except (struct.error, IndexError):
+        raise AudioProbeError(f"Corrupt {info.format} file: truncated header")
+
+
+def check_audio_info(info: AudioInfo) -> AudioInfo:
+    """
+    Reject files whose headers already show they are empty or too long.
+
+    Raises:
+        ValueError: Over MAX_AUDIO_DURATION_SECONDS or no audio
+    """
+    if info.duration is None:
+        return info
+
+    limit = settings.MAX_AUDIO_DURATION_SECONDS
+    if info.source == "estimate":
+        limit *= _ESTIMATE_SLACK
+    if info.duration > limit:
+        probe_counts["too_long"] += 1
+        raise ValueError(f"Audio duration ({info.duration:.1f}s) exceeds maximum allowed ({settings.MAX_AUDIO_DURATION_SECONDS}s)")
+    if info.duration == 0 and info.source == "header":
+        raise AudioProbeError("Audio file contains no samples", reason="empty")
+    return info
+
+
+def probe_and_check(data: bytes, size_bytes: Optional[int] = None) -> AudioInfo:
+    """probe_audio() + check_audio_info(), counting empty and corrupt files"""
+    try:
+        return check_audio_info(probe_audio(data, size_bytes))
+    except AudioProbeError as e:
+        probe_counts[e.reason] += 1
+        raise
+
+
+def finish_probe(data: bytes, head_info: Optional[AudioInfo] = None) -> AudioInfo:
+    """
+    AudioInfo for a complete file whose head may already have been probed
+    while it streamed in.
+
+    The head's result is reused whenever it is final: the file has the size
+    the head was probed with, and either the duration is known or the head
+    was the whole file. Only formats whose duration lives past
+    the head (the last OGG page, containers probed through PyAV) are probed
+    again over the full bytes.
+    """
+    if head_info is not None and head_info.size_bytes == len(data) and (
+        head_info.duration is not None or len(data) <= PROBE_BYTES
+    ):
+        return head_info
+    return probe_and_check(data)
@@ -0,0 +1,55 @@
+"""
+ASR Service Quality - Recording quality gate
+Rejects near-silent, clipped and noise-only recordings before inference, using
+the analysis shared with the orchestrator (shared/utils/audio_quality.py)
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from shared.utils.audio_quality import QualityThresholds, assess_quality, rerecord_result
+except ImportError:
+    # shared/ is mounted into the container by docker-compose
+    assess_quality = None
+    logger.warning("shared.utils.audio_quality not importable, quality gate disabled")
+
+
+class AudioQualityError(ValueError):
+    """Raised when a recording is too poor to transcribe; `result` tells the user how to re-record"""
+
+    def __init__(self, report: Dict[str, Any]):
+        self.report = report
+        self.result = rerecord_result(report)
+        super().__init__(f"Recording quality too low: {', '.join(report['issues'])}")
+
+
+def check_quality(audio: np.ndarray) -> Optional[Dict[str, float]]:
+    """
+    Quality metrics for decoded 16kHz audio.
+
+    Returns None when the gate is disabled or the shared analysis is not
+    available. Raises AudioQualityError when the recording fails the
+    QUALITY_* thresholds.
+    """
+    if not settings.QUALITY_GATE_ENABLED or assess_quality is None:
+        return None
+
+    report = assess_quality(
+        audio,
+        thresholds=QualityThresholds(
+            min_speech_dbfs=settings.QUALITY_MIN_SPEECH_DBFS,
+            max_clipping_ratio=settings.QUALITY_MAX_CLIPPING_RATIO,
+            min_snr_db=settings.QUALITY_MIN_SNR_DB,
+            min_speech_ratio=settings.QUALITY_MIN_SPEECH_RATIO
+        )
+    )
+    if not report["ok"]:
+        raise AudioQualityError(report)
+    return report["metrics"]
@@ -0,0 +1,81 @@
+"""
+ASR Service Router - Per-request Whisper model selection
+Picks a model by audio duration, requested accuracy tier and current load
+"""
+
+import logging
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ACCURACY_TIERS = ("fast", "balanced", "accurate")
+
+# Whisper model sizes from smallest to largest
+_SIZE_ORDER = ["tiny", "base", "small", "medium", "large"]
+
+
+def _size_rank(model_name: str) -> int:
+    """Rank a model name by size (tiny.en, distil-small.en, large-v3, ... included)"""
+    name = model_name.lower()
+    if "turbo" in name:
+        return _SIZE_ORDER.index("medium")
+    for rank, size in enumerate(_SIZE_ORDER):
+        if size in name:
+            return rank
+    return len(_SIZE_ORDER)
+
+
+def routable_models() -> List[str]:
+    """Configured models ordered from smallest to largest"""
+    names = list(dict.fromkeys([settings.WHISPER_MODEL] + list(settings.WHISPER_MODELS)))
+    return sorted(names, key=_size_rank)
+
+
+def validate_accuracy(accuracy: Optional[str]) -> Optional[str]:
+    """Normalize the accuracy tier, raising ValueError for unknown tiers"""
+    if accuracy is None or accuracy == "":
+        return None
+    accuracy = accuracy.lower()
+    if accuracy not in ACCURACY_TIERS:
+        raise ValueError(f"Unsupported accuracy tier: {accuracy}. Supported: {list(ACCURACY_TIERS)}")
+    return accuracy
+
+
+def route_model(duration: float, accuracy: Optional[str] = None, load: int = 0) -> str:
+    """
+    Choose a Whisper model for one request.
+
+    - fast: smallest model; accurate: largest model
+    - balanced / unspecified: smallest model for clips shorter than
+      ROUTER_SHORT_CLIP_SECONDS, largest for clips of at least
+      ROUTER_LONG_CLIP_SECONDS, WHISPER_MODEL in between
+    - when `load` (requests in flight) reaches ROUTER_LOAD_SHED_THRESHOLD,
+      non-accurate requests step down one model size
+
+    Args:
+        duration: Audio duration in seconds
+        accuracy: Requested accuracy tier
+        load: Current number of requests in flight
+    """
+    models = routable_models()
+    if len(models) == 1:
+        return models[0]
+
+    if accuracy == "fast":
+        index = 0
+    elif accuracy == "accurate":
+        index = len(models) - 1
+    elif duration < settings.ROUTER_SHORT_CLIP_SECONDS:
+        index = 0
+    elif duration >= settings.ROUTER_LONG_CLIP_SECONDS:
+        index = len(models) - 1
+    else:
+        index = models.index(settings.WHISPER_MODEL)
+
+    if accuracy != "accurate" and index > 0 and load >= settings.ROUTER_LOAD_SHED_THRESHOLD:
+        logger.info(f"Load shedding: {load} requests in flight, stepping down from {models[index]}")
+        index -= 1
+
+    return models[index]
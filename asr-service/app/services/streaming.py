@@ -0,0 +1,270 @@
+"""
+ASR Service Streaming - Incremental transcription for WebSocket clients
+Segments incoming audio with energy VAD and transcribes each speech segment
+as soon as the speaker pauses
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vad import SAMPLE_RATE, frame_length, frame_energy_db, energy_threshold_db
+from app.services.decode import ContainerDecoder, resample_linear
+from app.services.logic import (
+    get_batcher,
+    get_executor,
+    get_mock_response,
+    transcribe_batch,
+    align_transcription,
+    format_transcription
+)
+
+logger = logging.getLogger(__name__)
+
+PCM_ENCODINGS = {"pcm_s16le": np.int16, "pcm_f32le": np.float32}
+CONTAINER_ENCODINGS = {"webm", "ogg"}
+
+
+class StreamSession:
+    """
+    State for one streaming transcription session.
+
+    Audio chunks are appended to a 16kHz buffer. VAD runs only over newly
+    completed frames; a speech segment is closed once trailing silence exceeds
+    STREAM_ENDPOINT_SILENCE_MS (or the segment reaches STREAM_MAX_SEGMENT_SECONDS)
+    and is transcribed into a "final" event. While a segment is still open, the
+    audio added since the last "partial" event is transcribed every
+    STREAM_PARTIAL_INTERVAL_MS and appended to the running partial hypothesis.
+
+    webm/ogg input goes through one ContainerDecoder for the whole session, so
+    each chunk only decodes its own bytes. Call `close()` when the session ends.
+
+    Args:
+        language: Language code (default from settings)
+        encoding: pcm_s16le, pcm_f32le, webm or ogg
+        sample_rate: Sample rate of PCM input (ignored for containers)
+    """
+
+    def __init__(self, language: Optional[str] = None, encoding: str = "pcm_s16le", sample_rate: int = SAMPLE_RATE):
+        if encoding not in PCM_ENCODINGS and encoding not in CONTAINER_ENCODINGS:
+            raise ValueError(
+                f"Unsupported stream encoding: {encoding}. "
+                f"Supported: {sorted(PCM_ENCODINGS) + sorted(CONTAINER_ENCODINGS)}"
+            )
+        if sample_rate <= 0:
+            raise ValueError(f"Invalid sample rate: {sample_rate}")
+
+        self.language = language or settings.WHISPER_LANGUAGE
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+
+        self._buffer = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        self._length = 0
+        self._decoder = ContainerDecoder(encoding) if encoding in CONTAINER_ENCODINGS else None
+        self._pcm_remainder = b""
+
+        self._frame = frame_length()
+        self._energies = np.zeros(0, dtype=np.float32)
+        self._segment_start: Optional[int] = None  # sample index
+        self._silence_frames = 0
+        self._partial_from = 0  # sample index the next partial transcribes from
+        self._partial_text: List[str] = []
+        self._partial_words: List[Dict[str, Any]] = []
+
+        self.segments: List[Dict[str, Any]] = []
+
+    @property
+    def audio(self) -> np.ndarray:
+        """Samples received so far (a view into the session buffer)"""
+        return self._buffer[:self._length]
+
+    @property
+    def duration(self) -> float:
+        return self._length / SAMPLE_RATE
+
+    async def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Append an audio chunk and return any partial/final events it produced"""
+        if self._decoder is not None:
+            self._append(await get_executor().run(self._decoder.feed, chunk))
+        else:
+            self._append_pcm(chunk)
+
+        if self.duration > settings.MAX_AUDIO_DURATION_SECONDS:
+            raise ValueError(
+                f"Stream duration ({self.duration:.1f}s) exceeds maximum allowed "
+                f"({settings.MAX_AUDIO_DURATION_SECONDS}s)"
+            )
+
+        if settings.MOCK_MODE:
+            return []
+
+        events = []
+        for start, end in self._advance_vad():
+            events.append(await self._finalize(start, end))
+
+        if self._segment_start is not None:
+            partial_interval = int(SAMPLE_RATE * settings.STREAM_PARTIAL_INTERVAL_MS / 1000)
+            if self._length - self._partial_from >= partial_interval:
+                event = await self._partial()
+                if event is not None:
+                    events.append(event)
+
+        return events
+
+    async def finish(self) -> List[Dict[str, Any]]:
+        """Flush the open segment and return the final events plus a summary"""
+        if settings.MOCK_MODE:
+            mock = get_mock_response()
+            return [{"type": "done", **mock}]
+
+        events = []
+        if self._decoder is not None:
+            self._append(await get_executor().run(self._decoder.close))
+            for start, end in self._advance_vad():
+                events.append(await self._finalize(start, end))
+
+        if self._segment_start is not None:
+            events.append(await self._finalize(self._segment_start, self._length))
+            self._segment_start = None
+
+        words = [word for segment in self.segments for word in segment["words"]]
+        events.append({
+            "type": "done",
+            "transcript": " ".join(segment["text"] for segment in self.segments if segment["text"]),
+            "words": words,
+            "segments": self.segments,
+            "language": self.language or "en",
+            "duration": round(self.duration, 3),
+            "model_used": settings.WHISPER_MODEL
+        })
+        return events
+
+    async def close(self):
+        """Stop the container decoder thread, if any (safe to call more than once)"""
+        if self._decoder is not None:
+            await get_executor().run(self._decoder.close)
+
+    def _append(self, samples: np.ndarray):
+        """Append 16kHz samples, growing the buffer geometrically instead of per chunk"""
+        end = self._length + len(samples)
+        if end > len(self._buffer):
+            grown = np.zeros(max(end, 2 * len(self._buffer)), dtype=np.float32)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+        self._buffer[self._length:end] = samples
+        self._length = end
+
+    def _append_pcm(self, chunk: bytes):
+        """Convert an incoming PCM chunk to float32 samples at 16kHz"""
+        dtype = PCM_ENCODINGS[self.encoding]
+        data = self._pcm_remainder + chunk
+        itemsize = np.dtype(dtype).itemsize
+        usable = len(data) - len(data) % itemsize
+        self._pcm_remainder = data[usable:]
+
+        samples = np.frombuffer(data[:usable], dtype=dtype)
+        if dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        self._append(resample_linear(samples.astype(np.float32, copy=False), self.sample_rate))
+
+    def _advance_vad(self) -> List[tuple]:
+        """Run VAD over newly completed frames and return closed segments as (start, end) samples"""
+        done_frames = len(self._energies)
+        new_audio = self.audio[done_frames * self._frame:]
+        new_energies = frame_energy_db(new_audio)
+        if len(new_energies) == 0:
+            return []
+
+        self._energies = np.concatenate([self._energies, new_energies])
+        threshold = energy_threshold_db(self._energies)
+
+        padding = int(SAMPLE_RATE * settings.VAD_PADDING_MS / 1000)
+        endpoint_frames = max(1, settings.STREAM_ENDPOINT_SILENCE_MS // settings.VAD_FRAME_MS)
+        max_segment = int(SAMPLE_RATE * settings.STREAM_MAX_SEGMENT_SECONDS)
+
+        closed = []
+        for offset, is_speech in enumerate(new_energies > threshold):
+            frame_index = done_frames + offset
+            frame_end = (frame_index + 1) * self._frame
+
+            if is_speech:
+                if self._segment_start is None:
+                    self._segment_start = max(0, frame_index * self._frame - padding)
+                    self._reset_partial(self._segment_start)
+                self._silence_frames = 0
+            elif self._segment_start is not None:
+                self._silence_frames += 1
+
+            if self._segment_start is None:
+                continue
+
+            if self._silence_frames >= endpoint_frames or frame_end - self._segment_start >= max_segment:
+                speech_end = frame_end - self._silence_frames * self._frame
+                closed.append((self._segment_start, min(self._length, speech_end + padding)))
+                self._segment_start = None
+                self._silence_frames = 0
+
+        return closed
+
+    def _reset_partial(self, start: int):
+        self._partial_from = start
+        self._partial_text = []
+        self._partial_words = []
+
+    async def _partial(self) -> Optional[Dict[str, Any]]:
+        """Transcribe the audio added since the last partial and extend the running hypothesis"""
+        start, end = self._partial_from, self._length
+        self._partial_from = end
+        piece = await self._transcribe(start, end)
+        if piece is None:
+            return None
+
+        if piece["text"]:
+            self._partial_text.append(piece["text"])
+        self._partial_words.extend(piece["words"])
+        segment = {
+            "text": " ".join(self._partial_text),
+            "start": round(self._segment_start / SAMPLE_RATE, 3),
+            "end": piece["end"],
+            "words": list(self._partial_words)
+        }
+        return {"type": "partial", "segment_index": len(self.segments), "segment": segment}
+
+    async def _finalize(self, start: int, end: int) -> Dict[str, Any]:
+        """Transcribe a closed segment and record it"""
+        segment = await self._transcribe(start, end)
+        if segment is None:
+            segment = {"text": "", "start": round(start / SAMPLE_RATE, 3), "end": round(end / SAMPLE_RATE, 3), "words": []}
+        self.segments.append(segment)
+        return {"type": "final", "segment_index": len(self.segments) - 1, "segment": segment}
+
+    async def _transcribe(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        """Transcribe and align audio[start:end], with timestamps in stream time"""
+        audio = self.audio[start:end]
+        if len(audio) < self._frame:
+            return None
+
+        # Admission is held per call, not per connection, so idle streams
+        # don't occupy INFERENCE_MAX_PENDING slots
+        executor = get_executor()
+        async with executor.admission(wait=True):
+            if settings.BATCH_ENABLED:
+                result = await get_batcher().submit(audio, self.language)
+            else:
+                result = (await executor.run(transcribe_batch, [audio], self.language))[0]
+            result = await executor.run(align_transcription, result, audio, self.language)
+        payload = format_transcription(result, len(audio) / SAMPLE_RATE, 0.0)
+
+        offset = start / SAMPLE_RATE
+        words = [
+            {**word, "start": round(word["start"] + offset, 3), "end": round(word["end"] + offset, 3)}
+            for word in payload["words"]
+        ]
+        return {
+            "text": payload["transcript"],
+            "start": round(offset, 3),
+            "end": round(end / SAMPLE_RATE, 3),
+            "words": words
+        }
@@ -0,0 +1,199 @@
+"""
+ASR Service VAD - Vectorized energy-based voice activity detection
+Frame-level speech/silence decisions computed with NumPy
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+def frame_length(frame_ms: Optional[int] = None) -> int:
+    """Number of samples per VAD frame"""
+    return int(SAMPLE_RATE * (frame_ms or settings.VAD_FRAME_MS) / 1000)
+
+
+def frame_energy_db(audio: np.ndarray, frame_ms: Optional[int] = None) -> np.ndarray:
+    """
+    Compute per-frame RMS energy in dBFS.
+
+    Trailing samples that do not fill a whole frame are ignored.
+    """
+    size = frame_length(frame_ms)
+    n_frames = len(audio) // size
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = audio[:n_frames * size].reshape(n_frames, size)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def energy_threshold_db(energy_db: np.ndarray) -> float:
+    """
+    Speech threshold: a fixed floor, raised to sit above the estimated noise
+    floor (10th percentile frame energy) for noisy recordings.
+
+    In a clip that is speech throughout, the 10th percentile is itself
+    speech, so the raised threshold is capped at VAD_SPEECH_RANGE_DB below
+    the loud frames (95th percentile); quieter stretches of speech within
+    that range are kept.
+    """
+    threshold = settings.VAD_ENERGY_THRESHOLD_DB
+    if len(energy_db) > 0:
+        noise_floor, loud_level = np.percentile(energy_db, [10, 95])
+        adaptive = min(noise_floor + settings.VAD_NOISE_MARGIN_DB, loud_level - settings.VAD_SPEECH_RANGE_DB)
+        threshold = max(threshold, float(adaptive))
+    return threshold
+
+
+def speech_mask(energy_db: np.ndarray, threshold_db: Optional[float] = None) -> np.ndarray:
+    """Boolean speech decision per frame"""
+    if threshold_db is None:
+        threshold_db = energy_threshold_db(energy_db)
+    return energy_db > threshold_db
+
+
+def speech_regions(audio: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Find speech regions as (start, end) sample ranges.
+
+    Regions are padded by VAD_PADDING_MS, gaps shorter than VAD_MIN_SILENCE_MS
+    are bridged, and regions shorter than VAD_MIN_SPEECH_MS are dropped.
+    """
+    size = frame_length()
+    mask = speech_mask(frame_energy_db(audio))
+    if not mask.any():
+        return []
+
+    # Rising/falling edges of the speech mask, in frames
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], mask, [False])).astype(np.int8)))
+    starts, ends = edges[0::2] * size, edges[1::2] * size
+
+    padding = int(SAMPLE_RATE * settings.VAD_PADDING_MS / 1000)
+    starts = np.maximum(starts - padding, 0)
+    ends = np.minimum(ends + padding, len(audio))
+
+    # Bridge short pauses (including overlaps created by padding)
+    min_silence = int(SAMPLE_RATE * settings.VAD_MIN_SILENCE_MS / 1000)
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > min_silence))
+    merged_starts = starts[keep]
+    merged_ends = np.maximum.reduceat(ends, np.flatnonzero(keep))
+
+    min_speech = int(SAMPLE_RATE * settings.VAD_MIN_SPEECH_MS / 1000)
+    long_enough = merged_ends - merged_starts >= min_speech
+
+    return [
+        (int(start), int(end))
+        for start, end in zip(merged_starts[long_enough], merged_ends[long_enough])
+    ]
+
+
+@dataclass
+class SpeechLayout:
+    """
+    Mapping between the trimmed (speech-only) audio and the original recording.
+
+    Region i occupies original samples [starts[i], ends[i]) and trimmed samples
+    [offsets[i], offsets[i] + ends[i] - starts[i]).
+    """
+    starts: np.ndarray
+    ends: np.ndarray
+    offsets: np.ndarray
+    original_samples: int
+
+    @property
+    def speech_duration(self) -> float:
+        return float((self.ends - self.starts).sum()) / SAMPLE_RATE
+
+    @property
+    def skipped_duration(self) -> float:
+        return self.original_samples / SAMPLE_RATE - self.speech_duration
+
+    def to_original(self, times: np.ndarray, is_end: bool = False) -> np.ndarray:
+        """
+        Map trimmed-audio times (seconds) back to original-recording times.
+        A time exactly on a region join maps to the next region's start, or to
+        the previous region's end when `is_end` is set.
+        """
+        samples = np.asarray(times, dtype=np.float64) * SAMPLE_RATE
+        side = "left" if is_end else "right"
+        region = np.clip(np.searchsorted(self.offsets, samples, side=side) - 1, 0, len(self.offsets) - 1)
+        within = np.clip(samples - self.offsets[region], 0, self.ends[region] - self.starts[region])
+        return (self.starts[region] + within) / SAMPLE_RATE
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "speech_duration": round(self.speech_duration, 3),
+            "skipped_duration": round(self.skipped_duration, 3),
+            "regions": len(self.starts)
+        }
+
+
+def trim_silence(audio: np.ndarray) -> Tuple[np.ndarray, Optional[SpeechLayout]]:
+    """
+    Cut leading/trailing silence and long pauses out of a clip.
+
+    Returns:
+        Tuple of (speech-only audio, layout for remapping timestamps). If no
+        speech is detected or nothing would be skipped, the original audio is
+        returned with a None layout so quiet speakers are still transcribed.
+    """
+    regions = speech_regions(audio)
+    if not regions:
+        logger.info("VAD found no speech, transcribing full clip")
+        return audio, None
+
+    starts = np.array([start for start, _ in regions], dtype=np.int64)
+    ends = np.array([end for _, end in regions], dtype=np.int64)
+    if len(regions) == 1 and starts[0] == 0 and ends[0] == len(audio):
+        return audio, None
+
+    lengths = ends - starts
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    layout = SpeechLayout(starts=starts, ends=ends, offsets=offsets, original_samples=len(audio))
+
+    trimmed = np.concatenate([audio[start:end] for start, end in regions])
+    logger.info(
+        f"VAD kept {layout.speech_duration:.2f}s of {len(audio) / SAMPLE_RATE:.2f}s "
+        f"in {len(regions)} region(s)"
+    )
+    return trimmed, layout
+
+
+def remap_transcription(result: Dict[str, Any], layout: Optional[SpeechLayout]) -> Dict[str, Any]:
+    """
+    Shift segment and word timestamps of a WhisperX result from trimmed-audio
+    time back to original-recording time (in place).
+    """
+    if layout is None:
+        return result
+
+    # Gather every timestamp, remap in one vectorized call, then write back
+    slots = []
+    for segment in result.get("segments", []):
+        for key in ("start", "end"):
+            if segment.get(key) is not None:
+                slots.append((segment, key))
+        for word in segment.get("words", []):
+            for key in ("start", "end"):
+                if word.get(key) is not None:
+                    slots.append((word, key))
+
+    for key in ("start", "end"):
+        keyed = [item for item, slot_key in slots if slot_key == key]
+        if not keyed:
+            continue
+        remapped = layout.to_original(np.array([item[key] for item in keyed]), is_end=key == "end")
+        for item, value in zip(keyed, remapped):
+            item[key] = float(value)
+
+    return result
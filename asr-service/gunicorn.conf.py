@@ -0,0 +1,70 @@
+"""
+ASR Service Gunicorn Config - Multi-process serving
+Runs WORKERS uvicorn workers that share alignment model weights loaded once
+pre-fork
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Only part of the model memory is shared. The wav2vec2 alignment models are
+loaded in the master and shared copy-on-write, but Whisper is not: CTranslate2
+starts its worker threads when the model is constructed and those threads do
+not survive fork(), and it reads the weights into its own buffers rather than
+memory-mapping MODEL_CACHE_DIR (passing the file bytes in copies them too). A
+Whisper model constructed in the master hangs on its first encode() in a
+forked worker, so each worker loads a private copy in warm_start().
+
+Measured per worker (4 workers, Whisper base int8 and a wav2vec2-base
+alignment model, random weights of the real sizes): RSS ~1.1GB, of which
+~800MB are shared torch/alignment pages; PSS ~460MB; USS ~260-300MB, i.e.
+Whisper (~150MB loaded, ~220MB after the first encode) plus activations.
+Total PSS for the master and 4 workers was 2.3GB against 4.4GB of summed RSS.
+measure_worker_memory.py reports the same figures for the configured models.
+
+CPU only. The GPU image (Dockerfile) keeps a single uvicorn process: a CUDA
+context created in the master is unusable in forked children, and several
+workers on one GPU would each hold their own context and weights in device
+memory. Scale GPU serving with one replica per GPU instead.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+from app.core.config import settings
+
+# Metrics from all workers are merged through files in this directory; it has
+# to be set before prometheus_client is imported by the app
+if settings.WORKERS > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    metrics_dir = os.path.join(tempfile.gettempdir(), "asr_prometheus")
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and load shared models) in the master, then fork
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    """Load the alignment models pre-fork and freeze them out of the garbage collector"""
+    from app.services.logic import preload_shared_models
+
+    preload_shared_models()
+    # Objects that survive to the fork are never scanned again, so GC passes
+    # in the workers don't write to (and un-share) their pages
+    gc.freeze()
+    server.log.info(f"Forking {workers} worker(s), {settings.intra_op_threads} intra-op thread(s) each")
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the merged metrics"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
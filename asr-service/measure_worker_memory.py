@@ -0,0 +1,82 @@
+"""
+ASR Service Worker Memory
+Per-worker memory of the gunicorn multi-process mode: loads the shared models
+pre-fork the way gunicorn.conf.py does, forks the workers, runs warm_start()
+in each and reports what every worker holds.
+
+    WORKERS=4 python measure_worker_memory.py
+
+RSS counts shared pages in full in every worker, so it overstates the total.
+PSS splits shared pages between the processes that map them (the sum is the
+real footprint), and USS is what the worker holds alone (its own Whisper copy,
+activations and allocator caches) and what each extra worker costs.
+Linux only: reads /proc/<pid>/smaps_rollup.
+"""
+
+import gc
+import os
+import time
+
+from app.core.config import settings
+from app.services.logic import _startup, preload_shared_models, warm_start
+
+MB = 1024 * 1024
+
+
+def memory_mb(pid) -> dict:
+    """RSS, PSS and USS of a process in MB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f.readlines()[1:]:
+            name, kb, *_ = line.split()
+            fields[name.rstrip(":")] = int(kb) * 1024 / MB
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"]
+    }
+
+
+def start_worker(ready_fd: int) -> int:
+    """Fork a worker that warm-starts, signals ready and then idles"""
+    pid = os.fork()
+    if pid == 0:
+        warm_start()
+        os.write(ready_fd, b"1" if _startup["state"] == "ready" else b"0")
+        time.sleep(3600)
+        os._exit(0)
+    return pid
+
+
+def main():
+    settings.DEVICE = "cpu"
+    workers = max(1, settings.WORKERS)
+
+    preload_shared_models()
+    gc.freeze()
+    master = memory_mb(os.getpid())
+
+    ready_r, ready_w = os.pipe()
+    pids = [start_worker(ready_w) for _ in range(workers)]
+    try:
+        failed = sum(os.read(ready_r, 1) != b"1" for _ in pids)
+        if failed:
+            raise SystemExit(f"{failed} worker(s) failed to warm start")
+
+        print(f"model: {settings.WHISPER_MODEL} ({settings.compute_type}), shared: {_startup['shared_models']}")
+        print(f"{'process':>10} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}")
+        print(f"{'master':>10} {master['rss']:>8.0f} {master['pss']:>8.0f} {master['uss']:>8.0f}")
+        usage = [memory_mb(pid) for pid in pids]
+        for pid, mem in zip(pids, usage):
+            print(f"{pid:>10} {mem['rss']:>8.0f} {mem['pss']:>8.0f} {mem['uss']:>8.0f}")
+
+        total = memory_mb(os.getpid())["pss"] + sum(mem["pss"] for mem in usage)
+        print(f"total PSS {total:.0f} MB; each extra worker adds ~{sum(m['uss'] for m in usage) / workers:.0f} MB")
+    finally:
+        for pid in pids:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@ Phoneme Map Service Logic - CMUdict Lookup with G2P Fallback
 
 This service maps words to their canonical ARPAbet phoneme representations
 using the CMU Pronouncing Dictionary (CMUdict) for known words and
-g2p_en for out-of-vocabulary (OOV) words.
+g2p_en for out-of-vocabulary (OOV) words. The OOV words of a request are
+predicted in one batch (shared.utils.g2p_batch) when the shared package is
+available.
 """
 
 import re
@@ -12,6 +14,12 @@ from typing import List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+try:
+    from shared.utils.g2p_batch import g2p_batch
+except ImportError:
+    g2p_batch = None
+    logger.warning("shared.utils.g2p_batch not available, OOV words go through G2P one at a time")
+
 # Global caches
 _CMUDICT = None
 _G2P = None
@@ -142,6 +150,34 @@ def g2p_fallback(word: str) -> List[str]:
         return []
 
 
+def g2p_fallback_batch(words: List[str]) -> Dict[str, List[str]]:
+    """
+    g2p_fallback() for many words, predicted in one batch.
+    
+    Args:
+        words: The words to convert
+    
+    Returns:
+        Mapping of each word to its ARPAbet phonemes
+    """
+    g2p = get_g2p()
+    if g2p is None or g2p_batch is None:
+        return {word: g2p_fallback(word) for word in words}
+    
+    normalized = {word: normalize_word(word) for word in words}
+    unique = sorted({n for n in normalized.values() if n})
+    try:
+        predicted = dict(zip(unique, g2p_batch(g2p, unique)))
+    except Exception as e:
+        logger.error(f"Batched G2P failed, converting words one at a time: {e}")
+        return {word: g2p_fallback(word) for word in words}
+    
+    return {
+        word: [clean_phoneme(p.strip()) for p in predicted.get(n, []) if p.strip()]
+        for word, n in normalized.items()
+    }
+
+
 def map_word_to_phonemes(word: str) -> List[str]:
     """
     Map a single word to its ARPAbet phoneme representation.
@@ -189,23 +225,29 @@ async def run_service_logic(req) -> Dict[str, any]:
     logger.info(f"Words received: {req.words}")
     
     result_map = {}
-    oov_count = 0
+    oov_words = []
     
     for word in req.words:
         if not word or not word.strip():
             continue
         
-        phonemes = map_word_to_phonemes(word)
-        
         # Use original word as key (preserve case for response)
-        result_map[word] = phonemes
-        
-        # Track OOV
-        normalized = normalize_word(word)
-        if normalized and normalized not in get_cmudict():
-            oov_count += 1
-    
-    logger.info(f"Mapped {len(result_map)} words ({oov_count} OOV)")
+        phonemes = lookup_word(word)
+        if phonemes:
+            result_map[word] = phonemes
+        else:
+            result_map[word] = []
+            oov_words.append(word)
+    
+    # All OOV words go through G2P together
+    if oov_words:
+        logger.info(f"OOV words {oov_words}, using G2P fallback")
+        for word, phonemes in g2p_fallback_batch(oov_words).items():
+            if not phonemes:
+                logger.warning(f"No phonemes found for word: '{word}'")
+            result_map[word] = phonemes
+    
+    logger.info(f"Mapped {len(result_map)} words ({len(oov_words)} OOV)")
     logger.info("=" * 50)
     
     return {"map": result_map}
@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0003_task_quality"
+down_revision = "0002_seed_sample"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Recording quality metrics (levels, clipping, SNR, speech ratio) for analytics
+    op.add_column("tasks", sa.Column("quality", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column("tasks", "quality")
@@ -1,11 +1,21 @@
 import requests
 from shared.utils.audio_utils import save_temp_audio
+from shared.utils.audio_quality import QualityThresholds, assess_quality, load_audio_file, rerecord_result
 from app.core.config import settings
 from app.db.database import SessionLocal
 from app.db import models
 
 
-async def run_pipeline(file):
+def quality_thresholds() -> QualityThresholds:
+    return QualityThresholds(
+        min_speech_dbfs=settings.QUALITY_MIN_SPEECH_DBFS,
+        max_clipping_ratio=settings.QUALITY_MAX_CLIPPING_RATIO,
+        min_snr_db=settings.QUALITY_MIN_SNR_DB,
+        min_speech_ratio=settings.QUALITY_MIN_SPEECH_RATIO,
+    )
+
+
+async def run_pipeline(file, target_text=None):
     audio_path = save_temp_audio(file)
     db = SessionLocal()
     task = models.Task(status="created", audio_uri=audio_path)
@@ -13,6 +23,16 @@ async def run_pipeline(file):
     db.commit()
     db.refresh(task)
 
+    # Unusable recordings stop here instead of running ASR, alignment, diff and the LLM.
+    # Formats libsndfile can't read (e.g. webm) are checked by the ASR service instead.
+    loaded = load_audio_file(audio_path) if settings.QUALITY_GATE_ENABLED else None
+    if loaded is not None:
+        report = assess_quality(*loaded, thresholds=quality_thresholds())
+        task.quality = report["metrics"]
+        if not report["ok"]:
+            return _rerecord(db, task, rerecord_result(report))
+        db.commit()
+
     if settings.MOCK_MODE:
         result = {
             "task_id": str(task.id),
@@ -39,10 +59,27 @@ async def run_pipeline(file):
         return result
 
     files = {"file": (file.filename, file.file, file.content_type)}
-    asr = requests.post(f"{settings.ASR_URL}/process/", files=files).json()
+    # With a known script, ASR forced-aligns it instead of decoding
+    data = {"target_text": target_text} if target_text else None
+    asr_response = requests.post(f"{settings.ASR_URL}/process/", files=files, data=data)
+    rerecord = asr_response.json().get("detail") if asr_response.status_code == 422 else None
+    if isinstance(rerecord, dict) and rerecord.get("status") == "rerecord":
+        task.quality = rerecord["quality"]
+        return _rerecord(db, task, rerecord)
+    asr = asr_response.json()
+    if task.quality is None:
+        task.quality = asr.get("quality")
+    # ASR already measured and decoded the audio; alignment reuses both
     alignment = requests.post(
         f"{settings.ALIGN_URL}/process/",
-        json={"audio_url": audio_path, "transcript": asr.get("transcript", "")},
+        json={
+            "audio_url": audio_path,
+            "transcript": asr.get("transcript", ""),
+            "duration": asr.get("duration") or None,
+            "sample_rate": 16000 if asr.get("audio_cache_key") else None,
+            "content_hash": asr.get("content_hash"),
+            "audio_cache_key": asr.get("audio_cache_key"),
+        },
     ).json()
     words = list(set([w.get("word", "") for w in asr.get("words", []) if w.get("word")]))
     phoneme_map = requests.post(
@@ -93,3 +130,11 @@ async def run_pipeline(file):
     db.add(artifact)
     db.commit()
     return result
+
+
+def _rerecord(db, task, rerecord):
+    task.status = "rerecord"
+    result = {"task_id": str(task.id), **rerecord}
+    db.add(models.Artifact(task_id=task.id, type="orchestrator_result", uri="", data=result))
+    db.commit()
+    return result
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+# Decoded audio in the cache is always 16kHz mono float32
+SAMPLE_RATE = 16000
+
+_KEY = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+def content_hash(audio: np.ndarray) -> str:
+    """Hash of the decoded samples; identical audio gets the same key whatever the container"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(memoryview(np.ascontiguousarray(audio, dtype=np.float32)).cast("B"))
+    return digest.hexdigest()
+
+
+class DecodedAudioCache:
+    """
+    Decoded audio shared between services through a local directory (a
+    volume mounted into each container), one .npy file per key.
+
+    Writers save to a temp file and rename, so readers never see a partial
+    array. Reads are memory-mapped. Files are touched on every hit and the
+    least recently used are deleted once the directory grows past
+    `max_bytes`, down to LOW_WATER of it.
+
+    The directory is only scanned when the size tracked since the last scan
+    crosses `max_bytes`, or every `rescan_every` puts to pick up files other
+    writers added, so a put does not cost time proportional to the cache.
+    """
+
+    # Eviction trims to this fraction of max_bytes, so the next puts don't
+    # immediately cross the budget (and scan) again
+    LOW_WATER = 0.9
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3, rescan_every: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_every = max(1, rescan_every)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._tracked_bytes: Optional[int] = None  # Unknown until the first scan
+        self._puts_since_scan = 0
+        self.scans = 0
+
+    def path(self, key: str) -> str:
+        if not _KEY.match(key):
+            raise ValueError(f"Invalid audio cache key: {key!r}")
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            path = self.path(key)
+            audio = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return audio
+
+    def put(self, key: str, audio: np.ndarray) -> str:
+        path = self.path(key)
+        if os.path.exists(path):
+            os.utime(path)
+            return key
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(audio, dtype=np.float32))
+                size = f.tell()
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        with self._lock:
+            self._puts_since_scan += 1
+            if self._tracked_bytes is not None:
+                self._tracked_bytes += size
+            due = (
+                self._tracked_bytes is None
+                or self._tracked_bytes > self.max_bytes
+                or self._puts_since_scan >= self.rescan_every
+            )
+            if due:
+                self._puts_since_scan = 0
+        if due:
+            self.evict()
+        return key
+
+    def evict(self):
+        """Scan the directory; when it is over budget, delete least recently used files down to LOW_WATER"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * self.LOW_WATER
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+        with self._lock:
+            self._tracked_bytes = total
+            self.scans += 1
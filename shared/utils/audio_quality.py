@@ -0,0 +1,147 @@
+"""
+Recording quality analysis shared by asr-service and the orchestrator: level,
+clipping, SNR and speech-ratio metrics, and the re-record answer for
+recordings that fail them.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Fraction of full scale at which a sample counts as clipped
+CLIP_LEVEL = 0.99
+
+# Frame energy (dB above the noise floor) at which a frame counts as speech
+SPEECH_MARGIN_DB = 6.0
+
+# Frames quieter than this are silence no matter how low the noise floor is
+SILENCE_DBFS = -55.0
+
+# Non-speech frames only count towards the noise floor inside pauses at least
+# this long; shorter dips are gaps within speech (e.g. stop closures)
+MIN_PAUSE_MS = 200
+
+MESSAGES = {
+    "too_quiet": "The recording is too quiet. Move closer to the microphone and speak up.",
+    "clipped": "The recording is distorted. Move a little further from the microphone or lower the input volume.",
+    "noisy": "There is too much background noise. Find a quieter place and try again.",
+    "no_speech": "We could not hear any speech. Check your microphone and try again.",
+}
+
+
+@dataclass
+class QualityThresholds:
+    min_speech_dbfs: float = -40.0
+    max_clipping_ratio: float = 0.01
+    min_snr_db: float = 10.0
+    min_speech_ratio: float = 0.1
+
+
+def _db(power: np.ndarray) -> np.ndarray:
+    return 10.0 * np.log10(np.maximum(power, 1e-10))
+
+
+def _pause_frames(non_speech: np.ndarray, min_frames: int) -> np.ndarray:
+    """Mask of non-speech frames that belong to runs of at least `min_frames`"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], non_speech.astype(np.int8), [0]))))
+    mask = np.zeros(len(non_speech), dtype=bool)
+    for start, end in zip(edges[0::2], edges[1::2]):
+        if end - start >= min_frames:
+            mask[start:end] = True
+    return mask
+
+
+def analyze_quality(audio: np.ndarray, sample_rate: int = 16000, frame_ms: int = 30) -> Dict[str, Optional[float]]:
+    """
+    Level, clipping, SNR and speech-ratio metrics for mono float audio in [-1, 1].
+
+    Frames more than SPEECH_MARGIN_DB above the quietest tenth are speech.
+    The noise floor is the median energy of the non-speech frames that form
+    pauses of at least MIN_PAUSE_MS, and the speech level is the 95th
+    percentile frame energy. A clip trimmed tightly around continuous speech
+    has no such pauses; its noise floor and SNR are then None and the SNR
+    check is skipped rather than guessed from the quietest speech.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return {
+            "duration": round(len(audio) / sample_rate, 3),
+            "rms_dbfs": -100.0,
+            "peak_dbfs": -100.0,
+            "clipping_ratio": 0.0,
+            "noise_floor_dbfs": None,
+            "speech_level_dbfs": -100.0,
+            "snr_db": None,
+            "speech_ratio": 0.0,
+        }
+
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    frame_db = _db(np.einsum("ij,ij->i", frames, frames) / frame)
+    quiet_level, speech_level = np.percentile(frame_db, [10, 95])
+    speech = (frame_db > quiet_level + SPEECH_MARGIN_DB) & (frame_db > SILENCE_DBFS)
+    pauses = _pause_frames(~speech, max(1, MIN_PAUSE_MS // frame_ms))
+    peak = float(np.max(np.abs(audio)))
+
+    noise_floor = float(np.median(frame_db[pauses])) if pauses.any() else None
+
+    return {
+        "duration": round(len(audio) / sample_rate, 3),
+        "rms_dbfs": round(float(_db(np.mean(np.square(audio, dtype=np.float64)))), 2),
+        "peak_dbfs": round(float(_db(peak * peak)), 2),
+        "clipping_ratio": round(float(np.count_nonzero(np.abs(audio) >= CLIP_LEVEL)) / len(audio), 5),
+        "noise_floor_dbfs": round(noise_floor, 2) if noise_floor is not None else None,
+        "speech_level_dbfs": round(float(speech_level), 2),
+        "snr_db": round(float(speech_level) - noise_floor, 2) if noise_floor is not None else None,
+        "speech_ratio": round(float(np.mean(speech)), 3),
+    }
+
+
+def quality_issues(metrics: Dict[str, Optional[float]], thresholds: Optional[QualityThresholds] = None) -> List[str]:
+    thresholds = thresholds or QualityThresholds()
+    issues = []
+    if metrics["speech_level_dbfs"] < thresholds.min_speech_dbfs:
+        issues.append("too_quiet")
+    if metrics["clipping_ratio"] > thresholds.max_clipping_ratio:
+        issues.append("clipped")
+    if metrics["speech_ratio"] < thresholds.min_speech_ratio:
+        issues.append("no_speech")
+    elif metrics["snr_db"] is not None and metrics["snr_db"] < thresholds.min_snr_db:
+        issues.append("noisy")
+    return issues
+
+
+def assess_quality(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    thresholds: Optional[QualityThresholds] = None,
+) -> Dict[str, Any]:
+    metrics = analyze_quality(audio, sample_rate)
+    issues = quality_issues(metrics, thresholds)
+    return {"ok": not issues, "issues": issues, "metrics": metrics}
+
+
+def rerecord_result(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured answer for a recording that should be made again"""
+    return {
+        "status": "rerecord",
+        "issues": report["issues"],
+        "messages": [MESSAGES[issue] for issue in report["issues"]],
+        "quality": report["metrics"],
+    }
+
+
+def load_audio_file(path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """(mono float32 audio, sample rate), or None when libsndfile can't read the file"""
+    try:
+        import soundfile
+    except ImportError:
+        return None
+    try:
+        audio, sample_rate = soundfile.read(path, dtype="float32", always_2d=True)
+    except Exception:
+        return None
+    return audio.mean(axis=1), sample_rate
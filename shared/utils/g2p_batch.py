@@ -0,0 +1,98 @@
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+# Words g2p_en tokenizes as a single token and looks up without POS context
+_PLAIN_WORD = re.compile(r"^[a-z]+$")
+
+_SOS, _EOS = 2, 3
+_MAX_STEPS = 20
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def _grucell(x, h, w_ih, w_hh, b_ih, b_hh):
+    # Same arithmetic (and float32 dtype) as G2p.grucell, over a batch of rows
+    rzn_ih = np.matmul(x, w_ih.T) + b_ih
+    rzn_hh = np.matmul(h, w_hh.T) + b_hh
+    split = rzn_ih.shape[-1] * 2 // 3
+    rz = _sigmoid(rzn_ih[:, :split] + rzn_hh[:, :split])
+    r, z = np.split(rz, 2, -1)
+    n = np.tanh(rzn_ih[:, split:] + r * rzn_hh[:, split:])
+    return (1 - z) * n + z * h
+
+
+def predict_batch(g2p, words: Sequence[str], batch_size: int = 256) -> List[List[str]]:
+    """
+    G2p.predict() for many words at once.
+
+    Words are sorted by length and run through g2p_en's GRU encoder/decoder
+    as padded (batch, hidden) matrices; padded steps leave a row's state
+    unchanged, so each row follows exactly the per-word computation.
+    """
+    results: List[List[str]] = [[] for _ in words]
+    order = sorted(range(len(words)), key=lambda i: len(words[i]))
+    unk = g2p.g2idx["<unk>"]
+    eos = g2p.g2idx["</s>"]
+    hidden = g2p.enc_w_hh.shape[-1]
+
+    for start in range(0, len(order), batch_size):
+        rows = order[start:start + batch_size]
+        lengths = np.array([len(words[i]) + 1 for i in rows])
+        ids = np.zeros((len(rows), lengths.max()), dtype=np.int64)
+        for row, i in enumerate(rows):
+            ids[row, :lengths[row]] = [g2p.g2idx.get(char, unk) for char in words[i]] + [eos]
+        x = np.take(g2p.enc_emb, ids, axis=0)
+
+        h = np.zeros((len(rows), hidden), np.float32)
+        for t in range(ids.shape[1]):
+            step = _grucell(x[:, t, :], h, g2p.enc_w_ih, g2p.enc_w_hh, g2p.enc_b_ih, g2p.enc_b_hh)
+            h = np.where((t < lengths)[:, None], step, h)
+
+        dec = np.take(g2p.dec_emb, np.full(len(rows), _SOS), axis=0)
+        preds = [[] for _ in rows]
+        active = np.ones(len(rows), dtype=bool)
+        for _ in range(_MAX_STEPS):
+            h = _grucell(dec, h, g2p.dec_w_ih, g2p.dec_w_hh, g2p.dec_b_ih, g2p.dec_b_hh)
+            pred = (np.matmul(h, g2p.fc_w.T) + g2p.fc_b).argmax(axis=1)
+            active &= pred != _EOS
+            if not active.any():
+                break
+            for row in np.nonzero(active)[0]:
+                preds[row].append(int(pred[row]))
+            dec = np.take(g2p.dec_emb, pred, axis=0)
+
+        for row, i in enumerate(rows):
+            results[i] = [g2p.idx2p.get(idx, "<unk>") for idx in preds[row]]
+    return results
+
+
+def g2p_batch(g2p, words: Sequence[str], batch_size: int = 256) -> List[List[str]]:
+    """
+    [g2p(word) for word in words] with the out-of-vocabulary predictions
+    batched.
+
+    Plain lowercase words skip g2p_en's normalisation, tokenizer and POS
+    tagger: dictionary words are read from g2p.cmu and the rest go through
+    predict_batch(). Homographs (whose reading depends on the POS tag) and
+    anything else are passed to g2p() itself.
+    """
+    results: List[List[str]] = [[] for _ in words]
+    oov: Dict[str, List[int]] = {}
+    for i, word in enumerate(words):
+        if not _PLAIN_WORD.match(word) or word in g2p.homograph2features:
+            results[i] = g2p(word)
+        elif word in g2p.cmu:
+            results[i] = list(g2p.cmu[word][0])
+        else:
+            oov.setdefault(word, []).append(i)
+
+    predicted = predict_batch(g2p, list(oov), batch_size)
+    for positions, phonemes in zip(oov.values(), predicted):
+        for i in positions:
+            results[i] = list(phonemes)
+    return results
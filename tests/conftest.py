@@ -0,0 +1,26 @@
+"""
+Shared setup for the unit tests.
+
+Each service ships its own top-level `app` package (in its container it sits
+next to `shared/`), so test modules call `use_service()` before importing
+from `app` to put the right service on the path.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def use_service(name: str):
+    """Make `app` resolve to the given service directory, e.g. "asr-service" """
+    service_dir = str(REPO_ROOT / name)
+    if service_dir in sys.path:
+        sys.path.remove(service_dir)
+    sys.path.insert(0, service_dir)
+
+    for module in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+        del sys.modules[module]
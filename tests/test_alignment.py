@@ -1,3 +1,261 @@
+"""
+Unit tests for the Alignment Service
+
+This test suite covers:
+- Banded CTC Viterbi path on hand-built emission matrices
+- Phoneme posterior frame timing across windows and short tails
+- Batched G2P matching g2p_en word by word
+- Phoneme track serialization (rows and columnar, orjson and json) round-trips
+- Shared decoded-audio cache budget without a directory scan per put
+"""
+
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+
+from conftest import use_service
+
+use_service("alignment-service")
+
+from app.schemas.request_response import AlignmentColumnarResponse, AlignmentResponse
+from app.services import serialize
+from app.core.config import settings
+from app.services import acoustic
+from app.services.acoustic import SAMPLE_RATE, frame_geometry, phoneme_posteriors, viterbi_ctc
+from app.services.serialize import PhonemeTrack, render
+from shared.utils.audio_cache import DecodedAudioCache
+from shared.utils.g2p_batch import g2p_batch
+
+LIKELY = 0.0
+UNLIKELY = -10.0
+
+
+def emissions_for(frames, n_labels=2):
+    """Emission matrix where each frame strongly prefers one column (0 = blank, k + 1 = label k)"""
+    n_columns = n_labels + 1
+    emissions = np.full((len(frames), n_columns), UNLIKELY, dtype=np.float32)
+    emissions[np.arange(len(frames)), frames] = LIKELY
+    return emissions
+
+
 def test_placeholder():
     assert True
 
+
+class TestViterbiCtc:
+    """Test cases for the banded CTC Viterbi pass."""
+
+    def test_follows_emissions(self):
+        """Each frame goes to the label (or blank) it scores best for."""
+        emissions = emissions_for([1, 1, 0, 2, 2, 2])
+        path = viterbi_ctc(emissions, [0, 1], np.array([0, 0]), np.array([5, 5]))
+        assert path.tolist() == [0, 0, -1, 1, 1, 1]
+
+    def test_band_confines_labels(self):
+        """A label may not leave its band, even when the emissions pull it out."""
+        emissions = emissions_for([1, 1, 0, 2, 2, 2])
+        path = viterbi_ctc(emissions, [0, 1], np.array([0, 4]), np.array([5, 5]))
+        assert all(position != 1 for position in path.tolist()[:4])
+        assert path.tolist()[4:] == [1, 1]
+
+    def test_repeated_label_needs_blank(self):
+        """Equal neighbouring labels must be separated by a blank frame."""
+        emissions = emissions_for([1, 1, 1])
+        emissions[:, 2] = emissions[:, 1]  # both positions carry the same phoneme
+        assert viterbi_ctc(emissions[:2], [0, 0], np.array([0, 0]), np.array([1, 1])) is None
+        path = viterbi_ctc(emissions, [0, 0], np.array([0, 0]), np.array([2, 2]))
+        assert path.tolist() == [0, -1, 1]
+
+    def test_distinct_labels_can_skip_blank(self):
+        """Different neighbouring labels may follow each other directly."""
+        emissions = emissions_for([1, 2])
+        path = viterbi_ctc(emissions, [0, 1], np.array([0, 0]), np.array([1, 1]))
+        assert path.tolist() == [0, 1]
+
+    def test_too_few_frames(self):
+        """No path exists when there are fewer frames than labels."""
+        emissions = emissions_for([1, 2], n_labels=3)
+        assert viterbi_ctc(emissions, [0, 1, 2], np.zeros(3, dtype=int), np.ones(3, dtype=int)) is None
+
+    def test_empty_band_has_no_path(self):
+        """A label whose band lies outside the utterance cannot be placed."""
+        emissions = emissions_for([1, 0, 2])
+        assert viterbi_ctc(emissions, [0, 1], np.array([0, 5]), np.array([2, 6])) is None
+
+
+@pytest.fixture
+def tiny_phoneme_model(monkeypatch):
+    """A randomly initialised wav2vec2 CTC model with the real feature encoder geometry"""
+    transformers = pytest.importorskip("transformers")
+    config = transformers.Wav2Vec2Config(
+        vocab_size=6, hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32,
+        conv_dim=(8,) * 7, num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2
+    )
+    model = transformers.Wav2Vec2ForCTC(config).eval()
+    monkeypatch.setattr(acoustic, "get_phoneme_model", lambda: (model, {"<pad>": 0}, 0))
+    monkeypatch.setattr(settings, "DEVICE", "cpu")
+    monkeypatch.setattr(settings, "ACOUSTIC_WINDOW_SECONDS", 1.0)
+    return model
+
+
+class TestPhonemePosteriors:
+    """Test cases for frame timing of the acoustic model output."""
+
+    def test_wav2vec2_frame_geometry(self, tiny_phoneme_model):
+        assert frame_geometry(tiny_phoneme_model) == (320, 400)
+
+    @pytest.mark.parametrize("n_samples", [
+        2 * SAMPLE_RATE + 160,  # tail shorter than the receptive field
+        3 * SAMPLE_RATE,        # whole windows only
+        SAMPLE_RATE + 1,        # one sample into the next window
+        100,                    # whole clip shorter than the receptive field
+    ])
+    def test_one_frame_per_stride_on_original_timeline(self, tiny_phoneme_model, n_samples):
+        """Every window and the short tail are encoded; frame k starts at k * 20ms."""
+        audio = np.random.default_rng(0).standard_normal(n_samples).astype(np.float32)
+        log_probs, frame_seconds = phoneme_posteriors(audio)
+        assert frame_seconds == pytest.approx(0.02)
+        assert len(log_probs) == -(-n_samples // 320)
+        assert log_probs.shape[1] == 6
+        np.testing.assert_allclose(np.exp(log_probs).sum(axis=1), 1.0, rtol=1e-5)
+
+    def test_empty_audio(self, tiny_phoneme_model):
+        log_probs, frame_seconds = phoneme_posteriors(np.zeros(0, dtype=np.float32))
+        assert len(log_probs) == 0 and frame_seconds == pytest.approx(0.02)
+
+
+@pytest.fixture(scope="module")
+def g2p():
+    """g2p_en's G2p; needs the NLTK cmudict and tagger data"""
+    g2p_en = pytest.importorskip("g2p_en")
+    try:
+        return g2p_en.G2p()
+    except LookupError as e:
+        pytest.skip(f"NLTK data for g2p_en not available: {e}")
+
+
+class TestG2pBatch:
+    """Test cases for batched grapheme-to-phoneme conversion."""
+
+    words = ["hello", "zorblax", "quixotry", "a", "pronunciation", "zorblax", "strengths", "xylophonist"]
+
+    def test_matches_per_word_predict(self, g2p):
+        """Every word gets what g2p_en gives it alone: the dictionary entry, or G2p.predict()."""
+        # A small batch size so words are split across batches of different lengths
+        batched = g2p_batch(g2p, self.words, batch_size=3)
+        expected = [list(g2p.cmu[word][0]) if word in g2p.cmu else g2p.predict(word) for word in self.words]
+        assert batched == expected
+
+    def test_out_of_vocabulary_predictions(self, g2p):
+        oov = [word for word in self.words if word not in g2p.cmu]
+        assert oov
+        assert g2p_batch(g2p, oov) == [g2p.predict(word) for word in oov]
+
+    def test_other_words_use_g2p(self, g2p):
+        """Homographs and non-plain tokens keep g2p_en's own handling."""
+        words = ["read", "Hello!", "don't"]
+        assert g2p_batch(g2p, words) == [g2p(word) for word in words]
+
+
+def sample_track():
+    track = PhonemeTrack(duration=1.234567)
+    for word, phonemes in (("hi", ["HH", "AY"]), ("hi", ["HH", "AY"]), ("ok", ["OW"])):
+        index = track.add_word(word)
+        for symbol in phonemes:
+            start = 0.1 * len(track)
+            track.add(symbol, index, start, start + 0.0512345, 0.987654)
+    return track
+
+
+class TestSerialize:
+    """Test cases for phoneme track encoding."""
+
+    def test_rows_round_trip(self):
+        track = sample_track()
+        payload = AlignmentResponse.model_validate_json(render(track).body)
+
+        assert [(p.symbol, p.word) for p in payload.phonemes] == [
+            ("HH", "hi"), ("AY", "hi"), ("HH", "hi"), ("AY", "hi"), ("OW", "ok")
+        ]
+        assert [p.start for p in payload.phonemes] == [round(start, 4) for start in track.starts]
+        assert [p.end for p in payload.phonemes] == [round(end, 4) for end in track.ends]
+        assert {p.confidence for p in payload.phonemes} == {0.9877}
+        assert payload.duration == 1.2346
+
+    def test_columnar_round_trip(self):
+        """Columns rebuild the same rows, and repeated words stay distinct occurrences."""
+        track = sample_track()
+        columns = AlignmentColumnarResponse.model_validate_json(render(track, "columnar").body)
+        rows = AlignmentResponse.model_validate_json(render(track).body)
+
+        assert columns.words == ["hi", "hi", "ok"]
+        assert columns.word_index == [0, 0, 1, 1, 2]
+        rebuilt = [
+            {"symbol": symbol, "word": columns.words[index], "start": start, "end": end, "confidence": confidence}
+            for symbol, index, start, end, confidence in zip(
+                columns.symbols, columns.word_index, columns.starts, columns.ends, columns.confidences
+            )
+        ]
+        assert rebuilt == [phoneme.model_dump() for phoneme in rows.phonemes]
+        assert columns.duration == rows.duration
+
+    def test_json_fallback_matches_orjson(self, monkeypatch):
+        """Without orjson the json module produces the same document."""
+        pytest.importorskip("orjson")
+        track = sample_track()
+        fast = render(track).body
+        monkeypatch.setattr(serialize, "orjson", None)
+        assert json.loads(render(track).body) == json.loads(fast)
+
+    def test_empty_track(self):
+        payload = json.loads(render(PhonemeTrack()).body)
+        assert payload == {"phonemes": [], "duration": 0.0}
+
+
+def cache_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".npy"))
+
+
+class TestDecodedAudioCache:
+    """Test cases for the decoded-audio cache shared with asr-service."""
+
+    clip = np.zeros(1000, dtype=np.float32)  # 4128 bytes as .npy
+
+    def key(self, i):
+        return f"{i:032x}"
+
+    def test_round_trip(self, tmp_path):
+        cache = DecodedAudioCache(str(tmp_path))
+        audio = np.linspace(-1, 1, 160, dtype=np.float32)
+        cache.put(self.key(1), audio)
+        np.testing.assert_array_equal(cache.get(self.key(1)), audio)
+        assert cache.get(self.key(2)) is None
+
+    def test_scans_only_when_budget_is_crossed(self, tmp_path):
+        """Puts are tracked in memory; the directory is scanned on the first put and when over budget."""
+        cache = DecodedAudioCache(str(tmp_path), max_bytes=10 * 4128)
+        for i in range(40):
+            cache.put(self.key(i), self.clip)
+            assert cache_size(tmp_path) <= cache.max_bytes
+
+        # The first scan, then one per ~2 puts past the low-water mark, not one per put
+        assert cache.scans <= 1 + 40 // 2
+        assert cache.get(self.key(39)) is not None
+        assert cache.get(self.key(0)) is None
+
+    def test_rescan_picks_up_other_writers(self, tmp_path):
+        """Files written by another process are counted at the next periodic rescan."""
+        mine = DecodedAudioCache(str(tmp_path), max_bytes=10 * 4128, rescan_every=5)
+        other = DecodedAudioCache(str(tmp_path), max_bytes=10 ** 9)
+        mine.put(self.key(0), self.clip)
+        for i in range(1, 20):
+            other.put(self.key(i), self.clip)
+        assert cache_size(tmp_path) > mine.max_bytes
+
+        for i in range(20, 25):
+            mine.put(self.key(i), self.clip)
+        assert cache_size(tmp_path) <= mine.max_bytes
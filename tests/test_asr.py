@@ -1,3 +1,787 @@
+"""
+Unit tests for the ASR Service
+
+This test suite covers:
+- Micro-batch grouping, size and time flushes, and shutdown
+- Executor admission, queueing and 429 responses when saturated
+- Alignment model registry loading, LRU order and budget eviction
+- Whisper model routing by duration, accuracy tier and load
+- Download size guard and head check on pooled fetches
+- VAD silence trimming and timestamp remapping
+- Header probes (WAV, FLAC, MP3, OGG) and reuse of the streamed head's probe
+- Stitching overlapping long-form chunks back onto one timeline
+- Transcription cache keys and lookups
+- Columnar response round-trip
+"""
+
+import asyncio
+import io
+import struct
+import time
+import wave
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+from conftest import use_service
+
+use_service("asr-service")
+
+from app.api import endpoints
+from app.core.config import settings
+from app.schemas.request_response import ASRColumnarResponse
+from app.services.batching import MicroBatcher
+from app.services.cache import TranscriptionCache
+from app.services.executor import ExecutorSaturatedError, InferenceExecutor
+from app.services.fetch import AudioFetcher, AudioTooLargeError
+from app.services.logic import to_columnar, transcription_cache_keys
+from app.services.longform import Chunk, stitch_chunks
+from app.services.model_registry import AlignModelRegistry
+from app.services.probe import AudioProbeError, PROBE_BYTES, check_audio_info, finish_probe, probe_audio
+from app.services.router import route_model, routable_models, validate_accuracy
+from app.services.vad import frame_length, remap_transcription, speech_regions, trim_silence
+
+SR = 16000
+
+
 def test_placeholder():
     assert True
 
+
+class TestMicroBatcher:
+    """Test cases for request-level micro-batching."""
+
+    @staticmethod
+    def recording_fn(calls, delay=0.0):
+        """transcribe_fn that records (clips, language, model) per call and echoes each clip back"""
+        def transcribe(audios, language, model_name):
+            calls.append((list(audios), language, model_name))
+            time.sleep(delay)
+            return [{"clip": audio, "language": language, "model": model_name} for audio in audios]
+        return transcribe
+
+    def test_groups_by_model_and_language(self):
+        """One window is split into one model call per (model, language)."""
+        calls = []
+        batcher = MicroBatcher(self.recording_fn(calls), max_batch_size=8, max_wait_ms=50)
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    batcher.submit(1, "en", "small"),
+                    batcher.submit(2, "es", "small"),
+                    batcher.submit(3, "en", "small"),
+                    batcher.submit(4, "en", "large-v3"),
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(run())
+
+        assert [result["clip"] for result in results] == [1, 2, 3, 4]
+        assert [(result["language"], result["model"]) for result in results] == [
+            ("en", "small"), ("es", "small"), ("en", "small"), ("en", "large-v3")
+        ]
+        assert sorted((model, language, clips) for clips, language, model in calls) == [
+            ("large-v3", "en", [4]), ("small", "en", [1, 3]), ("small", "es", [2])
+        ]
+        assert batcher.stats()["batches"] == 3 and batcher.stats()["clips"] == 4
+
+    def test_flushes_when_batch_is_full(self):
+        """A window closes as soon as max_batch_size clips are queued, without waiting out max_wait."""
+        calls = []
+        batcher = MicroBatcher(self.recording_fn(calls), max_batch_size=2, max_wait_ms=10_000)
+
+        async def run():
+            try:
+                return await asyncio.wait_for(
+                    asyncio.gather(*(batcher.submit(i, "en", "small") for i in range(4))), timeout=5
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(run())
+
+        assert [result["clip"] for result in results] == list(range(4))
+        assert sorted(clips for clips, _, _ in calls) == [[0, 1], [2, 3]]
+        assert batcher.stats()["largest_batch"] == 2
+
+    def test_flushes_lone_clip_after_max_wait(self):
+        """A clip without company is dispatched once its window times out."""
+        calls = []
+        batcher = MicroBatcher(self.recording_fn(calls), max_batch_size=8, max_wait_ms=20)
+
+        async def run():
+            started = time.monotonic()
+            try:
+                result = await batcher.submit("only", "en", None)
+            finally:
+                await batcher.stop()
+            return result, time.monotonic() - started
+
+        result, elapsed = asyncio.run(run())
+
+        assert result["clip"] == "only"
+        assert [clips for clips, _, _ in calls] == [["only"]]
+        assert 0.02 <= elapsed < 1.0
+
+    def test_failure_reaches_every_clip_in_batch(self):
+        def failing(audios, language, model_name):
+            raise RuntimeError("model crashed")
+
+        batcher = MicroBatcher(failing, max_batch_size=4, max_wait_ms=20)
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    batcher.submit(1, "en"), batcher.submit(2, "en"), return_exceptions=True
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_stop_drains_running_batches(self):
+        """Batches already dispatched finish during shutdown."""
+        calls = []
+        batcher = MicroBatcher(self.recording_fn(calls, delay=0.2), max_batch_size=1, max_wait_ms=0)
+
+        async def run():
+            pending = asyncio.ensure_future(batcher.submit("running", "en"))
+            while not calls:
+                await asyncio.sleep(0.01)
+            await batcher.stop()
+            assert pending.done()
+            return pending.result()
+
+        assert asyncio.run(run())["clip"] == "running"
+
+
+class TestInferenceExecutor:
+    """Test cases for admission control on the inference executor."""
+
+    def test_rejects_past_max_pending(self):
+        """Requests beyond max_pending are rejected with a retry estimate instead of queueing."""
+        executor = InferenceExecutor(max_workers=1, max_pending=2)
+
+        async def run():
+            async with executor.admission(), executor.admission():
+                with pytest.raises(ExecutorSaturatedError) as error:
+                    async with executor.admission():
+                        pass
+                return error.value
+
+        error = asyncio.run(run())
+        assert error.retry_after >= 1
+        assert executor.stats()["rejected"] == 1 and executor.stats()["admitted"] == 2
+        assert executor.in_flight == 0
+        executor.shutdown()
+
+    def test_wait_queues_for_a_free_slot(self):
+        executor = InferenceExecutor(max_workers=1, max_pending=1)
+        order = []
+
+        async def holder():
+            async with executor.admission():
+                order.append("holding")
+                await asyncio.sleep(0.05)
+                order.append("released")
+
+        async def waiter():
+            await asyncio.sleep(0.01)
+            async with executor.admission(wait=True):
+                order.append("admitted")
+
+        async def run():
+            await asyncio.gather(holder(), waiter())
+
+        asyncio.run(run())
+        assert order == ["holding", "released", "admitted"]
+        assert executor.stats()["rejected"] == 0
+        executor.shutdown()
+
+    def test_run_keeps_event_loop_free(self):
+        """Blocking work runs on the pool while the loop keeps serving other tasks."""
+        executor = InferenceExecutor(max_workers=1, max_pending=4)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            result, _ = await asyncio.gather(executor.run(lambda: time.sleep(0.2) or "done"), ticker())
+            return result
+
+        assert asyncio.run(run()) == "done"
+        assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.2
+        assert executor.stats()["jobs_completed"] == 1
+        executor.shutdown()
+
+    def test_saturated_request_gets_429(self, monkeypatch):
+        async def saturated(**kwargs):
+            raise ExecutorSaturatedError(retry_after=7)
+
+        monkeypatch.setattr(endpoints, "run_service_logic", saturated)
+        app = FastAPI()
+        app.include_router(endpoints.router)
+
+        response = TestClient(app).post("/process", files={"file": ("clip.wav", b"RIFF", "audio/wav")})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "7"
+
+
+MB = 1024 * 1024
+
+
+class FakeAlignModel(torch.nn.Module):
+    """Stands in for a wav2vec2 model; its size is one float32 buffer"""
+
+    def __init__(self, size_mb):
+        super().__init__()
+        self.register_buffer("weights", torch.zeros(size_mb * MB // 4))
+
+
+def sized_loader(sizes_mb, loads):
+    """Loader giving each language a model of sizes_mb[language]; unknown languages have none"""
+    def load(language_code):
+        loads.append(language_code)
+        if language_code not in sizes_mb:
+            raise ValueError(f"No alignment model for '{language_code}'")
+        return FakeAlignModel(sizes_mb[language_code]), {"language": language_code}
+    return load
+
+
+class TestAlignModelRegistry:
+    """Test cases for the memory-budgeted alignment model cache."""
+
+    def test_loads_once_and_counts_hits(self):
+        loads = []
+        registry = AlignModelRegistry(sized_loader({"en": 1}, loads), budget_bytes=4 * MB)
+        model, metadata = registry.get("en")
+        assert registry.get("en")[0] is model and metadata == {"language": "en"}
+        assert loads == ["en"]
+        assert (registry.hits, registry.misses) == (1, 1)
+
+    def test_evicts_least_recently_used_over_budget(self):
+        evicted = []
+        loads = []
+        registry = AlignModelRegistry(
+            sized_loader({"en": 2, "fr": 2, "de": 2}, loads), budget_bytes=5 * MB, on_evict=lambda: evicted.append(1)
+        )
+        registry.get("en")
+        registry.get("fr")
+        registry.get("en")  # fr is now the least recently used
+        registry.get("de")
+
+        assert registry.loaded_languages() == ["en", "de"]
+        assert registry.resident_bytes() <= registry.budget_bytes
+        assert registry.evictions == 1 and evicted == [1]
+
+        registry.get("fr")  # reloaded after eviction, pushing out en
+        assert loads == ["en", "fr", "de", "fr"]
+        assert registry.loaded_languages() == ["de", "fr"]
+
+    def test_oversized_model_is_kept_alone(self):
+        """A model larger than the whole budget still loads, at the cost of everything else."""
+        registry = AlignModelRegistry(sized_loader({"en": 1, "ja": 8}, []), budget_bytes=4 * MB)
+        registry.get("en")
+        registry.get("ja")
+        assert registry.loaded_languages() == ["ja"]
+        assert registry.stats()["resident_mb"] == 8.0
+
+    def test_unsupported_language_is_not_retried(self):
+        loads = []
+        registry = AlignModelRegistry(sized_loader({}, loads), budget_bytes=4 * MB)
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                registry.get("xx")
+        assert loads == ["xx"]
+        assert registry.stats()["unsupported"] == ["xx"]
+
+
+@pytest.fixture
+def three_models(monkeypatch):
+    """tiny < small (default) < large-v3, with the default routing thresholds"""
+    monkeypatch.setattr(settings, "WHISPER_MODEL", "small")
+    monkeypatch.setattr(settings, "WHISPER_MODELS", ["large-v3", "tiny"])
+    monkeypatch.setattr(settings, "ROUTER_SHORT_CLIP_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "ROUTER_LONG_CLIP_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "ROUTER_LOAD_SHED_THRESHOLD", 16)
+
+
+class TestRouter:
+    """Test cases for per-request Whisper model selection."""
+
+    def test_models_ordered_by_size(self, three_models):
+        assert routable_models() == ["tiny", "small", "large-v3"]
+
+    def test_routes_by_duration(self, three_models):
+        assert route_model(2.0) == "tiny"
+        assert route_model(10.0) == "small"
+        assert route_model(30.0) == "large-v3"
+
+    def test_accuracy_tier_overrides_duration(self, three_models):
+        assert route_model(60.0, "fast") == "tiny"
+        assert route_model(2.0, "accurate") == "large-v3"
+        assert route_model(10.0, "balanced") == "small"
+
+    def test_load_steps_down_except_accurate(self, three_models):
+        assert route_model(10.0, load=16) == "tiny"
+        assert route_model(30.0, load=16) == "small"
+        assert route_model(10.0, "accurate", load=100) == "large-v3"
+        assert route_model(2.0, load=100) == "tiny"
+
+    def test_single_model_always_wins(self, monkeypatch):
+        monkeypatch.setattr(settings, "WHISPER_MODEL", "base")
+        monkeypatch.setattr(settings, "WHISPER_MODELS", [])
+        assert route_model(120.0, "accurate", load=100) == "base"
+
+    def test_validate_accuracy(self):
+        assert validate_accuracy("Fast") == "fast"
+        assert validate_accuracy("") is None
+        with pytest.raises(ValueError, match="Unsupported accuracy tier"):
+            validate_accuracy("perfect")
+
+
+def mock_fetcher(body, max_bytes, declare_length=True):
+    """AudioFetcher whose pooled client answers every request with `body`"""
+    async def chunked():
+        yield body
+
+    def handler(request):
+        if declare_length:
+            return httpx.Response(200, content=body)
+        return httpx.Response(200, content=chunked())
+
+    fetcher = AudioFetcher(max_bytes=max_bytes)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+class TestAudioFetcher:
+    """Test cases for the download size guard."""
+
+    def test_downloads_within_limit(self):
+        fetcher = mock_fetcher(b"x" * 5000, max_bytes=10_000)
+        data = asyncio.run(fetcher.fetch_url("http://audio.test/clip.wav"))
+        assert bytes(data) == b"x" * 5000
+        assert fetcher.stats()["downloads"] == 1 and fetcher.stats()["bytes_downloaded"] == 5000
+
+    def test_declared_length_rejected_before_reading(self):
+        fetcher = mock_fetcher(b"x" * 20_000, max_bytes=10_000)
+        with pytest.raises(AudioTooLargeError) as error:
+            asyncio.run(fetcher.fetch_url("http://audio.test/clip.wav"))
+        assert error.value.size == 20_000
+        assert fetcher.stats()["rejected_too_large"] == 1
+
+    def test_undeclared_body_aborted_mid_stream(self):
+        """Without Content-Length the download stops once the body passes the limit."""
+        fetcher = mock_fetcher(b"x" * 20_000, max_bytes=10_000, declare_length=False)
+        with pytest.raises(AudioTooLargeError) as error:
+            asyncio.run(fetcher.fetch_url("http://audio.test/clip.wav"))
+        assert error.value.size is None
+        assert fetcher.stats()["downloads"] == 0 and fetcher.stats()["rejected_too_large"] == 1
+
+    def test_head_check_sees_head_and_total_and_can_abort(self):
+        fetcher = mock_fetcher(b"x" * (4 * AudioFetcher.HEAD_BYTES), max_bytes=10 * MB)
+        seen = []
+
+        def check_head(head, total):
+            seen.append((len(head), total))
+            raise ValueError("Audio duration exceeds maximum allowed")
+
+        with pytest.raises(ValueError, match="exceeds maximum"):
+            asyncio.run(fetcher.fetch_url("http://audio.test/clip.wav", check_head))
+        assert seen == [(AudioFetcher.HEAD_BYTES, 4 * AudioFetcher.HEAD_BYTES)]
+        assert fetcher.stats()["downloads"] == 0
+
+
+def vad_clip(*frames):
+    """Alternating silence/tone runs, lengths in VAD frames, starting with silence"""
+    size = frame_length()
+    parts = []
+    for index, count in enumerate(frames):
+        t = np.arange(count * size) / SR
+        loud = index % 2 == 1
+        parts.append((0.3 * np.sin(2 * np.pi * 220 * t) if loud else np.zeros_like(t)).astype(np.float32))
+    return np.concatenate(parts)
+
+
+@pytest.fixture
+def vad_settings(monkeypatch):
+    """Pin the VAD settings the expected sample positions are computed from"""
+    for name, value in {
+        "VAD_FRAME_MS": 30,
+        "VAD_ENERGY_THRESHOLD_DB": -45.0,
+        "VAD_NOISE_MARGIN_DB": 10.0,
+        "VAD_SPEECH_RANGE_DB": 25.0,
+        "VAD_PADDING_MS": 200,
+        "VAD_MIN_SILENCE_MS": 300,
+        "VAD_MIN_SPEECH_MS": 100,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return int(SR * 0.2)
+
+
+class TestVad:
+    """Test cases for silence trimming and timestamp remapping."""
+
+    def test_speech_regions_are_padded(self, vad_settings):
+        size, padding = frame_length(), vad_settings
+        audio = vad_clip(32, 32, 64, 32, 32)
+        assert speech_regions(audio) == [
+            (32 * size - padding, 64 * size + padding),
+            (128 * size - padding, 160 * size + padding),
+        ]
+
+    def test_short_pause_is_bridged(self, vad_settings):
+        """A pause that padding leaves shorter than VAD_MIN_SILENCE_MS stays inside the region."""
+        size, padding = frame_length(), vad_settings
+        audio = vad_clip(32, 32, 16, 32, 32)  # 480ms pause, 80ms after padding
+        assert speech_regions(audio) == [(32 * size - padding, 112 * size + padding)]
+
+    def test_quieter_stretch_of_continuous_speech_is_kept(self, vad_settings):
+        """A softer passage in speech that never pauses is not mistaken for the noise floor."""
+        t = np.arange(SR) / SR
+        loud = (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)  # about -9 dBFS
+        soft = (0.08 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)  # about -25 dBFS
+        audio = np.concatenate([loud, loud, loud, soft, loud, loud, loud])
+        assert speech_regions(audio) == [(0, len(audio))]
+        assert trim_silence(audio)[1] is None
+
+    def test_noise_between_speech_is_still_trimmed(self, vad_settings):
+        """Background noise well below the speech keeps raising the threshold above it."""
+        rng = np.random.default_rng(0)
+        noise = (0.01 * rng.standard_normal(7 * SR)).astype(np.float32)  # about -40 dBFS
+        t = np.arange(2 * SR) / SR
+        audio = noise.copy()
+        audio[2 * SR:4 * SR] += 0.4 * np.sin(2 * np.pi * 220 * t)
+        (start, end), = speech_regions(audio)
+        assert abs(start - (2 * SR - vad_settings)) <= frame_length()
+        assert abs(end - (4 * SR + vad_settings)) <= frame_length()
+
+    def test_no_trim_without_silence_or_speech(self, vad_settings):
+        """Silent and all-speech clips are passed through untrimmed."""
+        silent = np.zeros(SR, dtype=np.float32)
+        assert trim_silence(silent)[1] is None
+        speech = vad_clip(0, 64)
+        trimmed, layout = trim_silence(speech)
+        assert layout is None and trimmed is speech
+
+    def test_trim_keeps_only_regions(self, vad_settings):
+        audio = vad_clip(32, 32, 64, 32, 32)
+        trimmed, layout = trim_silence(audio)
+        regions = speech_regions(audio)
+        assert len(trimmed) == sum(end - start for start, end in regions)
+        np.testing.assert_array_equal(trimmed[:regions[0][1] - regions[0][0]], audio[regions[0][0]:regions[0][1]])
+        assert layout.summary()["regions"] == 2
+        assert layout.speech_duration + layout.skipped_duration == pytest.approx(len(audio) / SR)
+
+    def test_remap_to_original_time(self, vad_settings):
+        """Trimmed-audio times map back into the region they were decoded from."""
+        audio = vad_clip(32, 32, 64, 32, 32)
+        _, layout = trim_silence(audio)
+        (first_start, first_end), (second_start, _) = speech_regions(audio)
+        join = (first_end - first_start) / SR  # trimmed time where region two begins
+
+        result = {"segments": [
+            {"start": 0.1, "end": join, "words": [{"word": "one", "start": 0.1, "end": join}]},
+            {"start": join, "end": join + 0.5, "words": [
+                {"word": "two", "start": join + 0.1, "end": join + 0.5},
+                {"word": "3"}
+            ]}
+        ]}
+        remap_transcription(result, layout)
+
+        first, second = result["segments"]
+        assert first["start"] == pytest.approx(first_start / SR + 0.1)
+        # A join is the end of the earlier region and the start of the later one
+        assert first["end"] == pytest.approx(first_end / SR)
+        assert second["start"] == pytest.approx(second_start / SR)
+        assert second["words"][0]["start"] == pytest.approx(second_start / SR + 0.1)
+        assert second["words"][1] == {"word": "3"}
+
+    def test_remap_without_layout_is_identity(self):
+        result = {"segments": [{"start": 1.0, "end": 2.0, "words": []}]}
+        assert remap_transcription(result, None) == {"segments": [{"start": 1.0, "end": 2.0, "words": []}]}
+
+
+def wav_bytes(seconds=1.0, sample_rate=SR, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(b"\0\0" * channels * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def flac_bytes(sample_rate=44100, channels=2, total_samples=88200):
+    """fLaC marker and a STREAMINFO block (frames are not needed to probe)"""
+    packed = sample_rate << 44 | (channels - 1) << 41 | 15 << 36 | total_samples
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\0" * 6 + packed.to_bytes(8, "big") + b"\0" * 16
+    return b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo
+
+
+def ogg_page(packet, granule=0):
+    """A single-segment OGG page (checksum not filled in; the probe doesn't read it)"""
+    header = b"OggS" + bytes([0, 0]) + struct.pack("<qIII", granule, 1, 0, 0) + bytes([1, len(packet)])
+    return header + packet
+
+
+def opus_bytes(seconds=2.0, pre_skip=312, gap=0):
+    """Opus identification page and a last page, `gap` bytes apart"""
+    head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIhB", pre_skip, 16000, 0, 0)
+    return ogg_page(head) + b"\0" * gap + ogg_page(b"\0" * 100, granule=int(seconds * 48000) + pre_skip)
+
+
+MP3_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])  # MPEG-1 Layer III, 128 kbps, 44.1kHz, joint stereo
+
+
+class TestProbe:
+    """Test cases for header probing without decoding."""
+
+    def test_wav(self):
+        info = probe_audio(wav_bytes(1.5, sample_rate=22050, channels=2))
+        assert (info.format, info.sample_rate, info.channels, info.source) == ("wav", 22050, 2, "header")
+        assert info.duration == pytest.approx(1.5)
+
+    def test_wav_streaming_size_counts_present_bytes(self):
+        """Writers that leave the data size at 0xFFFFFFFF get the bytes actually present."""
+        data = bytearray(wav_bytes(1.0))
+        struct.pack_into("<I", data, 40, 0xFFFFFFFF)
+        assert probe_audio(bytes(data)).duration == pytest.approx(1.0)
+
+    def test_wav_without_fmt_is_corrupt(self):
+        data = b"RIFF" + struct.pack("<I", 12) + b"WAVE" + b"data" + struct.pack("<I", 4) + b"\0" * 4
+        with pytest.raises(AudioProbeError) as error:
+            probe_audio(data)
+        assert error.value.reason == "corrupt"
+
+    def test_flac(self):
+        info = probe_audio(flac_bytes(sample_rate=44100, channels=2, total_samples=88200))
+        assert (info.format, info.sample_rate, info.channels, info.source) == ("flac", 44100, 2, "header")
+        assert info.duration == pytest.approx(2.0)
+
+    def test_mp3_cbr_estimate(self):
+        """Without a Xing/VBRI frame the duration is estimated from bitrate and size."""
+        data = b"ID3" + bytes([4, 0, 0, 0, 0, 0, 10]) + b"\0" * 10 + MP3_HEADER + b"\0" * 15996
+        info = probe_audio(data)
+        assert (info.format, info.sample_rate, info.channels, info.source) == ("mp3", 44100, 2, "estimate")
+        assert info.duration == pytest.approx(16000 * 8 / 128000)
+
+    def test_mp3_xing_frame_count(self):
+        xing = b"Xing" + struct.pack(">II", 1, 100)
+        data = MP3_HEADER + b"\0" * 32 + xing + b"\0" * 400
+        info = probe_audio(data)
+        assert info.source == "header"
+        assert info.duration == pytest.approx(100 * 1152 / 44100)
+
+    def test_ogg_opus_duration_from_last_page(self):
+        info = probe_audio(opus_bytes(seconds=2.0, pre_skip=312))
+        assert (info.format, info.sample_rate, info.channels, info.source) == ("ogg", 16000, 1, "header")
+        assert info.duration == pytest.approx(2.0)
+
+    def test_empty_file(self):
+        with pytest.raises(AudioProbeError) as error:
+            probe_audio(b"")
+        assert error.value.reason == "empty"
+
+    def test_too_long_rejected(self, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_AUDIO_DURATION_SECONDS", 1)
+        with pytest.raises(ValueError, match="exceeds maximum"):
+            check_audio_info(probe_audio(wav_bytes(2.0)))
+
+    def test_finish_probe_reuses_final_head(self):
+        """The streamed head's probe is kept when it already saw the whole answer."""
+        data = wav_bytes(1.0)
+        head = probe_audio(data[:PROBE_BYTES], size_bytes=len(data))
+        assert finish_probe(data, head) is head
+
+    def test_finish_probe_reprobes_open_head(self):
+        """An OGG head can't see the last page, so the full file is probed again."""
+        data = opus_bytes(seconds=2.0, gap=PROBE_BYTES)
+        head = probe_audio(data[:PROBE_BYTES], size_bytes=len(data))
+        assert head.duration is None
+        info = finish_probe(data, head)
+        assert info is not head and info.duration == pytest.approx(2.0)
+
+
+def two_chunks():
+    """Cores [0, 10s) and [10s, 20s), each decoded with 1s of overlap"""
+    return [
+        Chunk(start=0, end=11 * SR, core_start=0, core_end=10 * SR),
+        Chunk(start=9 * SR, end=20 * SR, core_start=10 * SR, core_end=20 * SR),
+    ]
+
+
+def words_text(result):
+    return [word["word"] for segment in result["segments"] for word in segment["words"]]
+
+
+class TestStitchChunks:
+    """Test cases for merging per-chunk results."""
+
+    def test_overlap_words_kept_once(self):
+        """Words heard by both chunks are kept by the chunk whose core holds their midpoint."""
+        first = {"language": "en", "segments": [{
+            "text": "one hello 42 there", "start": 8.0, "end": 10.5,
+            "words": [
+                {"word": "one", "start": 8.0, "end": 8.5},
+                {"word": "hello", "start": 9.0, "end": 9.4},
+                {"word": "42"},
+                {"word": "there", "start": 10.2, "end": 10.5},
+            ]
+        }]}
+        second = {"language": "en", "segments": [{
+            "text": "hello 42 there friend", "start": 0.0, "end": 2.5,
+            "words": [
+                {"word": "hello", "start": 0.0, "end": 0.4},
+                {"word": "42"},
+                {"word": "there", "start": 1.2, "end": 1.5},
+                {"word": "friend", "start": 2.0, "end": 2.5},
+            ]
+        }]}
+
+        result = stitch_chunks(two_chunks(), [first, second])
+
+        assert words_text(result) == ["one", "hello", "42", "there", "friend"]
+        assert result["language"] == "en"
+        there = result["segments"][1]["words"][0]
+        assert there["word"] == "there"
+        assert there["start"] == pytest.approx(10.2)
+
+    def test_untimed_word_follows_next_word_at_segment_start(self):
+        """An untimed word opening a segment goes with the first timed word after it."""
+        first = {"segments": [{
+            "text": "7 apples", "start": 9.6, "end": 10.6,
+            "words": [{"word": "7"}, {"word": "apples", "start": 10.1, "end": 10.6}]
+        }]}
+        second = {"segments": [{
+            "text": "7 apples", "start": 0.6, "end": 1.6,
+            "words": [{"word": "7"}, {"word": "apples", "start": 1.1, "end": 1.6}]
+        }]}
+
+        result = stitch_chunks(two_chunks(), [first, second])
+
+        assert words_text(result) == ["7", "apples"]
+        assert len(result["segments"]) == 1
+
+    def test_segments_without_word_timings(self):
+        """Without any word timings a segment is kept whole by the chunk owning its midpoint."""
+        first = {"segments": [{"text": "seam", "start": 9.5, "end": 10.1, "words": []}]}
+        second = {"segments": [{"text": "seam", "start": 0.5, "end": 1.1, "words": []}]}
+
+        result = stitch_chunks(two_chunks(), [first, second])
+
+        assert [segment["text"] for segment in result["segments"]] == ["seam"]
+        assert result["segments"][0]["start"] == pytest.approx(9.5)
+
+
+class TestTranscriptionCacheKeys:
+    """Test cases for what the result cache is keyed on."""
+
+    audio = np.linspace(-0.5, 0.5, 1600, dtype=np.float32)
+
+    def test_key_inputs(self, monkeypatch):
+        """The key covers exactly the audio, model, compute type, language and output-changing settings."""
+        monkeypatch.setattr(settings, "VAD_TRIM_ENABLED", True)
+        [key] = transcription_cache_keys(self.audio, "en", ["small"])
+        assert key == TranscriptionCache.make_key(self.audio, "small", settings.compute_type, "en", "vad=True")
+
+        monkeypatch.setattr(settings, "SCRIPTED_MIN_SCORE", 0.4)
+        [scripted] = transcription_cache_keys(self.audio, "en", ["small"], target_text="hello")
+        assert scripted == TranscriptionCache.make_key(
+            self.audio, "small", settings.compute_type, "en", "vad=True|script=hello|min_score=0.4"
+        )
+
+    def test_keys_per_model(self):
+        """One key per distinct model, in order; the same model always gives the same key."""
+        keys = transcription_cache_keys(self.audio, "en", ["large-v3", "small"])
+        assert len(keys) == 2 and keys[0] != keys[1]
+        assert transcription_cache_keys(self.audio, "en", ["small", "small"]) == keys[1:]
+        assert transcription_cache_keys(self.audio.copy(), "en", ["large-v3"]) == keys[:1]
+
+    def test_key_changes_with_audio_and_language(self):
+        [key] = transcription_cache_keys(self.audio, "en", ["small"])
+        assert transcription_cache_keys(self.audio, "es", ["small"]) != [key]
+        assert transcription_cache_keys(self.audio[::-1], "en", ["small"]) != [key]
+
+    def test_get_any_returns_first_cached_key(self):
+        """A lookup over several keys serves the first one cached and counts once."""
+        cache = TranscriptionCache(max_entries=4)
+
+        async def lookups():
+            await cache.set("routed", {"model_used": "small"})
+            miss = await cache.get_any(["preferred"])
+            hit = await cache.get_any(["preferred", "routed"])
+            await cache.set("preferred", {"model_used": "large-v3"})
+            preferred = await cache.get_any(["preferred", "routed"])
+            return miss, hit, preferred
+
+        miss, hit, preferred = asyncio.run(lookups())
+        assert miss is None
+        assert hit == {"model_used": "small"}
+        assert preferred == {"model_used": "large-v3"}
+        assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+class TestColumnar:
+    """Test cases for the columnar response layout."""
+
+    result = {
+        "transcript": "hello there general",
+        "words": [
+            {"word": "hello", "start": 0.0, "end": 0.4, "confidence": 0.9},
+            {"word": "there", "start": 0.5, "end": 0.8, "confidence": None},
+            {"word": "general", "start": 1.5, "end": 2.0, "confidence": 0.7},
+        ],
+        "segments": [
+            {"text": "hello there", "start": 0.0, "end": 0.8, "words": [
+                {"word": "hello", "start": 0.0, "end": 0.4, "confidence": 0.9},
+                {"word": "there", "start": 0.5, "end": 0.8, "confidence": None},
+            ]},
+            {"text": "general", "start": 1.5, "end": 2.0, "words": [
+                {"word": "general", "start": 1.5, "end": 2.0, "confidence": 0.7},
+            ]},
+        ],
+        "language": "en",
+        "duration": 2.0,
+    }
+
+    def test_round_trip(self):
+        """Rows rebuilt from the validated columns equal the original words and segments."""
+        response = ASRColumnarResponse(**to_columnar(self.result))
+        payload = ASRColumnarResponse.model_validate_json(response.model_dump_json())
+
+        columns = payload.words
+        words = [
+            {"word": word, "start": start, "end": end, "confidence": confidence}
+            for word, start, end, confidence in zip(columns.word, columns.start, columns.end, columns.confidence)
+        ]
+        assert words == self.result["words"]
+
+        segments = payload.segments
+        rebuilt = [
+            {"text": text, "start": start, "end": end, "words": words[begin:stop]}
+            for text, start, end, begin, stop in zip(
+                segments.text, segments.start, segments.end, segments.word_offsets, segments.word_offsets[1:]
+            )
+        ]
+        assert rebuilt == self.result["segments"]
+        assert (payload.transcript, payload.language, payload.duration) == ("hello there general", "en", 2.0)
+
+    def test_without_segments(self):
+        columnar = to_columnar(self.result, include_segments=False)
+        assert columnar["segments"] is None
+        assert columnar["words"]["word"] == ["hello", "there", "general"]